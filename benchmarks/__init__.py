@@ -0,0 +1,9 @@
+"""Headless benchmarks for the game
+
+Run from the repository root with
+
+    python -m benchmarks.run [--baseline benchmarks/baseline.json]
+
+The dummy SDL video and audio drivers are used and the clock is never
+capped, so the numbers are the cost of the game and not of the display.
+"""
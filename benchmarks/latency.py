@@ -0,0 +1,201 @@
+"""This Module measures how long a key press takes to move the drawn paddle
+
+    python -m benchmarks.latency [--presses 40] [--poll-input] [--idle-pacing] [--json]
+
+The real VideoGame.run loop plays a GameScene.  A thread posts KEYDOWN
+events with pygame.event.post at random moments and, for every press,
+the harness counts the updates and the milliseconds until the player's
+paddle is drawn somewhere else.  The dummy video driver has nothing to
+wait for, so drawn is as good as displayed here.
+
+The dummy driver has no keyboard either and pygame.key.get_pressed never
+sees posted events, so with poll_input the held keys are simulated by
+wrapping get_pressed.
+
+VideoGame.run shuts pygame down when it returns, so measure_apart plays
+every measurement in a process of its own and run uses it; the
+benchmarks before it keep their pygame and every game starts fresh.
+"""
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import threading
+import time
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+
+import pygame # pylint: disable=wrong-import-position
+from ponggame import game # pylint: disable=wrong-import-position
+from ponggame.profiler import _percentile # pylint: disable=wrong-import-position
+
+PRESS_TIMEOUT = 1.0 #seconds to wait for the paddle before a press counts as missed
+_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class _HeldKeys:
+    """This Class stands in for pygame.key.get_pressed() with the keys the harness holds"""
+    def __init__(self, held):
+        self._held = held
+
+    def __getitem__(self, key):
+        return key in self._held
+
+
+class _Probe:
+    """This Class watches the GameScene's updates and draws for the key presses"""
+    def __init__(self, scene):
+        self._scene = scene
+        self._update = scene.update
+        self._draw = scene.draw
+        self._lock = threading.Lock()
+        self._ticks = 0
+        self._armed = None
+        self.started = threading.Event()
+        self.moved = threading.Event()
+        self.samples = []
+        scene.update = self.update
+        scene.draw = self.draw
+
+    def update(self):
+        """This Method counts the updates"""
+        self._update()
+        self._ticks += 1
+
+    def draw(self, alpha=1.0):
+        """This Method draws the scene and checks if the armed press reached the screen"""
+        dirty_rects = self._draw(alpha)
+        rect = self._scene.get_player_drawn_rect()
+        self.started.set()
+        with self._lock:
+            if self._armed and rect and rect.y != self._armed[2]:
+                (start, tick, _) = self._armed
+                self.samples.append((self._ticks - tick, (time.perf_counter() - start) * 1000))
+                self._armed = None
+                self.moved.set()
+        return dirty_rects
+
+    def arm(self):
+        """This Method starts timing a press, called right before it is posted"""
+        rect = self._scene.get_player_drawn_rect()
+        with self._lock:
+            self.moved.clear()
+            self._armed = (time.perf_counter(), self._ticks, rect.y if rect else None)
+
+    def disarm(self):
+        """This Method gives up on a press that never moved the paddle"""
+        with self._lock:
+            self._armed = None
+
+
+def _key_event(event_type, key):
+    """This Function returns a synthetic key event"""
+    return pygame.event.Event(event_type, key=key, mod=0, unicode='', scancode=0)
+
+
+def _press_keys(probe, presses, held, seed):
+    """This Function skips the title, then taps S and W presses times and leaves with Esc"""
+    randomness = random.Random(seed)
+    pygame.event.post(_key_event(pygame.KEYDOWN, pygame.K_SPACE))
+    probe.started.wait(10)
+    for press in range(presses):
+        time.sleep(randomness.uniform(0.04, 0.08)) #the paddle stops and a frame goes by
+        key = pygame.K_s if press % 2 == 0 else pygame.K_w
+        probe.arm()
+        held.add(key)
+        pygame.event.post(_key_event(pygame.KEYDOWN, key))
+        if not probe.moved.wait(PRESS_TIMEOUT):
+            probe.disarm()
+        held.discard(key)
+        pygame.event.post(_key_event(pygame.KEYUP, key))
+    pygame.event.post(_key_event(pygame.KEYDOWN, pygame.K_ESCAPE))
+
+
+def measure(presses=40, poll_input=False, idle_pacing=False, seed=1):
+    """This Function plays a GameScene with presses key presses, returns [(ticks, ms)]
+
+    The list has one entry per press that moved the paddle within
+    PRESS_TIMEOUT.  pygame is shut down afterwards, like VideoGame.run does.
+    """
+    the_game_obj = game.PongGame(idle_pacing=idle_pacing, poll_input=poll_input)
+    the_game_obj.build_scene_graph()
+    probe = _Probe(the_game_obj.scene_graph[1])
+    held = set()
+    get_pressed = pygame.key.get_pressed
+    if poll_input:
+        pygame.key.get_pressed = lambda: _HeldKeys(held)
+    feeder = threading.Thread(target=_press_keys, args=(probe, presses, held, seed), daemon=True)
+    feeder.start()
+    try:
+        the_game_obj.run()
+    finally:
+        pygame.key.get_pressed = get_pressed
+    feeder.join()
+    return probe.samples
+
+
+def measure_apart(presses=40, poll_input=False, idle_pacing=False, seed=1):
+    """This Function runs measure in a new Python process, returns its [(ticks, ms)]"""
+    command = [sys.executable, '-m', 'benchmarks.latency', '--json',
+               '--presses', str(presses), '--seed', str(seed)]
+    if poll_input:
+        command.append('--poll-input')
+    if idle_pacing:
+        command.append('--idle-pacing')
+    environment = dict(os.environ)
+    environment['PYTHONPATH'] = os.pathsep.join(
+        path for path in (_ROOT, environment.get('PYTHONPATH')) if path)
+    finished = subprocess.run(command, cwd=_ROOT, env=environment, capture_output=True,
+                              text=True, check=True)
+    #pygame prints its banner first, the samples are the last line
+    return [tuple(sample) for sample in json.loads(finished.stdout.splitlines()[-1])]
+
+
+def run(presses=40):
+    """This Function measures the event and polled input paths, returns {name: metrics}"""
+    results = {}
+    for (name, poll_input) in (('key to draw', False), ('key to draw, polled', True)):
+        samples = measure_apart(presses, poll_input)
+        ticks = sorted(sample[0] for sample in samples)
+        millis = sorted(sample[1] for sample in samples)
+        results[name] = {
+            'p50_ms': _percentile(millis, 50),
+            'p95_ms': _percentile(millis, 95),
+            'max_ms': millis[-1] if millis else 0.0,
+            'p50_ticks': _percentile(ticks, 50),
+            'missed': presses - len(samples),
+        }
+    return results
+
+
+def main(argv=None):
+    """This function measures the latency from the command line"""
+    parser = argparse.ArgumentParser(description='Key press to drawn paddle latency')
+    parser.add_argument('--presses', type=int, default=40)
+    parser.add_argument('--poll-input', action='store_true',
+                        help='read the held keys with get_pressed before every update')
+    parser.add_argument('--idle-pacing', action='store_true')
+    parser.add_argument('--seed', type=int, default=1, help='seed of the press timing')
+    parser.add_argument('--json', action='store_true',
+                        help='print the [ticks, ms] of every press as JSON, for measure_apart')
+    args = parser.parse_args(argv)
+    samples = measure(args.presses, args.poll_input, args.idle_pacing, args.seed)
+    if args.json:
+        print(json.dumps(samples))
+        return 0
+    if not samples:
+        print('no press reached the screen')
+        return 1
+    millis = sorted(sample[1] for sample in samples)
+    ticks = sorted(sample[0] for sample in samples)
+    print(f'{len(samples)}/{args.presses} presses  p50 {_percentile(millis, 50):.2f}'
+          f'  p95 {_percentile(millis, 95):.2f}  max {millis[-1]:.2f} ms'
+          f'  ticks p50 {_percentile(ticks, 50)}  max {ticks[-1]}')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
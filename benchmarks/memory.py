@@ -0,0 +1,116 @@
+"""This Module measures the memory the game objects take and the garbage they make
+
+    python -m benchmarks.memory
+
+Entity sizes are what tracemalloc sees allocated per object, with the
+vectors, colour and timers it owns, built on one shared TimerWheel like
+the objects of a match.  update_peak_bytes is the most short-lived
+memory one Ball.update and the advance of its wheel needed, and the match numbers are the collections
+the cyclic garbage collector ran while many matches were built and played.
+"""
+import gc
+import os
+import sys
+import time
+import tracemalloc
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+
+import pygame # pylint: disable=wrong-import-position
+from ponggame.ball import Ball # pylint: disable=wrong-import-position
+from ponggame.paddle import Paddle, OpponentAI # pylint: disable=wrong-import-position
+from ponggame.pixels import offscreen_scene # pylint: disable=wrong-import-position
+from ponggame.timers import TimerWheel # pylint: disable=wrong-import-position
+
+
+def entity_bytes(build, count=1000):
+    """This Function returns the bytes each of count objects made by build() holds"""
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    entities = [build() for _ in range(count)]
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return (after - before - sys.getsizeof(entities)) / len(entities)
+
+
+def update_peak_bytes(screen, ticks=2000):
+    """This Function returns (peak, kept) bytes of a Ball.update over ticks updates
+
+    Every update is followed by the advance of the wheel, as in a
+    GameScene.  peak is the most memory a single update had allocated at
+    once, kept is what all of them left allocated.
+    """
+    (width, height) = screen.get_size()
+    timers = TimerWheel()
+    paddles = [Paddle(screen), OpponentAI(screen, width - 70, seed=1, timers=timers)]
+    ball = Ball(screen, paddles, width / 2, height / 2, timers=timers)
+    for _ in range(100): #past the first update of every code path
+        ball.update()
+        timers.advance()
+    tracemalloc.start()
+    start = tracemalloc.get_traced_memory()[0]
+    peak = 0
+    for _ in range(ticks):
+        tracemalloc.reset_peak()
+        current = tracemalloc.get_traced_memory()[0]
+        ball.update()
+        timers.advance()
+        peak = max(peak, tracemalloc.get_traced_memory()[1] - current)
+    kept = tracemalloc.get_traced_memory()[0] - start
+    tracemalloc.stop()
+    return (peak, kept)
+
+
+def match_collections(matches=200, ticks=600, court_size=(800, 500)):
+    """This Function plays matches headless GameScenes, returns (collections, gc ms)"""
+    runs = []
+
+    def on_gc(phase, _info):
+        if phase == 'start':
+            runs.append(time.perf_counter())
+        else:
+            runs[-1] = time.perf_counter() - runs[-1]
+
+    gc.collect()
+    gc.callbacks.append(on_gc)
+    try:
+        for match in range(matches):
+            scene = offscreen_scene(court_size, seed=match)
+            for _ in range(ticks):
+                scene.update()
+    finally:
+        gc.callbacks.remove(on_gc)
+    return (len(runs), sum(runs) * 1000)
+
+
+def run(screen, matches=200):
+    """This Function runs every memory measurement, returns {name: {metric: value}}"""
+    (width, _) = screen.get_size()
+    (peak, kept) = update_peak_bytes(screen)
+    (collections, gc_ms) = match_collections(matches, court_size=screen.get_size())
+    timers = TimerWheel()
+    return {
+        'Ball': {'bytes': entity_bytes(lambda: Ball(screen, [], timers=timers))},
+        'Paddle': {'bytes': entity_bytes(lambda: Paddle(screen))},
+        'OpponentAI': {'bytes': entity_bytes(
+            lambda: OpponentAI(screen, width - 70, seed=1, timers=timers))},
+        'Ball.update': {'peak_bytes': peak, 'kept_bytes': kept},
+        f'{matches} matches': {'gc_collections': collections, 'gc_ms': gc_ms},
+    }
+
+
+def main():
+    """This function prints the measurements"""
+    pygame.init()
+    screen = pygame.display.set_mode((800, 500))
+    for (name, metrics) in run(screen).items():
+        print(f'{name:>24}  ' + '  '.join(f'{metric} {value:.1f}'
+                                          for (metric, value) in metrics.items()))
+    pygame.quit()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,118 @@
+"""This Module times the hot methods of the game objects one call at a time"""
+import time
+import pygame
+from ponggame.ball import Ball
+from ponggame.paddle import Paddle, OpponentAI
+from ponggame.game_overlay import Overlay
+from ponggame.timers import TimerWheel
+
+
+def time_call(function, calls=20000, repeats=5):
+    """This Function returns the best nanoseconds per call of function() over repeats runs"""
+    best = None
+    for _ in range(repeats):
+        start = time.perf_counter()
+        for _ in range(calls):
+            function()
+        elapsed = time.perf_counter() - start
+        if best is None or elapsed < best:
+            best = elapsed
+    return best / calls * 1e9
+
+
+def _paddle_collide(screen):
+    """This Function returns a call that sweeps a ball into the paddle face"""
+    paddle = Paddle(screen)
+    position = pygame.math.Vector2(80, 300)
+    move = pygame.math.Vector2(-10, 1)
+    return lambda: paddle.collide(position, move, Ball.default_radius)
+
+
+def _paddle_collide_miss(screen):
+    """This Function returns a call that sweeps a ball far from the paddle"""
+    paddle = Paddle(screen)
+    position = pygame.math.Vector2(400, 100)
+    move = pygame.math.Vector2(-1.5, -0.5)
+    return lambda: paddle.collide(position, move, Ball.default_radius)
+
+
+def _rebound_direction(screen):
+    """This Function returns a call that asks the paddle where a hit goes"""
+    paddle = Paddle(screen)
+    return lambda: paddle.rebound_direction(300)
+
+
+def _change_angle(screen):
+    """This Function returns a call that rebounds a ball off a paddle face"""
+    ball = Ball(screen, [], 400, 250, -1.5, 0.5, timers=TimerWheel())
+    return lambda: ball._change_angle(1)
+
+
+def _ball_update(screen):
+    """This Function returns a call that moves a ball across the court between two paddles
+
+    The ball's timers are advanced after every update, as in a GameScene.
+    """
+    (width, height) = screen.get_size()
+    timers = TimerWheel()
+    paddles = [Paddle(screen), OpponentAI(screen, width - 70, seed=1, timers=timers)]
+    ball = Ball(screen, paddles, width / 2, height / 2, timers=timers)
+    def update():
+        ball.update()
+        timers.advance()
+    return update
+
+
+def _ai_move(screen):
+    """This Function returns a call that steers the AI while the ball keeps its velocity"""
+    (width, height) = screen.get_size()
+    timers = TimerWheel()
+    paddle = OpponentAI(screen, width - 70, timers=timers)
+    ball = Ball(screen, [], width / 2, height / 2, 1.5, 0.5, timers=timers)
+    return lambda: paddle._move(ball)
+
+
+def _ai_move_solve(screen):
+    """This Function returns a call that makes the AI solve the intercept every time"""
+    (width, height) = screen.get_size()
+    timers = TimerWheel()
+    paddle = OpponentAI(screen, width - 70, timers=timers)
+    balls = [Ball(screen, [], width / 2, height / 2, 1.5, 0.5, timers=timers),
+             Ball(screen, [], width / 2, height / 2, 1.5, -0.5, timers=timers)]
+    turn = [0]
+    def move():
+        turn[0] ^= 1
+        paddle._move(balls[turn[0]])
+    return move
+
+
+def _overlay_draw(screen):
+    """This Function returns a call that draws the overlay on the first round
+
+    The wheel is never advanced, so the tutorial and countdown show as
+    they do before the first serve.
+    """
+    overlay = Overlay(screen, timers=TimerWheel())
+    return overlay.draw
+
+
+BENCHMARKS = {
+    'Paddle.collide': _paddle_collide,
+    'Paddle.collide_miss': _paddle_collide_miss,
+    'Paddle.rebound_direction': _rebound_direction,
+    'Ball._change_angle': _change_angle,
+    'Ball.update': _ball_update,
+    'OpponentAI._move': _ai_move,
+    'OpponentAI._move_solve': _ai_move_solve,
+    'Overlay.draw': _overlay_draw,
+}
+
+
+def run(screen, calls=20000, repeats=5):
+    """This Function runs every micro benchmark, returns {name: {'ns_per_call': ns}}"""
+    results = {}
+    for (name, build) in BENCHMARKS.items():
+        #drawing is far slower than the math, keep the run short
+        count = calls // 20 if name.endswith('.draw') else calls
+        results[name] = {'ns_per_call': time_call(build(screen), count, repeats)}
+    return results
@@ -0,0 +1,127 @@
+"""This Module runs the benchmark suite, saves it as JSON and gates on a baseline
+
+    python -m benchmarks.run --out results.json
+    python -m benchmarks.run --save-baseline
+    python -m benchmarks.run --baseline benchmarks/baseline.json --threshold 0.15
+
+The exit status is 1 when any result is worse than the baseline by more
+than the threshold, so it can gate a CI job.  The latency numbers are
+wall-clock times of a whole game loop and swing far more from run to
+run, so they are held to GROUP_THRESHOLDS instead, whichever is wider.
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+
+import pygame # pylint: disable=wrong-import-position
+from ponggame import game # pylint: disable=wrong-import-position
+from benchmarks import latency, memory, micro, scenes # pylint: disable=wrong-import-position
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baseline.json')
+DEFAULT_THRESHOLD = 0.10
+#groups that are only gated on big regressions, a fraction like DEFAULT_THRESHOLD
+GROUP_THRESHOLDS = {'latency': 1.0}
+
+#metrics where a bigger number is better, every other metric is a time or a size
+HIGHER_IS_BETTER = ('fps',)
+
+
+def run_suite(frames=2000, calls=20000, repeats=5, presses=40):
+    """This Function runs the scene, micro, memory and latency benchmarks, returns the results dict
+
+    The latency harness plays its games in processes of their own.
+    """
+    the_game_obj = game.PongGame()
+    results = {
+        'python': platform.python_version(),
+        'pygame': pygame.version.ver,
+        'platform': platform.platform(),
+        'scenes': scenes.run(the_game_obj, frames),
+        'micro': micro.run(pygame.display.get_surface(), calls, repeats),
+        'memory': memory.run(pygame.display.get_surface()),
+        'latency': latency.run(presses),
+    }
+    pygame.quit()
+    return results
+
+
+def compare(results, baseline, threshold=DEFAULT_THRESHOLD):
+    """This Function returns a list of (name, metric, baseline, now, change) that regressed
+
+    change is the fraction the metric got worse by, a metric missing
+    from either side is skipped.
+    """
+    regressions = []
+    for group in ('scenes', 'micro', 'memory', 'latency'):
+        group_threshold = max(threshold, GROUP_THRESHOLDS.get(group, threshold))
+        for (name, metrics) in results.get(group, {}).items():
+            old_metrics = baseline.get(group, {}).get(name, {})
+            for (metric, value) in metrics.items():
+                old_value = old_metrics.get(metric)
+                if not old_value:
+                    continue
+                if metric in HIGHER_IS_BETTER:
+                    change = (old_value - value) / old_value
+                else:
+                    change = (value - old_value) / old_value
+                if change > group_threshold:
+                    regressions.append((f'{group}/{name}', metric, old_value, value, change))
+    return regressions
+
+
+def _print_results(results):
+    """This Function prints the results as a small table"""
+    for (name, metrics) in results['scenes'].items():
+        print(f'{name:>24}  {metrics["fps"]:9.1f} fps  p50 {metrics["p50_ms"]:.3f}'
+              f'  p95 {metrics["p95_ms"]:.3f}  p99 {metrics["p99_ms"]:.3f} ms')
+    for (name, metrics) in results['micro'].items():
+        print(f'{name:>24}  {metrics["ns_per_call"]:9.0f} ns/call')
+    for (name, metrics) in list(results['memory'].items()) + list(results['latency'].items()):
+        print(f'{name:>24}  ' + '  '.join(f'{metric} {value:.1f}'
+                                          for (metric, value) in metrics.items()))
+
+
+def main(argv=None):
+    """This function runs the suite from the command line"""
+    parser = argparse.ArgumentParser(description='Headless benchmarks for the pong game')
+    parser.add_argument('--out', metavar='PATH', help='write the results as JSON to PATH')
+    parser.add_argument('--baseline', metavar='PATH',
+                        help='compare against this results file and fail on regressions')
+    parser.add_argument('--save-baseline', action='store_true',
+                        help=f'write the results to {DEFAULT_BASELINE}')
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                        help='allowed fractional slowdown before failing (default 0.10)')
+    parser.add_argument('--frames', type=int, default=2000, help='frames per scene')
+    parser.add_argument('--calls', type=int, default=20000, help='calls per micro benchmark')
+    parser.add_argument('--presses', type=int, default=40,
+                        help='key presses timed by the latency harness')
+    parser.add_argument('--repeats', type=int, default=5,
+                        help='micro benchmark runs, the best one is kept')
+    args = parser.parse_args(argv)
+
+    results = run_suite(args.frames, args.calls, args.repeats, args.presses)
+    _print_results(results)
+    for path in (args.out, DEFAULT_BASELINE if args.save_baseline else None):
+        if path:
+            with open(path, 'w') as results_file:
+                json.dump(results, results_file, indent=1)
+    if not args.baseline:
+        return 0
+    with open(args.baseline) as baseline_file:
+        baseline = json.load(baseline_file)
+    regressions = compare(results, baseline, args.threshold)
+    for (name, metric, old_value, value, change) in regressions:
+        print(f'REGRESSION {name} {metric}: {old_value:.4g} -> {value:.4g} ({change:+.1%})')
+    if regressions:
+        return 1
+    print(f'no regressions past {args.threshold:.0%}')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
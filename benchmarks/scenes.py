@@ -0,0 +1,55 @@
+"""This Module runs every scene of the scene graph flat out and times each frame"""
+import pygame
+from ponggame.profiler import FrameProfiler
+from ponggame.scene import ArenaScene
+
+#the frame time should grow about linearly with the balls
+ARENA_BALLS = (100, 1000)
+
+
+def run_scene(scene, frames=2000):
+    """This Function updates and draws scene frames times, returns its fps and latency
+
+    A frame is what one pass of VideoGame.run costs at one update per
+    draw: pump events, update, draw and push the dirty rects.
+    """
+    profiler = FrameProfiler(frames)
+    scene.start()
+    for _ in range(frames):
+        mark = profiler.begin_frame()
+        pygame.event.pump()
+        scene.update()
+        mark = profiler.lap('update', mark)
+        dirty_rects = scene.draw(1.0)
+        mark = profiler.lap('draw', mark)
+        if dirty_rects is None:
+            pygame.display.update()
+        else:
+            pygame.display.update(dirty_rects)
+        profiler.lap('display_update', mark)
+        profiler.end_frame()
+    pygame.mixer.music.stop()
+    summary = profiler.summary()
+    frame = summary['frame']
+    return {
+        'fps': 1000 / frame['mean'] if frame['mean'] else 0.0,
+        'mean_ms': frame['mean'],
+        'p50_ms': frame['p50'],
+        'p95_ms': frame['p95'],
+        'p99_ms': frame['p99'],
+        'update_p95_ms': summary['update']['p95'],
+        'draw_p95_ms': summary['draw']['p95'],
+    }
+
+
+def run(game, frames=2000):
+    """This Function benchmarks every scene of game's scene graph and the arena, returns {name: result}"""
+    game.build_scene_graph()
+    results = {}
+    for scene in game.scene_graph:
+        results[type(scene).__name__] = run_scene(scene, frames)
+    screen = pygame.display.get_surface()
+    for balls in ARENA_BALLS:
+        scene = ArenaScene(screen, (0, 0, 0), balls=balls, seed=1, soundtrack=None)
+        results[f'ArenaScene[{balls} balls]'] = run_scene(scene, frames)
+    return results
@@ -11,13 +11,86 @@
 #
 
 """This Module acts as the main and runs the whole game"""
-from ponggame import game
+import argparse
+from ponggame import arena, game
+from ponggame.diagnostics import GC_MODES
+from ponggame.archive import ArchiveRecorder, ArchiveWriter
+from ponggame.replay import Recorder
+
+
+def parse_args(argv=None):
+    """This function returns the command line arguments and the arena options, None for a match"""
+    parser = argparse.ArgumentParser(description='Pong against an AI')
+    parser.add_argument('--profile', metavar='PATH',
+                        help='time every frame and write them to PATH (.json or .csv) on exit')
+    parser.add_argument('--diagnose', action='store_true',
+                        help='with --profile, also record what every phase allocates and every '
+                             'GC pause, slows the game down')
+    parser.add_argument('--gc', choices=GC_MODES, default='normal',
+                        help='freeze or turn off the cyclic garbage collector while a scene runs')
+    parser.add_argument('--hud', action='store_true',
+                        help='start with the performance HUD on, F3 toggles it')
+    parser.add_argument('--record', metavar='PATH',
+                        help='record the last match to PATH, replay it with python -m ponggame.replay')
+    parser.add_argument('--archive', metavar='PATH',
+                        help='append every match to the replay archive PATH.ticks/.keys/.index')
+    parser.add_argument('--seed', type=int, help='AI seed, the same seed and input play the same')
+    parser.add_argument('--crossfade', type=int, default=0, metavar='MS',
+                        help='fade from one scene into the next over MS milliseconds')
+    parser.add_argument('--idle-pacing', action='store_true',
+                        help='sleep and skip drawing while nothing on screen moves')
+    parser.add_argument('--busy-loop', action='store_true',
+                        help='pace frames with a busy loop for less jitter, uses a whole core')
+    parser.add_argument('--poll-input', action='store_true',
+                        help='read the held keys again right before every update')
+    parser.add_argument('--arena', type=int, metavar='BALLS',
+                        help='play the arena with BALLS balls instead of a match')
+    parser.add_argument('--paddles', type=int,
+                        help=f'with --arena, paddles in the arena, 2 to {arena.MAX_PADDLES} '
+                             f'(default {arena.DEFAULT_PADDLES}), one AI per side after the first')
+    parser.add_argument('--lives', type=int,
+                        help='with --arena, balls an arena side may let through (default half '
+                             f'the balls, at least {arena.DEFAULT_LIVES})')
+    args = parser.parse_args(argv)
+    arena_options = None
+    if args.arena is None:
+        for (flag, value) in (('--paddles', args.paddles), ('--lives', args.lives)):
+            if value is not None:
+                parser.error(f'{flag} only applies to the arena, add --arena BALLS')
+    else:
+        if args.record or args.archive:
+            parser.error('the arena cannot be recorded')
+        if args.arena < 1:
+            parser.error(f'--arena needs at least 1 ball, not {args.arena}')
+        arena_options = {'balls': args.arena}
+        if args.paddles is not None:
+            if not 2 <= args.paddles <= arena.MAX_PADDLES:
+                parser.error(f'--paddles must be 2 to {arena.MAX_PADDLES}, not {args.paddles}')
+            arena_options['paddles'] = args.paddles
+        if args.lives is not None:
+            if args.lives < 1:
+                parser.error(f'--lives must be at least 1, not {args.lives}')
+            arena_options['lives'] = args.lives
+    if args.diagnose and not args.profile:
+        parser.error('--diagnose writes its report with --profile PATH')
+    return (args, arena_options)
 
 
 def main():
     """This function defines main"""
-    the_game_obj = game.PongGame()
-    the_game_obj.build_scene_graph()
+    (args, arena_options) = parse_args()
+    the_game_obj = game.PongGame(profile_path=args.profile, show_hud=args.hud,
+                                 crossfade_ms=args.crossfade, idle_pacing=args.idle_pacing,
+                                 busy_loop=args.busy_loop, diagnose=args.diagnose,
+                                 gc_mode=args.gc, poll_input=args.poll_input)
+    the_game_obj.build_scene_graph(arena_options)
+    game_scene = the_game_obj.scene_graph[1]
+    if args.seed is not None:
+        game_scene.set_seed(args.seed)
+    if args.archive:
+        game_scene.set_replay(ArchiveRecorder(ArchiveWriter(args.archive), args.record))
+    elif args.record:
+        game_scene.set_replay(Recorder(args.record))
     return the_game_obj.run()
 
 
@@ -7,4 +7,18 @@ __all__ = [
     'scene',
     'ball',
     'paddle',
+    'sim',
+    'batch',
+    'arena',
+    'sim_observers',
+    'text_cache',
+    'assets',
+    'profiler',
+    'diagnostics',
+    'timers',
+    'replay',
+    'archive',
+    'env',
+    'pixels',
+    'export',
 ]
\ No newline at end of file
@@ -0,0 +1,305 @@
+"""This Module keeps many recorded matches in one append-only archive
+
+An archive is three files of fixed size records, each after a 16 byte
+header, so any tick of any match is an offset computation away:
+
+    PATH.ticks  one TICK_DTYPE record per tick of every match
+    PATH.keys   one KEYFRAME_DTYPE GameScene snapshot every keyframe_interval ticks
+    PATH.index  one INDEX_DTYPE record per match: offsets, seed and score
+
+A match is only visible once its index record is written, which is
+always last, so a crash can at worst leave unused bytes at the end of
+the tick and keyframe files.  ArchiveReader maps the files with mmap and
+hands out NumPy views into them, nothing is copied or parsed up front.
+"""
+import mmap
+import os
+import struct
+from array import array
+import numpy as np
+from ponggame.replay import Recorder, Recording, decode_input, encode_input
+from ponggame.scene import SNAPSHOT_SIZE
+
+MAGIC = b'PONGARC1'
+VERSION = 3
+_HEADER = struct.Struct('<8sII') #magic, version, record size
+
+DEFAULT_KEYFRAME_INTERVAL = 120
+
+TICK_DTYPE = np.dtype([
+    ('input', 'u1'),
+    ('score_one', 'u1'),
+    ('score_two', 'u1'),
+    ('pad', 'u1'),
+    ('checksum', '<u4'),
+    ('ball_x', '<f4'),
+    ('ball_y', '<f4'),
+    ('left_y', '<f4'),
+    ('right_y', '<f4'),
+])
+
+KEYFRAME_DTYPE = np.dtype([
+    ('tick', '<u4'),
+    ('snapshot', 'u1', (SNAPSHOT_SIZE,)),
+    ('pad', 'u1', (-(4 + SNAPSHOT_SIZE) % 8,)),
+])
+
+INDEX_DTYPE = np.dtype([
+    ('first_tick', '<u8'),
+    ('first_keyframe', '<u8'),
+    ('ticks', '<u4'),
+    ('keyframes', '<u4'),
+    ('seed', '<u4'),
+    ('keyframe_interval', '<u4'),
+    ('width', '<u2'),
+    ('height', '<u2'),
+    ('frame_rate', '<u2'),
+    ('score_one', 'u1'),
+    ('score_two', 'u1'),
+    ('winner', 'u1'),
+    ('pad', 'u1', (7,)),
+])
+
+_SUFFIXES = (('.ticks', TICK_DTYPE), ('.keys', KEYFRAME_DTYPE), ('.index', INDEX_DTYPE))
+
+
+def _open_part(path, dtype):
+    """This Function opens one archive file for appending, writing its header if it is new"""
+    part = open(path, 'a+b')
+    part.seek(0)
+    header = part.read(_HEADER.size)
+    if not header:
+        part.write(_HEADER.pack(MAGIC, VERSION, dtype.itemsize))
+        part.flush()
+    elif _HEADER.unpack(header) != (MAGIC, VERSION, dtype.itemsize):
+        part.close()
+        raise ValueError(f'{path} is not a version {VERSION} pong archive')
+    return part
+
+
+class ArchiveWriter:
+    """This Class appends matches to an archive"""
+    def __init__(self, path, keyframe_interval=DEFAULT_KEYFRAME_INTERVAL):
+        self._path = path
+        self.keyframe_interval = keyframe_interval
+        (self._ticks, self._keys, self._index) = (
+            _open_part(path + suffix, dtype) for (suffix, dtype) in _SUFFIXES)
+        self._match_count = (os.path.getsize(path + '.index') - _HEADER.size) // INDEX_DTYPE.itemsize
+        self._tick_count = 0
+        self._keyframe_count = 0
+        if self._match_count:
+            self._index.seek(_HEADER.size + (self._match_count - 1) * INDEX_DTYPE.itemsize)
+            last = np.frombuffer(self._index.read(INDEX_DTYPE.itemsize), INDEX_DTYPE)[0]
+            self._tick_count = int(last['first_tick'] + last['ticks'])
+            self._keyframe_count = int(last['first_keyframe'] + last['keyframes'])
+        #drop whatever a crash left after the last complete match
+        self._index.truncate(_HEADER.size + self._match_count * INDEX_DTYPE.itemsize)
+        self._ticks.truncate(_HEADER.size + self._tick_count * TICK_DTYPE.itemsize)
+        self._keys.truncate(_HEADER.size + self._keyframe_count * KEYFRAME_DTYPE.itemsize)
+
+    def append(self, ticks, keyframes, seed, size, frame_rate, scores):
+        """This Method appends one match, returns its number in the archive
+
+        ticks is a TICK_DTYPE array, keyframes a KEYFRAME_DTYPE array and
+        scores is (score_one, score_two, winner).
+        """
+        entry = np.zeros(1, INDEX_DTYPE)
+        entry['first_tick'] = self._tick_count
+        entry['first_keyframe'] = self._keyframe_count
+        entry['ticks'] = len(ticks)
+        entry['keyframes'] = len(keyframes)
+        entry['seed'] = seed
+        entry['keyframe_interval'] = self.keyframe_interval
+        (entry['width'], entry['height']) = size
+        entry['frame_rate'] = frame_rate
+        (entry['score_one'], entry['score_two'], entry['winner']) = scores
+        self._ticks.write(np.ascontiguousarray(ticks, TICK_DTYPE).tobytes())
+        self._keys.write(np.ascontiguousarray(keyframes, KEYFRAME_DTYPE).tobytes())
+        self._ticks.flush()
+        self._keys.flush()
+        self._index.write(entry.tobytes())
+        self._index.flush()
+        self._tick_count += len(ticks)
+        self._keyframe_count += len(keyframes)
+        self._match_count += 1
+        return self._match_count - 1
+
+    def close(self):
+        """This Method closes the archive files"""
+        for part in (self._ticks, self._keys, self._index):
+            part.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class ArchiveRecorder(Recorder):
+    """This Class records every match a GameScene plays into an ArchiveWriter
+
+    It is a replay.Recorder, so with a path it also writes the last match
+    as a replay file.
+    """
+    def __init__(self, writer, path=None):
+        super().__init__(path)
+        self._writer = writer
+        self._ticks = []
+        self._keyframes = []
+
+    def start(self, scene):
+        """This Method starts buffering a new match"""
+        super().start(scene)
+        self._ticks = []
+        self._keyframes = []
+
+    def after_update(self, scene):
+        """This Method buffers the tick and, every keyframe_interval ticks, a snapshot"""
+        super().after_update(scene)
+        tick = self.recording.ticks - 1
+        (score_one, score_two, _) = scene.get_scores()
+        self._ticks.append((encode_input(*scene.get_player_input()), score_one, score_two, 0,
+                            self.recording.checksums[-1]) + scene.get_positions())
+        if tick % self._writer.keyframe_interval == 0:
+            self._keyframes.append((tick, np.frombuffer(scene.snapshot(), np.uint8), 0))
+
+    def stop(self, scene):
+        """This Method appends the match to the archive"""
+        super().stop(scene)
+        if self.recording is None:
+            return
+        self._writer.append(
+            np.array(self._ticks, TICK_DTYPE),
+            np.array(self._keyframes, KEYFRAME_DTYPE),
+            self.recording.seed,
+            scene.size,
+            self.recording.frame_rate,
+            scene.get_scores())
+        self._ticks = []
+        self._keyframes = []
+
+
+class ArchiveReader:
+    """This Class maps an archive read only and gives NumPy views into it
+
+    Views keep the mapping alive; drop them before close().
+    """
+    def __init__(self, path):
+        self._files = []
+        self._maps = []
+        (self.ticks, self.keyframes, self.index) = (
+            self._map(path + suffix, dtype) for (suffix, dtype) in _SUFFIXES)
+        #a crash can leave records no match owns, keep them out of scans
+        if len(self.index):
+            last = self.index[-1]
+            self.ticks = self.ticks[:int(last['first_tick'] + last['ticks'])]
+            self.keyframes = self.keyframes[:int(last['first_keyframe'] + last['keyframes'])]
+        else:
+            self.ticks = self.ticks[:0]
+            self.keyframes = self.keyframes[:0]
+
+    def _map(self, path, dtype):
+        """This Method maps one archive file, returns a view of its records"""
+        part = open(path, 'rb')
+        self._files.append(part)
+        size = os.path.getsize(path)
+        if size <= _HEADER.size:
+            return np.zeros(0, dtype)
+        mapped = mmap.mmap(part.fileno(), 0, access=mmap.ACCESS_READ)
+        self._maps.append(mapped)
+        if _HEADER.unpack_from(mapped) != (MAGIC, VERSION, dtype.itemsize):
+            raise ValueError(f'{path} is not a version {VERSION} pong archive')
+        count = (size - _HEADER.size) // dtype.itemsize
+        return np.frombuffer(mapped, dtype, count, _HEADER.size)
+
+    def __len__(self):
+        return len(self.index)
+
+    def match_ticks(self, match):
+        """This Method returns the TICK_DTYPE records of one match"""
+        entry = self.index[match]
+        first = int(entry['first_tick'])
+        return self.ticks[first:first + int(entry['ticks'])]
+
+    def match_keyframes(self, match):
+        """This Method returns the KEYFRAME_DTYPE records of one match"""
+        entry = self.index[match]
+        first = int(entry['first_keyframe'])
+        return self.keyframes[first:first + int(entry['keyframes'])]
+
+    def tick(self, match, tick):
+        """This Method returns the record of one tick of one match"""
+        if not 0 <= tick < self.index[match]['ticks']:
+            raise IndexError(f'match {match} has no tick {tick}')
+        return self.ticks[int(self.index[match]['first_tick']) + tick]
+
+    def keyframe_before(self, match, tick):
+        """This Method returns the last keyframe at or before tick, or None"""
+        keyframes = self.match_keyframes(match)
+        position = np.searchsorted(keyframes['tick'], tick, side='right')
+        return keyframes[position - 1] if position else None
+
+    def seek(self, scene, match, tick):
+        """This Method puts scene at the end of tick of match
+
+        The keyframe before tick is restored and the recorded input is
+        played from there, so at most keyframe_interval ticks are run.
+        """
+        keyframe = self.keyframe_before(match, tick)
+        if keyframe is None:
+            raise IndexError(f'match {match} has no keyframe before tick {tick}')
+        scene.restore(keyframe['snapshot'].tobytes())
+        inputs = self.match_ticks(match)['input']
+        for played in range(int(keyframe['tick']) + 1, tick + 1):
+            scene.set_player_input(*decode_input(inputs[played]))
+            scene.update()
+
+    def recording(self, match):
+        """This Method rebuilds the replay.Recording of a match so it can be played"""
+        entry = self.index[match]
+        ticks = self.match_ticks(match)
+        recording = Recording(int(entry['seed']), int(entry['width']),
+                              int(entry['height']), int(entry['frame_rate']))
+        inputs = ticks['input']
+        changed = np.flatnonzero(np.diff(inputs, prepend=np.uint8(0)))
+        recording.changes = [(int(tick), int(inputs[tick])) for tick in changed]
+        recording.checksums = array('I', ticks['checksum'].astype('=u4').tobytes())
+        recording._last_bits = recording.changes[-1][1] if recording.changes else 0
+        return recording
+
+    def iter_chunks(self, chunk_ticks=1 << 16):
+        """This Method yields views over every tick of the archive, chunk_ticks at a time"""
+        for start in range(0, len(self.ticks), chunk_ticks):
+            yield self.ticks[start:start + chunk_ticks]
+
+    def ball_heatmap(self, bins=(40, 25), chunk_ticks=1 << 16):
+        """This Method counts where the ball was on every tick of every match
+
+        Returns a bins shaped array over the court of the first match,
+        streamed chunk by chunk so the archive is never read whole.
+        """
+        if not len(self.index):
+            return np.zeros(bins, np.int64)
+        court = ((0, int(self.index[0]['width'])), (0, int(self.index[0]['height'])))
+        counts = np.zeros(bins, np.int64)
+        for chunk in self.iter_chunks(chunk_ticks):
+            (chunk_counts, _, _) = np.histogram2d(chunk['ball_x'], chunk['ball_y'], bins, court)
+            counts += chunk_counts.astype(np.int64)
+        return counts
+
+    def close(self):
+        """This Method unmaps and closes the archive"""
+        self.ticks = self.keyframes = self.index = None
+        for mapped in self._maps:
+            mapped.close()
+        for part in self._files:
+            part.close()
+        self._maps = []
+        self._files = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
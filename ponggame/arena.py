@@ -0,0 +1,491 @@
+"""This Module runs the arena: hundreds of balls against two to eight paddles
+
+Arena keeps every ball as structure-of-arrays like ponggame.batch and
+steps them all at once.  Paddles sit on the left, right, top and bottom
+sides in that order, a second paddle on a side splits it into two lanes,
+and every side with a paddle is a goal.  The player has paddle 0 on the
+left, every other paddle is steered by an OpponentAI-like rule that
+chases the ball that will reach its goal line first.
+
+Collision candidates come from a SpatialHash, a uniform grid that is
+updated incrementally: only the balls that changed cell are re-sorted,
+so a step costs O(balls) instead of O(balls ** 2) for the ball to ball
+collisions and O(balls near the paddle) for each paddle.
+
+A side loses a life for every ball that crosses its goal line; once it
+has none left, its paddles leave and it turns into a wall.  The player
+wins when every other side is out and loses when the left side is.
+"""
+import numpy as np
+from ponggame import sim
+from ponggame.batch import next_random, rebound_velocity, sweep_circle_rect
+
+LEFT = 0
+RIGHT = 1
+TOP = 2
+BOTTOM = 3
+SIDE_NAMES = ('left', 'right', 'top', 'bottom')
+
+DEFAULT_BALLS = 200
+DEFAULT_PADDLES = 4
+DEFAULT_LIVES = 20
+MAX_PADDLES = 8
+
+PADDLE_LENGTH = 120
+PADDLE_THICKNESS = 30
+PADDLE_INSET = 40 #from the edge of the court to the paddle, like the GameScene
+PADDLE_SPEED = 5
+GOAL_DEPTH = 30 #a ball this close to the edge of a goal side scores
+SERVE_SPEED = float(np.hypot(sim.DEFAULT_RADIUS * 0.3, sim.DEFAULT_RADIUS * 0.1))
+SERVE_SPREAD = np.pi / 4 #serves head at a goal, at most this far off square
+
+_REBOUND_FRACTIONS = np.array(sim._REBOUND_HEIGHTS)
+_NEIGHBORS = ((1, 0), (-1, 1), (0, 1), (1, 1)) #with the cell itself, every pair is found once
+
+
+class SpatialHash:
+    """This Class sorts points into a uniform grid of square cells
+
+    order holds the points sorted by cell and starts[cell] is where a
+    cell's points begin in it, so the points of a cell, or of a row of
+    cells, are one contiguous slice.  update() only moves the points
+    that changed cell and merges them back into the sorted order.
+    """
+    def __init__(self, width, height, cell_size):
+        self.cell_size = cell_size
+        self.columns = int(width // cell_size) + 1
+        self.rows = int(height // cell_size) + 1
+        self.cells = np.empty(0, dtype=np.int64)
+        self.order = np.empty(0, dtype=np.int64)
+        self.counts = np.zeros(self.columns * self.rows, dtype=np.int64)
+        self.starts = np.zeros(self.columns * self.rows + 1, dtype=np.int64)
+        self.moved = 0
+
+    def _cells_of(self, x_pos, y_pos):
+        """This Method returns the cell of every point, points off the grid go to its edge"""
+        column = np.clip((x_pos // self.cell_size).astype(np.int64), 0, self.columns - 1)
+        row = np.clip((y_pos // self.cell_size).astype(np.int64), 0, self.rows - 1)
+        return row * self.columns + column
+
+    def update(self, x_pos, y_pos):
+        """This Method re-buckets the points, returns how many changed cell"""
+        cells = self._cells_of(x_pos, y_pos)
+        if len(cells) != len(self.cells):
+            self.order = np.argsort(cells, kind='stable')
+            self.counts = np.bincount(cells, minlength=len(self.counts))
+            self.moved = len(cells)
+        else:
+            order = self.order
+            stayed = cells[order] == self.cells[order]
+            moved = order[~stayed]
+            self.moved = len(moved)
+            if not self.moved:
+                return 0
+            #the points that stayed are still sorted, merge the moved ones in
+            kept = order[stayed]
+            moved = moved[np.argsort(cells[moved], kind='stable')]
+            at = np.searchsorted(cells[kept], cells[moved], side='right')
+            self.order = np.insert(kept, at, moved)
+            np.subtract.at(self.counts, self.cells[moved], 1)
+            np.add.at(self.counts, cells[moved], 1)
+        self.cells = cells
+        np.cumsum(self.counts, out=self.starts[1:])
+        return self.moved
+
+    def pairs(self):
+        """This Method returns (first, second) arrays of every pair of points in neighboring cells
+
+        Each pair is listed once.  With cells at least as big as the
+        largest collision distance, every colliding pair is among them.
+        """
+        order = self.order
+        count = len(order)
+        if not count:
+            empty = np.empty(0, dtype=np.int64)
+            return (empty, empty)
+        sorted_cells = self.cells[order]
+        positions = np.arange(count)
+        #points later in the same cell
+        firsts = [positions + 1]
+        lengths = [self.starts[sorted_cells + 1] - positions - 1]
+        column = sorted_cells % self.columns
+        row = sorted_cells // self.columns
+        for (column_step, row_step) in _NEIGHBORS:
+            neighbor_column = column + column_step
+            neighbor_row = row + row_step
+            valid = (neighbor_column >= 0) & (neighbor_column < self.columns) \
+                & (neighbor_row < self.rows)
+            neighbor = np.where(valid, neighbor_row * self.columns + neighbor_column, 0)
+            firsts.append(self.starts[neighbor])
+            lengths.append(np.where(valid, self.counts[neighbor], 0))
+        first = np.concatenate(firsts)
+        length = np.concatenate(lengths)
+        owner = np.tile(positions, len(firsts))
+        total = int(length.sum())
+        #expand every (owner, first, length) run into its pairs
+        run_starts = np.cumsum(length) - length
+        within = np.arange(total) - np.repeat(run_starts, length)
+        return (order[np.repeat(owner, length)], order[np.repeat(first, length) + within])
+
+    def query(self, left, top, right, bottom):
+        """This Method returns the points in every cell the rectangle touches"""
+        (first_cell, last_cell) = self._cells_of(np.array([left, right]), np.array([top, bottom]))
+        first_column = first_cell % self.columns
+        last_column = last_cell % self.columns
+        slices = []
+        for row in range(first_cell // self.columns, last_cell // self.columns + 1):
+            start = self.starts[row * self.columns + first_column]
+            end = self.starts[row * self.columns + last_column + 1]
+            if end > start:
+                slices.append(self.order[start:end])
+        if not slices:
+            return np.empty(0, dtype=np.int64)
+        return np.concatenate(slices)
+
+
+def _fold(position, size):
+    """This Function reflects positions into [0, size] like a ball bouncing between two walls"""
+    position = np.mod(position, 2 * size)
+    return np.where(position > size, 2 * size - position, position)
+
+
+class Arena:
+    """This Class holds one arena match as arrays and steps it
+
+    balls is the ball count, paddles how many paddles (2 to 8) and lives
+    how many balls a side may let through, by default half the balls
+    but at least DEFAULT_LIVES.
+    """
+    def __init__(self, balls=DEFAULT_BALLS, paddles=DEFAULT_PADDLES, width=800, height=500,
+                 lives=None, seed=1, offset_range=sim.AI_OFFSET_RANGE, cell_size=None):
+        if not 2 <= paddles <= MAX_PADDLES:
+            raise ValueError(f'an arena has 2 to {MAX_PADDLES} paddles, not {paddles}')
+        self.width = width
+        self.height = height
+        self.radius = sim.DEFAULT_RADIUS
+        self.max_velocity = self.radius * 2
+        self.offset_range = offset_range
+        self.count = balls
+        self.frame = 0
+        self.winner = 0 #1 when the player won, 2 when the player lost
+
+        self.x = np.empty(balls)
+        self.y = np.empty(balls)
+        self.last_x = np.empty(balls)
+        self.last_y = np.empty(balls)
+        self.x_velocity = np.empty(balls)
+        self.y_velocity = np.empty(balls)
+        self.rebound_frames = np.zeros(balls, dtype=np.int32)
+        seeds = (np.arange(balls, dtype=np.uint64) + np.uint64(seed & 0xFFFFFFFF)) \
+            * np.uint64(0x9E3779B1) & np.uint64(0xFFFFFFFF)
+        self.rng_state = np.where(seeds == 0, 0x9E3779B9, seeds).astype(np.uint32)
+
+        #the sides get a paddle each in turn, a second one splits a side into lanes
+        sides = [index % 4 for index in range(paddles)]
+        self.goal = np.zeros(4, dtype=bool)
+        self.goal[sides] = True
+        if lives is None:
+            lives = max(DEFAULT_LIVES, balls // 2)
+        self.lives = np.where(self.goal, lives, 0)
+        self.paddle_side = np.array(sides, dtype=np.int8)
+        self.paddle_vertical = self.paddle_side < TOP
+        self.paddle_active = np.ones(paddles, dtype=bool)
+        self.paddle_x = np.empty(paddles)
+        self.paddle_y = np.empty(paddles)
+        self.paddle_width = np.where(self.paddle_vertical, PADDLE_THICKNESS, PADDLE_LENGTH)
+        self.paddle_height = np.where(self.paddle_vertical, PADDLE_LENGTH, PADDLE_THICKNESS)
+        self.lane_low = np.empty(paddles)
+        self.lane_high = np.empty(paddles)
+        self.ai_ball = np.full(paddles, -1, dtype=np.int64)
+        self.ai_offset = np.zeros(paddles)
+        self.ai_rng_state = (np.arange(paddles, dtype=np.uint32) * np.uint32(0x85EBCA6B)
+                             + np.uint32(sim.seed_random(seed))) | np.uint32(1)
+        self._lay_out_paddles(sides)
+
+        self.grid = SpatialHash(width, height, cell_size or 4 * self.radius)
+        self._serve(np.arange(balls))
+
+    def _lay_out_paddles(self, sides):
+        """This Method puts every paddle in the middle of its lane"""
+        (width, height) = (self.width, self.height)
+        #paddles keep clear of the corners the other sides' paddles use
+        corner = PADDLE_INSET + PADDLE_THICKNESS
+        for (index, side) in enumerate(sides):
+            lanes = sides.count(side)
+            lane = sides[:index].count(side)
+            if side < TOP:
+                (low, high) = (corner if self.goal[TOP] else 0,
+                               height - (corner if self.goal[BOTTOM] else 0))
+            else:
+                (low, high) = (corner if self.goal[LEFT] else 0,
+                               width - (corner if self.goal[RIGHT] else 0))
+            lane_size = (high - low) / lanes
+            self.lane_low[index] = low + lane * lane_size
+            self.lane_high[index] = low + (lane + 1) * lane_size - PADDLE_LENGTH
+            middle = (self.lane_low[index] + self.lane_high[index]) / 2
+            if side == LEFT:
+                (self.paddle_x[index], self.paddle_y[index]) = (PADDLE_INSET, middle)
+            elif side == RIGHT:
+                (self.paddle_x[index], self.paddle_y[index]) = (
+                    width - PADDLE_INSET - PADDLE_THICKNESS, middle)
+            elif side == TOP:
+                (self.paddle_x[index], self.paddle_y[index]) = (middle, PADDLE_INSET)
+            else:
+                (self.paddle_x[index], self.paddle_y[index]) = (
+                    middle, height - PADDLE_INSET - PADDLE_THICKNESS)
+
+    def _random(self, index):
+        """This Method returns a number in [0, 1) for every ball in index"""
+        self.rng_state[index] = next_random(self.rng_state[index])
+        return self.rng_state[index] / 4294967296.0
+
+    def _serve(self, index):
+        """This Method puts balls back near the middle, each heading for a goal still in play"""
+        if not len(index):
+            return
+        goals = np.flatnonzero(self.goal & (self.lives > 0))
+        if not len(goals):
+            goals = np.flatnonzero(self.goal)
+        self.x[index] = self.width * (0.2 + 0.6 * self._random(index))
+        self.y[index] = self.height * (0.2 + 0.6 * self._random(index))
+        side = goals[(self._random(index) * len(goals)).astype(np.int64)]
+        #left, right, top and bottom are headings of pi, 0, -pi/2 and pi/2
+        heading = np.choose(side, (np.pi, 0., -np.pi / 2, np.pi / 2))
+        heading += (self._random(index) * 2 - 1) * SERVE_SPREAD
+        self.x_velocity[index] = np.cos(heading) * SERVE_SPEED
+        self.y_velocity[index] = np.sin(heading) * SERVE_SPEED
+        self.last_x[index] = self.x[index] #jump, don't slide across the court
+        self.last_y[index] = self.y[index]
+        self.rebound_frames[index] = 0
+
+    def _collide_balls(self):
+        """This Method bounces touching balls off each other, returns events"""
+        (first, second) = self.grid.pairs()
+        x_gap = self.x[second] - self.x[first]
+        y_gap = self.y[second] - self.y[first]
+        distance_squared = x_gap * x_gap + y_gap * y_gap
+        reach = 2 * self.radius
+        touching = np.flatnonzero((distance_squared < reach * reach) & (distance_squared > 0))
+        if not len(touching):
+            return 0
+        (first, second) = (first[touching], second[touching])
+        distance = np.sqrt(distance_squared[touching])
+        x_normal = x_gap[touching] / distance
+        y_normal = y_gap[touching] / distance
+        #equal masses swap the part of their velocities along the normal
+        closing = (self.x_velocity[second] - self.x_velocity[first]) * x_normal \
+            + (self.y_velocity[second] - self.y_velocity[first]) * y_normal
+        closing = np.minimum(closing, 0.)
+        np.add.at(self.x_velocity, first, closing * x_normal)
+        np.add.at(self.y_velocity, first, closing * y_normal)
+        np.subtract.at(self.x_velocity, second, closing * x_normal)
+        np.subtract.at(self.y_velocity, second, closing * y_normal)
+        #and are pushed apart so they do not stay stuck together
+        push = (reach - distance) / 2
+        np.subtract.at(self.x, first, push * x_normal)
+        np.subtract.at(self.y, first, push * y_normal)
+        np.add.at(self.x, second, push * x_normal)
+        np.add.at(self.y, second, push * y_normal)
+        #a ball in several collisions at once can gain speed, keep it under max_velocity
+        balls = np.union1d(first, second)
+        speed = np.hypot(self.x_velocity[balls], self.y_velocity[balls])
+        scale = np.minimum(1., self.max_velocity / np.maximum(speed, 1e-9))
+        self.x_velocity[balls] *= scale
+        self.y_velocity[balls] *= scale
+        return sim.EVENT_WALL
+
+    def _bounce_walls(self):
+        """This Method bounces balls off the sides that are not goals, returns events"""
+        events = 0
+        walls = ~self.goal | (self.lives <= 0)
+        for (side, position, velocity, limit) in (
+                (LEFT, self.x, self.x_velocity, 0),
+                (RIGHT, self.x, self.x_velocity, self.width),
+                (TOP, self.y, self.y_velocity, 0),
+                (BOTTOM, self.y, self.y_velocity, self.height)):
+            if not walls[side]:
+                continue
+            if limit:
+                out = (position >= limit) & (velocity > 0)
+            else:
+                out = (position <= limit) & (velocity < 0)
+            if out.any():
+                velocity[out] *= -1
+                events |= sim.EVENT_WALL
+        return events
+
+    def _collide_paddles(self):
+        """This Method bounces balls off every paddle in play, returns events
+
+        The candidates of all paddles are swept in one go; a ball that
+        reaches two paddles in the same frame bounces off the first.
+        """
+        #a ball can have moved max_velocity and been pushed a radius since the grid was built
+        margin = 2 * self.radius + self.max_velocity
+        found = []
+        for paddle in np.flatnonzero(self.paddle_active):
+            (left, top) = (self.paddle_x[paddle], self.paddle_y[paddle])
+            balls = self.grid.query(left - margin, top - margin,
+                                    left + self.paddle_width[paddle] + margin,
+                                    top + self.paddle_height[paddle] + margin)
+            found.append((balls, np.full(len(balls), paddle)))
+        if not found:
+            return 0
+        index = np.concatenate([balls for (balls, _) in found])
+        paddle = np.concatenate([paddles for (_, paddles) in found])
+        ready = self.rebound_frames[index] == 0
+        (index, paddle) = (index[ready], paddle[ready])
+        if not len(index):
+            return 0
+        (left, top) = (self.paddle_x[paddle], self.paddle_y[paddle])
+        (width, height) = (self.paddle_width[paddle], self.paddle_height[paddle])
+        (last_x, last_y) = (self.last_x[index], self.last_y[index])
+        (move_x, move_y) = (self.x[index] - last_x, self.y[index] - last_y)
+        (hit, time, x_normal, y_normal) = sweep_circle_rect(
+            last_x, last_y, move_x, move_y, self.radius, left, top, width, height)
+        if not hit.any():
+            return 0
+        hit = np.flatnonzero(hit)
+        (_, first) = np.unique(index[hit], return_index=True)
+        hit = hit[first]
+        (index, paddle, time) = (index[hit], paddle[hit], time[hit])
+        (x_normal, y_normal) = (x_normal[hit], y_normal[hit])
+        self.x[index] = last_x[hit] + move_x[hit] * time
+        self.y[index] = last_y[hit] + move_y[hit] * time
+        #vertical paddles pick the rebound angle along y, horizontal ones along x
+        vertical = self.paddle_vertical[paddle]
+        along = np.where(vertical, self.y[index], self.x[index])
+        start = np.where(vertical, top[hit], left[hit])
+        length = np.where(vertical, height[hit], width[hit])
+        direction = np.argmin(np.abs(start[:, None] + length[:, None] * _REBOUND_FRACTIONS
+                                     - along[:, None]), axis=1)
+        (x_velocity, y_velocity) = (self.x_velocity[index], self.y_velocity[index])
+        (face_x, face_y) = rebound_velocity(x_velocity, y_velocity, x_normal, y_normal, direction)
+        #the same rebound angles with the axes swapped
+        (side_y, side_x) = rebound_velocity(y_velocity, x_velocity, y_normal, x_normal, direction)
+        x_velocity = np.where(vertical, face_x, side_x)
+        y_velocity = np.where(vertical, face_y, side_y)
+        faster = x_velocity * x_velocity + y_velocity * y_velocity \
+            < self.max_velocity * self.max_velocity
+        self.x_velocity[index] = np.where(faster, x_velocity * 1.1, x_velocity)
+        self.y_velocity[index] = np.where(faster, y_velocity * 1.1, y_velocity)
+        self.rebound_frames[index] = sim.REBOUND_FRAMES
+        return sim.EVENT_PADDLE
+
+    def _score(self):
+        """This Method takes a life for every ball in a goal and serves it again, returns events"""
+        events = 0
+        for (side, position, limit) in (
+                (LEFT, self.x, GOAL_DEPTH),
+                (RIGHT, self.x, self.width - GOAL_DEPTH),
+                (TOP, self.y, GOAL_DEPTH),
+                (BOTTOM, self.y, self.height - GOAL_DEPTH)):
+            if not self.goal[side] or self.lives[side] <= 0:
+                continue
+            if side in (LEFT, TOP):
+                scored = np.flatnonzero(position <= limit)
+            else:
+                scored = np.flatnonzero(position >= limit)
+            if not len(scored):
+                continue
+            events |= sim.EVENT_POINT
+            if not self.winner:
+                self.lives[side] = max(0, self.lives[side] - len(scored))
+                if not self.lives[side]:
+                    self.paddle_active[self.paddle_side == side] = False
+                    self._check_winner()
+            self._serve(scored)
+        return events
+
+    def _check_winner(self):
+        """This Method ends the match once the player or every other side is out"""
+        if self.lives[LEFT] <= 0:
+            self.winner = 2
+        elif not (self.goal & (self.lives > 0))[LEFT + 1:].any():
+            self.winner = 1
+
+    def _steer_ais(self, paddles):
+        """This Method returns -1, 0 or 1 for every AI paddle, to move it back or on along its lane
+
+        Every paddle chases the ball that reaches its face first of the
+        balls coming into its lane, solved for all paddles at once.
+        """
+        vertical = self.paddle_vertical[paddles, None]
+        side = self.paddle_side[paddles, None]
+        position = np.where(vertical, self.x, self.y)
+        velocity = np.where(vertical, self.x_velocity, self.y_velocity)
+        across = np.where(vertical, self.y, self.x)
+        across_velocity = np.where(vertical, self.y_velocity, self.x_velocity)
+        size = np.where(vertical, self.height, self.width)
+        near_side = (side == LEFT) | (side == TOP)
+        face = np.where(vertical, self.paddle_x[paddles, None], self.paddle_y[paddles, None]) \
+            + np.where(near_side, PADDLE_THICKNESS, 0)
+        toward = np.where(near_side, velocity < 0, velocity > 0)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            time = np.where(toward, (face - position) / velocity, np.inf)
+        time[time < 0] = np.inf
+        heading = _fold(across + across_velocity * np.where(np.isfinite(time), time, 0.), size)
+        #only the balls coming into each paddle's lane
+        time[(heading < self.lane_low[paddles, None])
+             | (heading > self.lane_high[paddles, None] + PADDLE_LENGTH)] = np.inf
+        balls = np.argmin(time, axis=1)
+        directions = []
+        for (row, paddle) in enumerate(paddles):
+            ball = int(balls[row])
+            if not np.isfinite(time[row, ball]):
+                self.ai_ball[paddle] = -1
+                target = (self.lane_low[paddle] + self.lane_high[paddle] + PADDLE_LENGTH) / 2
+            else:
+                if ball != self.ai_ball[paddle]:
+                    #a new ball to chase, aim somewhere else on the paddle like OpponentAI
+                    self.ai_ball[paddle] = ball
+                    (offset, state) = sim.random_offset(int(self.ai_rng_state[paddle]),
+                                                        PADDLE_LENGTH * self.offset_range)
+                    (self.ai_offset[paddle], self.ai_rng_state[paddle]) = (offset, state)
+                target = heading[row, ball] + self.ai_offset[paddle]
+            paddle_position = self.paddle_y[paddle] if self.paddle_vertical[paddle] \
+                else self.paddle_x[paddle]
+            (going_back, going_on) = sim.ai_direction(
+                target, paddle_position, PADDLE_LENGTH, self.lane_low[paddle],
+                self.lane_high[paddle], PADDLE_SPEED)
+            directions.append(going_on - going_back)
+        return directions
+
+    def _move_paddle(self, paddle, direction):
+        """This Method moves a paddle along its lane, -1 back, 1 on"""
+        if self.paddle_vertical[paddle]:
+            positions = self.paddle_y
+        else:
+            positions = self.paddle_x
+        positions[paddle] = min(max(positions[paddle] + direction * PADDLE_SPEED,
+                                    self.lane_low[paddle]), self.lane_high[paddle])
+
+    def step(self, going_up=False, going_down=False):
+        """This Method advances the arena one frame, returns its sim.EVENT_ flags
+
+        going_up and going_down are the player's keys for paddle 0.
+        """
+        np.copyto(self.last_x, self.x)
+        np.copyto(self.last_y, self.y)
+        self.x += self.x_velocity
+        self.y += self.y_velocity
+        self.grid.update(self.x, self.y)
+        events = self._collide_balls()
+        events |= self._bounce_walls()
+        events |= self._collide_paddles()
+        events |= self._score()
+        self.rebound_frames[self.rebound_frames != 0] -= 1
+        if self.paddle_active[0]:
+            self._move_paddle(0, int(going_down) - int(going_up))
+        paddles = np.flatnonzero(self.paddle_active[1:]) + 1
+        if len(paddles) and self.count:
+            for (paddle, direction) in zip(paddles, self._steer_ais(paddles)):
+                self._move_paddle(paddle, direction)
+        self.frame += 1
+        return events
+
+    def paddle_rects(self):
+        """This Method returns (left, top, width, height) of every paddle in play"""
+        return [(int(self.paddle_x[index]), int(self.paddle_y[index]),
+                 int(self.paddle_width[index]), int(self.paddle_height[index]))
+                for index in np.flatnonzero(self.paddle_active)]
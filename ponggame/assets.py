@@ -0,0 +1,139 @@
+"""This Module loads sounds and music once and shares them
+
+Decoding a wav into a pygame.mixer.Sound takes far longer than a frame,
+and the GameScene builds a new Ball for every match, so sounds are kept
+in a registry keyed by (path, volume) and decoded only the first time.
+Music streams from its file, but opening and parsing the file is done in
+the frame the scene starts; prefetch_music reads the file into memory on
+a background thread ahead of time, and play_music hands pygame those
+bytes when they are ready.
+
+Sounds and the loaded music belong to the mixer they were made with, so
+the registry empties itself when pygame quits and the next pygame.init()
+decodes them again.
+
+A file that is missing or a mixer that cannot play it is not fatal: a
+warning is printed once and the game runs without that sound.
+"""
+import io
+import threading
+import pygame
+
+_sounds = {}
+_music = {}
+_music_lock = threading.Lock()
+_loaded_music = None
+_warned = set()
+_clears_on_quit = False
+
+
+def _warn(path, error):
+    """This Function prints one warning per asset that could not be loaded"""
+    if path not in _warned:
+        _warned.add(path)
+        print(f'Warning: cannot open {path}, playing without it ({error})')
+
+
+def _clear_on_quit():
+    """This Function has the next pygame.quit() clear the registry, pygame forgets it after"""
+    global _clears_on_quit # pylint: disable=global-statement
+    if not _clears_on_quit:
+        _clears_on_quit = True
+        pygame.register_quit(_on_quit)
+
+
+def _on_quit():
+    """This Function clears the registry, pygame.quit() calls it"""
+    global _clears_on_quit # pylint: disable=global-statement
+    _clears_on_quit = False
+    clear()
+
+
+def get_sound(path, volume=1.0):
+    """This Function returns the shared Sound for path at volume, or None
+
+    None means the sound could not be loaded, callers skip playing it.
+    """
+    key = (path, volume)
+    if key in _sounds:
+        return _sounds[key]
+    _clear_on_quit()
+    sound = None
+    try:
+        sound = pygame.mixer.Sound(path)
+        sound.set_volume(volume)
+    except (pygame.error, OSError) as error:
+        _warn(path, error)
+    _sounds[key] = sound
+    return sound
+
+
+def get_channel(number):
+    """This Function returns mixer channel number, or None without a mixer"""
+    try:
+        return pygame.mixer.Channel(number)
+    except pygame.error as error:
+        _warn('the mixer', error)
+        return None
+
+
+def _read_music(path):
+    """This Function reads a music file into memory, run on a background thread"""
+    try:
+        with open(path, 'rb') as music_file:
+            data = music_file.read()
+    except OSError as error:
+        data = error
+    with _music_lock:
+        _music[path] = data
+
+
+def prefetch_music(path):
+    """This Function starts reading path in the background, returns at once"""
+    if not path:
+        return
+    with _music_lock:
+        if path in _music:
+            return
+        _music[path] = None #being read
+    threading.Thread(target=_read_music, args=(path,), name='prefetch_music',
+                     daemon=True).start()
+
+
+def play_music(path, volume=1.0, loops=-1, fade_ms=0):
+    """This Function plays path as the music, returns if it could
+
+    The prefetched bytes are used if they have arrived, otherwise the
+    file is opened as usual.  Music that is already loaded is restarted
+    without being loaded again.
+    """
+    global _loaded_music # pylint: disable=global-statement
+    try:
+        if path != _loaded_music:
+            with _music_lock:
+                data = _music.get(path)
+            if isinstance(data, OSError):
+                raise data
+            _clear_on_quit()
+            if data is None:
+                pygame.mixer.music.load(path)
+            else:
+                #the stream reads from the BytesIO while it plays
+                pygame.mixer.music.load(io.BytesIO(data), path)
+            _loaded_music = path
+        pygame.mixer.music.set_volume(volume)
+        pygame.mixer.music.play(loops, 0.0, fade_ms)
+    except (pygame.error, OSError) as error:
+        _loaded_music = None
+        _warn(path, error)
+        return False
+    return True
+
+
+def clear():
+    """This Function forgets every loaded sound and prefetched music file"""
+    global _loaded_music # pylint: disable=global-statement
+    _sounds.clear()
+    with _music_lock:
+        _music.clear()
+    _loaded_music = None
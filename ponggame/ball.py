@@ -1,19 +1,42 @@
 
 import pygame
 import os
+import struct
+from ponggame import assets, sim
+from ponggame.timers import Timer
+
+#position, velocity, red, green, flags, score, ticks until the rebound guard and the serve end
+_SNAPSHOT = struct.Struct('<4dBBBBHH')
 
 class Ball:
 
+    #no per-ball __dict__, and update changes its vectors in place instead of making new ones
+    __slots__ = (
+        '_start_position', '_position', '_last_position', '_draw_from_position',
+        '_velocity', '_move', '_max_velocity', '_surface', '_paddle_list', '_radius', '_color',
+        '_is_sound_on', '_scored_left', '_round_in_progress', '_game_is_over', '_score',
+        '_timers', '_rebound_timer', '_serve_timer', '_drawn_rect', '_bounce_sound',
+        '_bounce_channel', '__weakref__',
+    )
+
     main_dir = os.path.split(os.path.abspath(__file__))[0]  #this gives the directory that the file is in
     data_dir = os.path.join(main_dir, 'data')               #this puts the data directory into the main_dir
     bounce_sound = os.path.join(data_dir, 'ball_bounce.wav') #replace this with a bounce sound
 
     default_radius = 5
+    start_delay = 840    #ticks before the first serve
+    reset_delay = 60     #ticks before the serve after a point
+    rebound_frames = 40  #ticks a ball that hit a paddle cannot hit one again
+    SNAPSHOT_SIZE = _SNAPSHOT.size
 
-    def __init__(self, surface, paddle_list, x_pos = 0, y_pos = 0, x_velocity = 0, y_velocity = 0):
+    def __init__(self, surface, paddle_list, x_pos = 0, y_pos = 0, x_velocity = 0, y_velocity = 0,
+                 *, timers):
         self._start_position = pygame.math.Vector2(x_pos, y_pos) #initializes ball position with a vector
         self._position = pygame.math.Vector2(x_pos, y_pos) #initializes ball position with a vector
+        self._last_position = pygame.math.Vector2(x_pos, y_pos)
+        self._draw_from_position = pygame.math.Vector2(x_pos, y_pos)
         self._velocity = pygame.math.Vector2(x_velocity, y_velocity)
+        self._move = pygame.math.Vector2() #scratch for the move swept in _bounce
         self._max_velocity = Ball.default_radius * 2
         self._surface = surface
         self._paddle_list = paddle_list
@@ -24,63 +47,136 @@ class Ball:
         self._round_in_progress = False         #used to reset ball
         self._game_is_over = False              #used to stop ball
         self._score = 0
-        self._rebound_frames = 0
-        self._reset_timer = 840
+        self._drawn_rect = None
+        #the match's TimerWheel, whoever updates the ball advances it right after
+        self._timers = timers
+        self._rebound_timer = Timer()
+        self._serve_timer = Timer(self, Ball._serve)
+        self._schedule_serve(Ball.start_delay)
 
-        
-        try:
-            self._bounce_sound = pygame.mixer.Sound(Ball.bounce_sound)
-            pygame.mixer.Sound.set_volume(self._bounce_sound, 0.2)
-            self._bounce_channel = pygame.mixer.Channel(2)
-        except pygame.error as pygame_error:
-            print(f'Cannot open {Ball.bounce_sound}')
-            raise SystemExit(1) from pygame_error
+        #decoded once and shared by every ball, None if it could not be loaded
+        self._bounce_sound = assets.get_sound(Ball.bounce_sound, 0.2)
+        self._bounce_channel = assets.get_channel(2) if self._bounce_sound else None
 
 
-    def draw(self):
-        pygame.draw.circle(
+    def draw(self, alpha=1.0):
+        #alpha of the way from where the last update started
+        self._drawn_rect = pygame.draw.circle(
             self._surface, 
             self._color, 
-            self._position, 
+            self._draw_from_position.lerp(self._position, alpha), 
             self._radius
         )
 
+    def get_drawn_rects(self):
+        return [self._drawn_rect] if self._drawn_rect else []
+
     def update(self):
-        self._position = self._position + self._velocity
+        self._last_position.update(self._position)
+        self._draw_from_position.update(self._position)
+        self._position += self._velocity
         self._bounce()
-        if self._rebound_frames:
-            self._rebound_frames = self._rebound_frames - 1
-        if not self._round_in_progress and not self._reset_timer:
+
+    def _schedule_serve(self, delay):
+        #serves on the update after delay more, when the old per-tick counter served
+        self._timers.schedule(self._serve_timer, delay + 1)
+
+    def _serve(self):
+        #the serve timer calls this
+        if not self._round_in_progress:
             self.start()
-        elif not self._game_is_over:
-            self._reset_timer -= 1
-        
 
     def start(self):
         if self._scored_left:
-            self._velocity = pygame.math.Vector2(Ball.default_radius * 0.3, Ball.default_radius * 0.1)
+            self._velocity.update(Ball.default_radius * 0.3, Ball.default_radius * 0.1)
         else: 
-            self._velocity = pygame.math.Vector2(Ball.default_radius * -0.3, Ball.default_radius * -0.1)
+            self._velocity.update(Ball.default_radius * -0.3, Ball.default_radius * -0.1)
         self._round_in_progress = True
 
     def stop(self):
-        self._velocity = pygame.math.Vector2(0, 0)
+        self._velocity.update(0, 0)
 
     def _reset(self):
-        self._position = self._start_position
-        self._velocity = pygame.math.Vector2(0, 0)
-        self._color = pygame.Color((0, 255, 0))
+        self._position.update(self._start_position) #a copy, _start_position never moves
+        self._velocity.update(0, 0)
+        self._color.update(0, 255, 0)
         self._round_in_progress = False
-        self._reset_timer = 60
+        self._schedule_serve(Ball.reset_delay)
+        self._draw_from_position.update(self._position) #jump, don't slide across the court
 
     def get_position(self):
         return [self._position.x, self._position.y]
 
+    def get_velocity(self):
+        return [self._velocity.x, self._velocity.y]
+
+    def get_state(self):
+        #everything the next update depends on, as plain numbers
+        return (
+            self._position.x,
+            self._position.y,
+            self._velocity.x,
+            self._velocity.y,
+            self._color.r,
+            self._color.g,
+            self._scored_left,
+            self._round_in_progress,
+            self._game_is_over,
+            self._score,
+            self._timers.remaining(self._rebound_timer),
+            self._timers.remaining(self._serve_timer),
+        )
+
+    def snapshot(self):
+        #the ball packed into SNAPSHOT_SIZE bytes, see restore
+        flags = self._scored_left | self._round_in_progress << 1 | self._game_is_over << 2
+        return _SNAPSHOT.pack(
+            self._position.x,
+            self._position.y,
+            self._velocity.x,
+            self._velocity.y,
+            self._color.r,
+            self._color.g,
+            flags,
+            self._score,
+            self._timers.remaining(self._rebound_timer),
+            self._timers.remaining(self._serve_timer),
+        )
+
+    def restore(self, data, offset=0):
+        #puts the ball back where snapshot was taken, returns the offset after it
+        (x_pos, y_pos, x_velocity, y_velocity, red, green, flags, self._score,
+         rebound_ticks, serve_ticks) = _SNAPSHOT.unpack_from(data, offset)
+        self._position.update(x_pos, y_pos)
+        self._last_position.update(x_pos, y_pos)
+        self._draw_from_position.update(x_pos, y_pos)
+        self._velocity.update(x_velocity, y_velocity)
+        self._color.update(red, green, 0)
+        self._scored_left = bool(flags & 1)
+        self._round_in_progress = bool(flags & 2)
+        self._game_is_over = bool(flags & 4)
+        #0 is a timer that was not pending
+        for (timer, ticks) in ((self._rebound_timer, rebound_ticks),
+                               (self._serve_timer, serve_ticks)):
+            if ticks:
+                self._timers.schedule(timer, ticks)
+            else:
+                self._timers.cancel(timer)
+        return offset + _SNAPSHOT.size
+
+    def get_radius(self):
+        return self._radius
+
     def get_point(self):
         score = (self._score, self._scored_left) #returns int and boolean of who scored
         self._score = 0
         return score
 
+    def get_draw_state(self):
+        #where and how draw puts the ball, equal tuples draw the same
+        return (tuple(self._draw_from_position) + tuple(self._position)
+                + tuple(self._color) + (self._radius,))
+
     @property
     def is_moving(self):
         return self._velocity.length_squared() > 0 #we use length_squared because it is faster to do a^2 + b^2 rather than sqrt(a^2 + b^2)
@@ -90,45 +186,28 @@ class Ball:
 
     def set_game_over(self):
         self._game_is_over = True
-        self._color = pygame.Color(0, 0, 0)
+        self._color.update(0, 0, 0)
+        self._timers.cancel(self._serve_timer) #never serves again
 
     def _play_sfx(self):
-        if self._is_sound_on:
+        if self._is_sound_on and self._bounce_channel:
             self._bounce_channel.play(self._bounce_sound)
 
-    def _change_angle(self, direction):
-
+    def _change_angle(self, direction, x_normal=-1., y_normal=0.):
         #negative angle sends upwards, positive sends downwards
-        if direction == 0:
-            new_angle = -70
-        elif direction == 1:
-            new_angle = -45
-        elif direction == 2:
-            new_angle = -20
-        elif direction == 3:
-            new_angle = 0
-        elif direction == 4:
-            new_angle = 20
-        elif direction == 5:
-            new_angle = 45
-        elif direction == 6:
-            new_angle = 70
-
-        new_vec = pygame.math.Vector2(self._velocity.length())
-        new_vec.y = 0
-        new_vec = new_vec.rotate(new_angle)
-        if self._velocity.x > 0 and direction in (0, 1, 2, 3):
-            new_vec.x = -1 * new_vec.x
-        elif self._velocity.x > 0 and direction in (4, 5, 6):
-            new_vec.x = -1 * new_vec.x
-
-        self._velocity = new_vec
+        self._velocity.update(sim.rebound_velocity(
+            self._velocity.x,
+            self._velocity.y,
+            x_normal,
+            y_normal,
+            direction))
 
 
     def _bounce(self):
         (width, height) = self._surface.get_size()
         bounced_paddle = False
-        if self._position.x >= width - 30 or self._position.x <= 30:
+        scored = self._position.x >= width - 30 or self._position.x <= 30
+        if scored:
             if self._position.x >= width / 2:
                 self._scored_left = False
             else:
@@ -137,19 +216,21 @@ class Ball:
             self._reset()
         if self._position.y >= height or self._position.y <= 0:
             bounced_paddle = True
-            self._velocity = pygame.math.Vector2(self._velocity.x, self._velocity.y * -1)
-        for _, paddle in enumerate(self._paddle_list):
-            if paddle.collide(self._position, self._velocity, self._radius):
-                if self._position.x < width / 2 and not self._rebound_frames:
-                    self._change_angle(paddle.rebound_direction(self._position.y))
-                    #self._velocity.x = abs(self._velocity.x)
-                    bounced_paddle = True
-                    self._rebound_frames = 40
-                elif self._position.x > width / 2 and not self._rebound_frames:
-                    self._change_angle(paddle.rebound_direction(self._position.y))
-                    #self._velocity.x = -1 * abs(self._velocity.x)
-                    bounced_paddle = True
-                    self._rebound_frames = 40
+            self._velocity.y = self._velocity.y * -1
+        move = self._move
+        move.update(self._position)
+        move -= self._last_position
+        for paddle in self._paddle_list:
+            if scored or self._rebound_timer.pending:
+                break
+            hit = paddle.collide(self._last_position, move, self._radius)
+            if hit:
+                (time, x_normal, y_normal) = hit
+                self._position.update(self._last_position.x + move.x * time,
+                                      self._last_position.y + move.y * time)
+                self._change_angle(paddle.rebound_direction(self._position.y), x_normal, y_normal)
+                bounced_paddle = True
+                self._timers.schedule(self._rebound_timer, Ball.rebound_frames)
         # this will play the sound of the ball bouncing when it bounces and it will increase the ball's velocity
         if bounced_paddle:
             self._play_sfx()
@@ -0,0 +1,447 @@
+"""This Module steps many headless matches at once with NumPy
+
+BatchMatch keeps N matches as structure-of-arrays and runs the rules of
+ponggame.sim on all of them with one vectorized step.  The scalar sim is
+the reference: from_states()/to_state() move matches between the two so
+they can be checked against each other frame by frame.
+"""
+import numpy as np
+from ponggame import sim
+
+_REBOUND_FRACTIONS = np.array(sim._REBOUND_HEIGHTS)
+_REBOUND_COS = np.array([rotation[0] for rotation in sim._REBOUND_ROTATIONS])
+_REBOUND_SIN = np.array([rotation[1] for rotation in sim._REBOUND_ROTATIONS])
+
+
+def next_random(rng_state):
+    """This Function advances an array of 32 bit xorshift generators"""
+    rng_state = rng_state ^ (rng_state << np.uint32(13))
+    rng_state = rng_state ^ (rng_state >> np.uint32(17))
+    return rng_state ^ (rng_state << np.uint32(5))
+
+
+def _slab(position, move, low, high):
+    """This Function is sim._slab for arrays"""
+    with np.errstate(divide='ignore', invalid='ignore'):
+        to_low = (low - position) / move
+        to_high = (high - position) / move
+    inside = (low <= position) & (position <= high)
+    near = np.where(move > 0, to_low, to_high)
+    far = np.where(move > 0, to_high, to_low)
+    near = np.where(move == 0, np.where(inside, -np.inf, np.inf), near)
+    far = np.where(move == 0, np.where(inside, np.inf, -np.inf), far)
+    return (near, far)
+
+
+def sweep_circle_rect(x_pos, y_pos, x_move, y_move, rad, left, top, width, height):
+    """This Function is sim.sweep_circle_rect for arrays of balls and rects
+
+    Returns (hit, time, x_normal, y_normal) arrays.
+    """
+    right = left + width
+    bottom = top + height
+    with np.errstate(divide='ignore', invalid='ignore'):
+        #already touching
+        x_gap = x_pos - np.minimum(np.maximum(x_pos, left), right)
+        y_gap = y_pos - np.minimum(np.maximum(y_pos, top), bottom)
+        distance_squared = x_gap * x_gap + y_gap * y_gap
+        touching = distance_squared <= rad * rad
+        distance = np.sqrt(distance_squared)
+        depths = np.stack((x_pos - left, right - x_pos, y_pos - top, bottom - y_pos))
+        side = np.argmin(depths, axis=0)
+        inside = distance_squared == 0
+        touch_x = np.where(inside, np.choose(side, (-1., 1., 0., 0.)), x_gap / distance)
+        touch_y = np.where(inside, np.choose(side, (0., 0., -1., 1.)), y_gap / distance)
+        touch_hit = touching & (x_move * touch_x + y_move * touch_y < 0)
+
+        #slabs of the rect grown by the radius
+        (x_near, x_far) = _slab(x_pos, x_move, left - rad, right + rad)
+        (y_near, y_far) = _slab(y_pos, y_move, top - rad, bottom + rad)
+        enter = np.maximum(np.maximum(0., x_near), y_near)
+        crossing = ~touching & (enter <= np.minimum(np.minimum(1., x_far), y_far))
+        hit_x = x_pos + x_move * enter
+        hit_y = y_pos + y_move * enter
+        y_face = (y_near > x_near) & (y_near > 0)
+        x_face = ~y_face & (x_near > 0)
+        y_face &= (left <= hit_x) & (hit_x <= right)
+        x_face &= (top <= hit_y) & (hit_y <= bottom)
+        face_hit = crossing & (x_face | y_face)
+
+        #corner arcs
+        corner_x = x_pos - np.where(hit_x < left, left, right)
+        corner_y = y_pos - np.where(hit_y < top, top, bottom)
+        a_term = x_move * x_move + y_move * y_move
+        b_term = corner_x * x_move + corner_y * y_move
+        c_term = corner_x * corner_x + corner_y * corner_y - rad * rad
+        discriminant = b_term * b_term - a_term * c_term
+        corner_time = (-b_term - np.sqrt(discriminant)) / a_term
+        corner_hit = crossing & ~face_hit & (a_term != 0) & (discriminant >= 0) \
+            & (corner_time >= 0) & (corner_time <= 1)
+
+        time = np.where(touch_hit, 0., np.where(face_hit, enter, corner_time))
+        x_normal = np.where(touch_hit, touch_x, np.where(
+            face_hit,
+            np.where(x_face, -np.copysign(1., x_move), 0.),
+            (corner_x + x_move * corner_time) / rad))
+        y_normal = np.where(touch_hit, touch_y, np.where(
+            face_hit,
+            np.where(x_face, 0., -np.copysign(1., y_move)),
+            (corner_y + y_move * corner_time) / rad))
+    return (touch_hit | face_hit | corner_hit, time, x_normal, y_normal)
+
+
+def rebound_velocity(x_velocity, y_velocity, x_normal, y_normal, direction):
+    """This Function is sim.rebound_velocity for arrays"""
+    speed = np.sqrt(x_velocity * x_velocity + y_velocity * y_velocity)
+    face_x = _REBOUND_COS[direction] * speed
+    face_x = np.copysign(np.where(x_velocity > 0, -1 * face_x, face_x), x_normal)
+    face_y = _REBOUND_SIN[direction] * speed
+    dot = x_velocity * x_normal + y_velocity * y_normal
+    face = np.abs(x_normal) >= np.abs(y_normal)
+    return (np.where(face, face_x, x_velocity - 2 * dot * x_normal),
+            np.where(face, face_y, y_velocity - 2 * dot * y_normal))
+
+
+class BatchMatch:
+    """This Class holds N matches as arrays and steps them together"""
+    def __init__(self, count, width=800, height=500, seed=1,
+                 winning_points=sim.WINNING_POINTS, paddle_height=120,
+                 paddle_speed=5, ai_delay=sim.AI_DELAY, offset_range=sim.AI_OFFSET_RANGE):
+        self.count = count
+        self.width = width
+        self.height = height
+        self.winning_points = winning_points
+        self.radius = sim.DEFAULT_RADIUS
+        self.max_velocity = self.radius * 2
+        self.start_x = width / 2
+        self.start_y = height / 2
+        self.left_x = 40
+        self.right_x = width - 70
+        self.paddle_width = 30
+
+        #per match settings, so one batch can hold a whole parameter sweep
+        self.left_height = np.full(count, paddle_height, dtype=np.float64)
+        self.right_height = np.full(count, paddle_height, dtype=np.float64)
+        self.left_speed = np.full(count, paddle_speed, dtype=np.float64)
+        self.right_speed = np.full(count, paddle_speed, dtype=np.float64)
+        self.start_ai_delay = np.full(count, ai_delay, dtype=np.int32)
+        self.offset_range = np.full(count, offset_range, dtype=np.float64)
+
+        self.x = np.empty(count)
+        self.y = np.empty(count)
+        self.x_velocity = np.empty(count)
+        self.y_velocity = np.empty(count)
+        self.red = np.empty(count, dtype=np.int16)
+        self.green = np.empty(count, dtype=np.int16)
+        self.scored_left = np.empty(count, dtype=bool)
+        self.round_in_progress = np.empty(count, dtype=bool)
+        self.game_is_over = np.empty(count, dtype=bool)
+        self.ball_score = np.empty(count, dtype=np.int8)
+        self.rebound_frames = np.empty(count, dtype=np.int32)
+        self.reset_timer = np.empty(count, dtype=np.int32)
+
+        self.left_y = np.empty(count)
+        self.left_up = np.empty(count, dtype=bool)
+        self.left_down = np.empty(count, dtype=bool)
+        self.right_y = np.empty(count)
+        self.right_up = np.empty(count, dtype=bool)
+        self.right_down = np.empty(count, dtype=bool)
+        self.ai_delay = np.empty(count, dtype=np.int32)
+        self.ball_offset = np.empty(count)
+        self.target_y = np.empty(count)
+        self.solved_x_velocity = np.empty(count)
+        self.solved_y_velocity = np.empty(count)
+        self.approaching = np.empty(count, dtype=bool)
+
+        self.score_one = np.empty(count, dtype=np.int32)
+        self.score_two = np.empty(count, dtype=np.int32)
+        self.winner = np.empty(count, dtype=np.int8)
+        self.rng_state = np.empty(count, dtype=np.uint32)
+        self.frame = np.empty(count, dtype=np.int64)
+        self.reset(seeds=np.arange(seed, seed + count))
+
+    def reset(self, indices=None, seeds=None):
+        """This Method starts the chosen matches (all by default) over"""
+        if indices is None:
+            indices = np.arange(self.count)
+        indices = np.asarray(indices)
+        self.x[indices] = self.start_x
+        self.y[indices] = self.start_y
+        self.x_velocity[indices] = 0.
+        self.y_velocity[indices] = 0.
+        self.red[indices] = sim.BALL_COLOR[0]
+        self.green[indices] = sim.BALL_COLOR[1]
+        self.scored_left[indices] = False
+        self.round_in_progress[indices] = False
+        self.game_is_over[indices] = False
+        self.ball_score[indices] = 0
+        self.rebound_frames[indices] = 0
+        self.reset_timer[indices] = sim.START_DELAY
+        self.left_y[indices] = (self.height / 2) - (self.left_height[indices] / 2)
+        self.left_up[indices] = False
+        self.left_down[indices] = False
+        self.right_y[indices] = (self.height / 2) - (self.right_height[indices] / 2)
+        self.right_up[indices] = False
+        self.right_down[indices] = False
+        self.ai_delay[indices] = self.start_ai_delay[indices]
+        self.ball_offset[indices] = 0
+        self.target_y[indices] = self.height / 2
+        self.solved_x_velocity[indices] = np.nan
+        self.solved_y_velocity[indices] = np.nan
+        self.approaching[indices] = False
+        self.score_one[indices] = 0
+        self.score_two[indices] = 0
+        self.winner[indices] = 0
+        self.frame[indices] = 0
+        if seeds is not None:
+            seeds = np.asarray(seeds, dtype=np.int64) & 0xFFFFFFFF
+            self.rng_state[indices] = np.where(seeds == 0, 0x9E3779B9, seeds)
+
+    @classmethod
+    def from_states(cls, states):
+        """This Method packs a list of sim.MatchState into a batch"""
+        first = states[0]
+        batch = cls(len(states), first.width, first.height, winning_points=first.winning_points)
+        for index, state in enumerate(states):
+            batch.set_state(index, state)
+        return batch
+
+    def set_state(self, index, state):
+        """This Method copies one sim.MatchState into slot index"""
+        ball = state.ball
+        (self.x[index], self.y[index]) = (ball.x, ball.y)
+        (self.x_velocity[index], self.y_velocity[index]) = (ball.x_velocity, ball.y_velocity)
+        (self.red[index], self.green[index]) = (ball.red, ball.green)
+        self.scored_left[index] = ball.scored_left
+        self.round_in_progress[index] = ball.round_in_progress
+        self.game_is_over[index] = ball.game_is_over
+        self.ball_score[index] = ball.score
+        self.rebound_frames[index] = ball.rebound_frames
+        self.reset_timer[index] = ball.reset_timer
+        (left, right) = (state.left, state.right)
+        self.left_height[index] = left.height
+        self.left_speed[index] = left.speed
+        self.left_y[index] = left.y
+        (self.left_up[index], self.left_down[index]) = (left.going_up, left.going_down)
+        self.right_height[index] = right.height
+        self.right_speed[index] = right.speed
+        self.right_y[index] = right.y
+        (self.right_up[index], self.right_down[index]) = (right.going_up, right.going_down)
+        self.ai_delay[index] = right.ai_delay
+        self.offset_range[index] = right.offset_range
+        self.ball_offset[index] = right.ball_offset
+        self.target_y[index] = right.target_y
+        self.solved_x_velocity[index] = right.solved_x_velocity
+        self.solved_y_velocity[index] = right.solved_y_velocity
+        self.approaching[index] = right.approaching
+        self.score_one[index] = state.score_one
+        self.score_two[index] = state.score_two
+        self.winner[index] = state.winner
+        self.rng_state[index] = state.rng_state
+        self.frame[index] = state.frame
+
+    def to_state(self, index):
+        """This Method unpacks slot index into a new sim.MatchState"""
+        state = sim.MatchState(self.width, self.height, winning_points=self.winning_points)
+        ball = state.ball
+        (ball.x, ball.y) = (float(self.x[index]), float(self.y[index]))
+        ball.x_velocity = float(self.x_velocity[index])
+        ball.y_velocity = float(self.y_velocity[index])
+        (ball.red, ball.green) = (int(self.red[index]), int(self.green[index]))
+        ball.scored_left = bool(self.scored_left[index])
+        ball.round_in_progress = bool(self.round_in_progress[index])
+        ball.game_is_over = bool(self.game_is_over[index])
+        ball.score = int(self.ball_score[index])
+        ball.rebound_frames = int(self.rebound_frames[index])
+        ball.reset_timer = int(self.reset_timer[index])
+        state.left = sim.PaddleState(self.height, self.left_x, self.paddle_width,
+                                     self.left_height[index].item(), self.left_speed[index].item())
+        state.left.y = float(self.left_y[index])
+        state.left.going_up = bool(self.left_up[index])
+        state.left.going_down = bool(self.left_down[index])
+        state.right = sim.AIState(self.height, self.right_x, self.paddle_width,
+                                  self.right_height[index].item(), self.right_speed[index].item(),
+                                  int(self.ai_delay[index]), self.offset_range[index].item())
+        state.right.y = float(self.right_y[index])
+        state.right.going_up = bool(self.right_up[index])
+        state.right.going_down = bool(self.right_down[index])
+        state.right.ball_offset = int(self.ball_offset[index])
+        state.right.target_y = float(self.target_y[index])
+        state.right.solved_x_velocity = float(self.solved_x_velocity[index])
+        state.right.solved_y_velocity = float(self.solved_y_velocity[index])
+        state.right.approaching = bool(self.approaching[index])
+        state.paddles = (state.left, state.right)
+        state.score_one = int(self.score_one[index])
+        state.score_two = int(self.score_two[index])
+        state.winner = int(self.winner[index])
+        state.rng_state = int(self.rng_state[index])
+        state.frame = int(self.frame[index])
+        return state
+
+    def _collide_paddle(self, paddle_x, paddle_y, paddle_height,
+                        last_x, last_y, move_x, move_y, skip, events):
+        """This Method does one paddle of the Ball._bounce paddle loop"""
+        reach = self.paddle_width / 2 + self.radius
+        center = paddle_x + self.paddle_width / 2
+        near = (np.minimum(last_x, self.x) <= center + reach) \
+            & (np.maximum(last_x, self.x) >= center - reach)
+        near &= ~skip & (self.rebound_frames == 0)
+        index = np.flatnonzero(near)
+        if not index.size:
+            return
+        (hit, time, x_normal, y_normal) = sweep_circle_rect(
+            last_x[index], last_y[index], move_x[index], move_y[index], self.radius,
+            paddle_x, np.trunc(paddle_y[index]), self.paddle_width, paddle_height[index])
+        index = index[hit]
+        if not index.size:
+            return
+        time = time[hit]
+        self.x[index] = last_x[index] + move_x[index] * time
+        self.y[index] = last_y[index] + move_y[index] * time
+        distance = np.abs(paddle_y[index, None] + paddle_height[index, None]
+                          * _REBOUND_FRACTIONS - self.y[index, None])
+        direction = np.argmin(distance, axis=1)
+        (self.x_velocity[index], self.y_velocity[index]) = rebound_velocity(
+            self.x_velocity[index], self.y_velocity[index],
+            x_normal[hit], y_normal[hit], direction)
+        self.rebound_frames[index] = sim.REBOUND_FRAMES
+        events[index] |= sim.EVENT_PADDLE
+
+    def _update_ball(self, events):
+        """This Method is sim._update_ball for every match"""
+        last_x = self.x.copy()
+        last_y = self.y.copy()
+        self.x += self.x_velocity
+        self.y += self.y_velocity
+        move_x = self.x - last_x
+        move_y = self.y - last_y
+        out = (self.x >= self.width - 30) | (self.x <= 30)
+        if out.any():
+            self.scored_left[out] = self.x[out] < self.width / 2
+            self.ball_score[out] = 1
+            self.x[out] = self.start_x
+            self.y[out] = self.start_y
+            self.x_velocity[out] = 0.
+            self.y_velocity[out] = 0.
+            self.red[out] = sim.BALL_COLOR[0]
+            self.green[out] = sim.BALL_COLOR[1]
+            self.round_in_progress[out] = False
+            self.reset_timer[out] = sim.RESET_DELAY
+        wall = (self.y >= self.height) | (self.y <= 0)
+        self.y_velocity[wall] *= -1
+        events[wall] |= sim.EVENT_WALL
+        for (paddle_x, paddle_y, paddle_height) in (
+                (self.left_x, self.left_y, self.left_height),
+                (self.right_x, self.right_y, self.right_height)):
+            self._collide_paddle(paddle_x, paddle_y, paddle_height,
+                                 last_x, last_y, move_x, move_y, out, events)
+
+        bounced = events != 0
+        bounced &= self.x_velocity * self.x_velocity + self.y_velocity * self.y_velocity \
+            < self.max_velocity * self.max_velocity
+        self.x_velocity[bounced] *= 1.1
+        self.y_velocity[bounced] *= 1.1
+        redden = bounced & (self.red + 10 <= 255) & (self.green - 10 >= 0)
+        self.red[redden] += 15
+        self.green[redden] -= 15
+
+        self.rebound_frames[self.rebound_frames != 0] -= 1
+        serve = ~self.round_in_progress & (self.reset_timer == 0)
+        if serve.any():
+            speed = np.where(self.scored_left[serve], sim.DEFAULT_RADIUS, -sim.DEFAULT_RADIUS)
+            self.x_velocity[serve] = speed * 0.3
+            self.y_velocity[serve] = speed * 0.1
+            self.round_in_progress[serve] = True
+        self.reset_timer[~serve & ~self.game_is_over] -= 1
+
+    def _update_left(self):
+        """This Method is sim._update_paddle for the left paddles"""
+        lower_bound = self.height - self.left_height
+        down = self.left_down & (self.left_y <= lower_bound - 20)
+        up = ~down & self.left_up & (self.left_y >= 20)
+        self.left_y[down] += self.left_speed[down]
+        self.left_y[up] -= self.left_speed[up]
+
+    def _solve_ai(self, changed):
+        """This Method is sim._solve_ai for the matches in the changed mask"""
+        index = np.flatnonzero(changed)
+        x_velocity = self.x_velocity[index]
+        y_velocity = self.y_velocity[index]
+        self.solved_x_velocity[index] = x_velocity
+        self.solved_y_velocity[index] = y_velocity
+        x_pos = self.x[index]
+        goal_x = sim.ai_goal_x(self.right_x, self.paddle_width, self.width, self.radius)
+        heading = (goal_x - x_pos) * x_velocity >= 0
+        heading &= x_velocity != 0
+        with np.errstate(divide='ignore', invalid='ignore'):
+            y_pos = self.y[index] + y_velocity * (goal_x - x_pos) / x_velocity
+        period = 2 * self.height
+        y_pos = np.mod(y_pos, period)
+        y_pos = np.where(y_pos > self.height, period - y_pos, y_pos)
+
+        new_offset = index[heading & ~self.approaching[index]]
+        if new_offset.size:
+            rng_state = next_random(self.rng_state[new_offset])
+            self.rng_state[new_offset] = rng_state
+            half_range = self.right_height[new_offset] * self.offset_range[new_offset]
+            span = (half_range * 2).astype(np.int64)
+            offset = rng_state.astype(np.int64) % np.maximum(span, 1) \
+                - half_range.astype(np.int64)
+            self.ball_offset[new_offset] = np.where(span > 0, offset, 0)
+        self.approaching[index] = heading
+        self.target_y[index] = np.where(heading, y_pos + self.ball_offset[index], self.height / 2)
+
+    def _update_ai(self):
+        """This Method is sim._update_ai for the right paddles"""
+        thinking = self.ai_delay == 0
+        self.ai_delay[~thinking] -= 1
+        changed = thinking & ((self.x_velocity != self.solved_x_velocity)
+                              | (self.y_velocity != self.solved_y_velocity))
+        if changed.any():
+            self._solve_ai(changed)
+
+        height = self.right_height
+        paddle_y = self.right_y
+        speed = self.right_speed
+        center = paddle_y + height / 2
+        going_up = (self.target_y < center - speed) & (paddle_y - speed >= 0)
+        going_down = ~going_up & (self.target_y > center + speed) \
+            & (paddle_y + speed <= self.height - height)
+        self.right_up = np.where(thinking, going_up, self.right_up)
+        self.right_down = np.where(thinking, going_down, self.right_down)
+        self.right_y[self.right_up] -= speed[self.right_up]
+        down = ~self.right_up & self.right_down
+        self.right_y[down] += speed[down]
+
+    def _update_score(self, events):
+        """This Method is sim._update_score for every match"""
+        point = self.ball_score > 0
+        events[point] |= sim.EVENT_POINT
+        self.score_one += np.where(point & ~self.scored_left, self.ball_score, 0)
+        self.score_two += np.where(point & self.scored_left, self.ball_score, 0)
+        self.ball_score[point] = 0
+        one_won = self.score_one == self.winning_points
+        two_won = ~one_won & (self.score_two == self.winning_points)
+        over = one_won | two_won
+        events[over & (self.winner == 0)] |= sim.EVENT_GAME_OVER
+        self.winner[one_won] = 1
+        self.winner[two_won & (self.winner == 0)] = 2
+        self.game_is_over |= over
+        self.red[over] = 0
+        self.green[over] = 0
+
+    def step(self, going_up=None, going_down=None):
+        """This Method advances every match one frame and returns their events
+
+        going_up/going_down are bool arrays for the left paddles, None
+        means no input.
+        """
+        self.left_up[:] = False if going_up is None else going_up
+        self.left_down[:] = False if going_down is None else going_down
+        events = np.zeros(self.count, dtype=np.uint8)
+        self._update_ball(events)
+        self._update_left()
+        self._update_ai()
+        self._update_score(events)
+        self.frame += 1
+        return events
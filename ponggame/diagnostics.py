@@ -0,0 +1,204 @@
+"""This Module counts the memory every phase of a frame allocates and logs GC pauses
+
+FrameDiagnostics is a FrameProfiler that also charges the memory
+allocated since the previous lap to the phase of every lap.  The
+sub-phases the scenes already time (update.ball, update.paddles,
+draw.Ball, draw.Paddle, draw.Overlay, ...) get their own numbers, and a
+phase like draw keeps what its sub-phases did not allocate.  For each
+phase and frame it stores the net bytes and memory blocks allocated and
+the peak of short-lived bytes.  Memory is counted with tracemalloc, which
+makes the whole game slower, so it is opt-in.
+
+Every run of the cyclic garbage collector is timed through gc.callbacks,
+added to its frame as the gc phase and logged with the frame it paused
+and how far into that frame it started.
+
+hold_gc and release_gc keep the collector from pausing a scene in play,
+see GC_MODES.
+"""
+import gc
+import sys
+import time
+import tracemalloc
+from array import array
+from collections import deque
+from ponggame.profiler import FrameProfiler, _percentile
+
+#normal: collect as usual
+#freeze: collect once when a scene starts, then move everything alive out of the
+#        collector's reach with gc.freeze so collections only visit new objects
+#off:    collect once when a scene starts and not again until it stops, cycles
+#        made during the scene pile up until then
+GC_MODES = ('normal', 'freeze', 'off')
+
+ALLOCATION_METRICS = ('bytes', 'blocks', 'peak_bytes')
+
+
+def hold_gc(mode):
+    """This Function collects once and keeps the collector out of the scene about to run"""
+    if mode == 'normal':
+        return
+    gc.collect()
+    if mode == 'freeze':
+        gc.freeze()
+    else:
+        gc.disable()
+
+
+def release_gc(mode):
+    """This Function undoes hold_gc once the scene stopped"""
+    if mode == 'freeze':
+        gc.unfreeze()
+    elif mode == 'off':
+        gc.enable()
+
+
+class FrameDiagnostics(FrameProfiler):
+    """This Class records what every phase of a frame allocated and every GC pause"""
+    def __init__(self, capacity=2048, max_pauses=1024):
+        self._allocations = {}
+        self._current_allocations = {}
+        super().__init__(capacity)
+        self._pauses = deque(maxlen=max_pauses)
+        self._pause_count = 0
+        self._gc_start = None
+        self._in_frame = False
+        self._started_tracing = not tracemalloc.is_tracing()
+        if self._started_tracing:
+            tracemalloc.start()
+        self._mark = (tracemalloc.get_traced_memory()[0], sys.getallocatedblocks())
+        gc.callbacks.append(self._on_gc)
+
+    def _add_phase(self, phase):
+        """This Method starts the time and allocation ring buffers of a new phase"""
+        super()._add_phase(phase)
+        self._allocations[phase] = {
+            metric: array('q', bytes(8 * self._capacity)) for metric in ALLOCATION_METRICS}
+
+    def begin_frame(self):
+        """This Method starts timing and counting a new frame, returns the start time"""
+        for totals in self._current_allocations.values():
+            totals[0] = totals[1] = totals[2] = 0 #reused, so counting allocates nothing
+        self._charge(None) #between frames, charged to nothing
+        self._in_frame = True
+        return super().begin_frame()
+
+    def lap(self, phase, start):
+        """This Method charges the time since start and the memory since the last lap to phase"""
+        now = super().lap(phase, start)
+        self._charge(phase)
+        return now
+
+    def _charge(self, phase):
+        """This Method adds what was allocated since the last charge to phase"""
+        (current, peak) = tracemalloc.get_traced_memory()
+        blocks = sys.getallocatedblocks()
+        (last_bytes, last_blocks) = self._mark
+        if phase is not None:
+            totals = self._current_allocations.get(phase)
+            if totals is None:
+                totals = self._current_allocations[phase] = array('q', (0, 0, 0))
+            totals[0] += current - last_bytes
+            totals[1] += blocks - last_blocks
+            totals[2] = max(totals[2], peak - last_bytes)
+        self._mark = (current, blocks)
+        tracemalloc.reset_peak()
+
+    def end_frame(self):
+        """This Method stores the current frame, its allocations summed up as the frame phase"""
+        super().end_frame()
+        self._in_frame = False
+        slot = (self._frame_count - 1) % self._capacity
+        (frame_bytes, frame_blocks, frame_peak) = (0, 0, 0)
+        for totals in self._current_allocations.values():
+            frame_bytes += totals[0]
+            frame_blocks += totals[1]
+            frame_peak = max(frame_peak, totals[2])
+        for phase in self._phases:
+            if phase == 'frame':
+                totals = (frame_bytes, frame_blocks, frame_peak)
+            else:
+                totals = self._current_allocations.get(phase, (0, 0, 0))
+            rings = self._allocations[phase]
+            rings['bytes'][slot] = totals[0]
+            rings['blocks'][slot] = totals[1]
+            rings['peak_bytes'][slot] = totals[2]
+
+    def _on_gc(self, phase, info):
+        """This Method times a collection, gc calls it when one starts and stops"""
+        if phase == 'start':
+            self._gc_start = time.perf_counter()
+            return
+        if self._gc_start is None: #started before the callback was added
+            return
+        seconds = time.perf_counter() - self._gc_start
+        self.add('gc', seconds)
+        self._pauses.append({
+            'frame': self._frame_count,
+            #None for a pause between frames, such as the one hold_gc asks for
+            'at_ms': (self._gc_start - self._frame_start) * 1000 if self._in_frame else None,
+            'generation': info['generation'],
+            'ms': seconds * 1000,
+            'collected': info['collected'],
+            'uncollectable': info['uncollectable'],
+        })
+        self._pause_count += 1
+        self._gc_start = None
+
+    @property
+    def gc_pauses(self):
+        """This Property returns the last max_pauses GC pauses, oldest first"""
+        return list(self._pauses)
+
+    @property
+    def gc_pause_count(self):
+        """This Property returns how many GC pauses there were in total"""
+        return self._pause_count
+
+    def allocation_samples(self, phase, metric='bytes'):
+        """This Method returns the stored allocations of a phase, oldest first"""
+        return self._oldest_first(self._allocations[phase][metric])
+
+    def allocation_summary(self):
+        """This Method returns mean, p95 and max of every allocation metric for every phase"""
+        result = {}
+        for phase in self._phases:
+            result[phase] = {}
+            for metric in ALLOCATION_METRICS:
+                samples = self.allocation_samples(phase, metric)
+                ordered = sorted(samples)
+                result[phase][metric] = {
+                    'mean': sum(samples) / len(samples) if samples else 0.0,
+                    'p95': _percentile(ordered, 95),
+                    'max': ordered[-1] if ordered else 0,
+                }
+        return result
+
+    def report(self):
+        """This Method returns the FrameProfiler report with the allocations and GC pauses"""
+        report = super().report()
+        report['allocations'] = self.allocation_summary()
+        report['allocation_samples'] = {
+            phase: {metric: self.allocation_samples(phase, metric)
+                    for metric in ALLOCATION_METRICS}
+            for phase in self._phases}
+        report['gc_pause_count'] = self._pause_count
+        report['gc_pauses'] = self.gc_pauses
+        return report
+
+    def _columns(self):
+        """This Method adds a column per phase and allocation metric to the CSV"""
+        (names, columns) = super()._columns()
+        for phase in self._phases:
+            for metric in ALLOCATION_METRICS:
+                names.append(f'{phase}_{metric}')
+                columns.append(self.allocation_samples(phase, metric))
+        return (names, columns)
+
+    def close(self):
+        """This Method stops listening to gc and stops tracemalloc if it started it"""
+        if self._on_gc in gc.callbacks:
+            gc.callbacks.remove(self._on_gc)
+        if self._started_tracing:
+            tracemalloc.stop()
+            self._started_tracing = False
@@ -0,0 +1,316 @@
+"""This Module wraps the headless game rules as Gym-style training environments
+
+The agent plays the left paddle against the OpponentAI.  Every env has
+the same interface as a Gymnasium env, without depending on it:
+
+    observation = env.reset(seed)
+    (observation, reward, terminated, truncated, info) = env.step(action)
+
+An action is NOOP, UP or DOWN.  An observation is OBSERVATION_SIZE
+float32s (see OBSERVATION_FIELDS), scaled so the court is 0 to 1 and the
+ball's top speed is 1.  The reward is +1 when the agent scores and -1
+when the AI does, the same points Ball.get_point hands the Overlay.  A
+match is terminated when someone wins and truncated after max_frames.
+
+Observations, rewards and done flags are written into preallocated
+arrays that are returned again on the next step; copy them to keep them.
+
+PongEnv runs one match on ponggame.sim, VecPongEnv runs many in lockstep
+on ponggame.batch and SubprocVecEnv splits a VecPongEnv over worker
+processes that share their arrays with the parent through shared memory.
+"""
+import multiprocessing
+from multiprocessing import shared_memory
+import numpy as np
+from ponggame import sim
+from ponggame.batch import BatchMatch
+
+NOOP = 0
+UP = 1
+DOWN = 2
+ACTION_COUNT = 3
+
+OBSERVATION_FIELDS = (
+    'ball_x',
+    'ball_y',
+    'ball_x_velocity',
+    'ball_y_velocity',
+    'left_y',
+    'right_y',
+    'score_one',
+    'score_two',
+)
+OBSERVATION_SIZE = len(OBSERVATION_FIELDS)
+
+DEFAULT_FRAME_SKIP = 4
+DEFAULT_MAX_FRAMES = 36000
+WORKER_SEED_STRIDE = 1 << 24 #seeds a worker can use before running into the next one
+
+_ACTION_INPUTS = (sim.NO_INPUT, (True, False), (False, True))
+
+
+class PongEnv:
+    """This Class is one match against the OpponentAI on the scalar sim
+
+    frame_skip repeats every action for that many frames and sums the
+    rewards, like the Atari frame skip.
+    """
+    def __init__(self, frame_skip=DEFAULT_FRAME_SKIP, max_frames=DEFAULT_MAX_FRAMES,
+                 width=800, height=500):
+        self.frame_skip = frame_skip
+        self.max_frames = max_frames
+        self._size = (width, height)
+        self._state = None
+        self._observation = np.zeros(OBSERVATION_SIZE, dtype=np.float32)
+        self._next_seed = 1
+
+    def reset(self, seed=None):
+        """This Method starts a new match, returns the first observation"""
+        if seed is None:
+            seed = self._next_seed
+        self._next_seed = seed + 1
+        self._state = sim.MatchState(*self._size, seed=seed)
+        return self._observe()
+
+    def step(self, action):
+        """This Method plays action for frame_skip frames"""
+        state = self._state
+        inputs = _ACTION_INPUTS[action]
+        (score_one, score_two) = (state.score_one, state.score_two)
+        for _ in range(self.frame_skip):
+            sim.step(state, inputs)
+            if state.winner:
+                break
+        reward = (state.score_one - score_one) - (state.score_two - score_two)
+        terminated = bool(state.winner)
+        truncated = not terminated and state.frame >= self.max_frames
+        return (self._observe(), float(reward), terminated, truncated,
+                {'frame': state.frame, 'winner': state.winner})
+
+    def _observe(self):
+        """This Method writes the state into the observation array"""
+        state = self._state
+        ball = state.ball
+        observation = self._observation
+        observation[0] = ball.x / state.width
+        observation[1] = ball.y / state.height
+        observation[2] = ball.x_velocity / ball.max_velocity
+        observation[3] = ball.y_velocity / ball.max_velocity
+        observation[4] = state.left.y / state.height
+        observation[5] = state.right.y / state.height
+        observation[6] = state.score_one / state.winning_points
+        observation[7] = state.score_two / state.winning_points
+        return observation
+
+
+class VecPongEnv:
+    """This Class runs count matches in lockstep on a BatchMatch
+
+    step takes an array of count actions.  A match that ends is started
+    again on the same step with the next seed, and the observation it
+    ended on is kept in final_observations.  Extra keyword arguments go
+    to BatchMatch, so a batch can train against several AI settings.
+    """
+    def __init__(self, count, frame_skip=DEFAULT_FRAME_SKIP, max_frames=DEFAULT_MAX_FRAMES,
+                 seed=1, buffers=None, **batch_options):
+        self.count = count
+        self.frame_skip = frame_skip
+        self.max_frames = max_frames
+        self._batch = BatchMatch(count, seed=seed, **batch_options)
+        self._next_seed = seed #the first reset plays seed to seed + count - 1, like SubprocVecEnv
+        if buffers is None:
+            buffers = allocate_buffers(count)
+        (self.observations, self.rewards, self.terminated, self.truncated,
+         self.final_observations) = buffers
+        self._going_up = np.zeros(count, dtype=bool)
+        self._going_down = np.zeros(count, dtype=bool)
+        self._live = np.zeros(count, dtype=bool)
+        self._score_one = np.zeros(count, dtype=np.int32)
+        self._score_two = np.zeros(count, dtype=np.int32)
+
+    def reset(self, seed=None):
+        """This Method starts every match again, returns the observations"""
+        if seed is not None:
+            self._next_seed = seed
+        self._batch.reset(seeds=np.arange(self._next_seed, self._next_seed + self.count))
+        self._next_seed += self.count
+        self._observe()
+        return self.observations
+
+    def step(self, actions):
+        """This Method plays one action per match for frame_skip frames
+
+        Returns (observations, rewards, terminated, truncated, info), all
+        arrays owned by the env.
+        """
+        batch = self._batch
+        actions = np.asarray(actions)
+        np.equal(actions, UP, out=self._going_up)
+        np.equal(actions, DOWN, out=self._going_down)
+        np.copyto(self._score_one, batch.score_one)
+        np.copyto(self._score_two, batch.score_two)
+        self._live.fill(True)
+        for _ in range(self.frame_skip):
+            #a finished match stands still until it is reset
+            batch.step(self._going_up & self._live, self._going_down & self._live)
+            self._live &= batch.winner == 0
+        np.subtract(batch.score_one, self._score_one, out=self._score_one)
+        np.subtract(batch.score_two, self._score_two, out=self._score_two)
+        np.subtract(self._score_one, self._score_two, out=self.rewards, casting='unsafe')
+        np.not_equal(batch.winner, 0, out=self.terminated)
+        np.greater_equal(batch.frame, self.max_frames, out=self.truncated)
+        self.truncated &= ~self.terminated
+        self._observe()
+        done = np.flatnonzero(self.terminated | self.truncated)
+        if len(done):
+            self.final_observations[done] = self.observations[done]
+            batch.reset(done, np.arange(self._next_seed, self._next_seed + len(done)))
+            self._next_seed += len(done)
+            self._observe()
+        return (self.observations, self.rewards, self.terminated, self.truncated, {})
+
+    def _observe(self):
+        """This Method writes every match into the observations array"""
+        batch = self._batch
+        observations = self.observations
+        np.divide(batch.x, batch.width, out=observations[:, 0], casting='unsafe')
+        np.divide(batch.y, batch.height, out=observations[:, 1], casting='unsafe')
+        np.divide(batch.x_velocity, batch.max_velocity, out=observations[:, 2], casting='unsafe')
+        np.divide(batch.y_velocity, batch.max_velocity, out=observations[:, 3], casting='unsafe')
+        np.divide(batch.left_y, batch.height, out=observations[:, 4], casting='unsafe')
+        np.divide(batch.right_y, batch.height, out=observations[:, 5], casting='unsafe')
+        np.divide(batch.score_one, batch.winning_points, out=observations[:, 6], casting='unsafe')
+        np.divide(batch.score_two, batch.winning_points, out=observations[:, 7], casting='unsafe')
+
+
+def _buffer_specs(count):
+    """This Function returns (shape, dtype) of every array a vector env hands out"""
+    return (
+        ((count, OBSERVATION_SIZE), np.float32),
+        ((count,), np.float32),
+        ((count,), bool),
+        ((count,), bool),
+        ((count, OBSERVATION_SIZE), np.float32),
+    )
+
+
+def allocate_buffers(count):
+    """This Function returns fresh observation, reward and done arrays for count envs"""
+    return tuple(np.zeros(shape, dtype) for (shape, dtype) in _buffer_specs(count))
+
+
+def _shared_buffers(memory, count, offset=0, total=None):
+    """This Function lays the vector env arrays of rows offset:offset+count over memory"""
+    total = count if total is None else total
+    buffers = []
+    position = 0
+    for (shape, dtype) in _buffer_specs(total):
+        array = np.ndarray(shape, dtype, memory.buf, position)
+        position += array.nbytes
+        buffers.append(array[offset:offset + count])
+    return tuple(buffers)
+
+
+def _shared_size(count):
+    """This Function returns how many bytes the arrays of count envs take"""
+    return sum(int(np.prod(shape)) * np.dtype(dtype).itemsize
+               for (shape, dtype) in _buffer_specs(count))
+
+
+def _worker(connection, memory_name, action_name, total, offset, count, options):
+    """This Function runs part of a SubprocVecEnv in a worker process"""
+    memory = shared_memory.SharedMemory(memory_name)
+    action_memory = shared_memory.SharedMemory(action_name)
+    actions = np.ndarray((total,), np.int8, action_memory.buf)[offset:offset + count]
+    env = VecPongEnv(count, buffers=_shared_buffers(memory, count, offset, total), **options)
+    try:
+        while True:
+            (command, argument) = connection.recv()
+            if command == 'step':
+                env.step(actions)
+            elif command == 'reset':
+                env.reset(argument)
+            else:
+                break
+            connection.send(None)
+    finally:
+        del env, actions
+        memory.close()
+        action_memory.close()
+
+
+class SubprocVecEnv:
+    """This Class splits count matches over worker processes
+
+    The observations, rewards, done flags and actions live in shared
+    memory, so a step only sends one short message to each worker.
+    """
+    def __init__(self, count, workers=None, frame_skip=DEFAULT_FRAME_SKIP,
+                 max_frames=DEFAULT_MAX_FRAMES, seed=1, **batch_options):
+        workers = min(count, workers or multiprocessing.cpu_count())
+        self.count = count
+        self._memory = shared_memory.SharedMemory(create=True, size=_shared_size(count))
+        self._action_memory = shared_memory.SharedMemory(create=True, size=count)
+        (self.observations, self.rewards, self.terminated, self.truncated,
+         self.final_observations) = _shared_buffers(self._memory, count)
+        self._actions = np.ndarray((count,), np.int8, self._action_memory.buf)
+        self._connections = []
+        self._processes = []
+        self._seeds = [seed + index * WORKER_SEED_STRIDE for index in range(workers)]
+        bounds = np.linspace(0, count, workers + 1).astype(int)
+        for (index, (start, end)) in enumerate(zip(bounds[:-1], bounds[1:])):
+            (parent, child) = multiprocessing.Pipe()
+            options = dict(batch_options, frame_skip=frame_skip, max_frames=max_frames,
+                           seed=self._seeds[index])
+            process = multiprocessing.Process(
+                target=_worker,
+                args=(child, self._memory.name, self._action_memory.name, count,
+                      int(start), int(end - start), options),
+                daemon=True)
+            process.start()
+            child.close()
+            self._connections.append(parent)
+            self._processes.append(process)
+
+    def _broadcast(self, command, arguments):
+        """This Method sends a command to every worker and waits for all of them"""
+        for (connection, argument) in zip(self._connections, arguments):
+            connection.send((command, argument))
+        for connection in self._connections:
+            connection.recv()
+
+    def reset(self, seed=None):
+        """This Method starts every match again, returns the observations"""
+        seeds = self._seeds if seed is None else [seed + index * WORKER_SEED_STRIDE
+                                                   for index in range(len(self._seeds))]
+        self._broadcast('reset', seeds)
+        self._seeds = [None] * len(self._seeds) #later resets continue each worker's seeds
+        return self.observations
+
+    def step(self, actions):
+        """This Method plays one action per match in every worker, like VecPongEnv.step"""
+        self._actions[:] = actions
+        self._broadcast('step', [None] * len(self._connections))
+        return (self.observations, self.rewards, self.terminated, self.truncated, {})
+
+    def close(self):
+        """This Method stops the workers and frees the shared memory"""
+        if not self._processes:
+            return
+        for connection in self._connections:
+            connection.send(('close', None))
+        for process in self._processes:
+            process.join()
+        self._processes = []
+        del self.observations, self.rewards, self.terminated, self.truncated
+        del self.final_observations, self._actions
+        self._memory.close()
+        self._memory.unlink()
+        self._action_memory.close()
+        self._action_memory.unlink()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
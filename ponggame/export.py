@@ -0,0 +1,245 @@
+"""This Module renders recorded matches to video or PNG files without a window
+
+The replay is played once headless to take a GameScene snapshot at the
+start of every chunk of ticks.  Worker processes then restore those
+snapshots and draw their chunks with the scene's own draw() on an
+off-screen surface, so rendering spreads over every core.
+
+PNGs are written by the workers themselves.  For a video the parent
+pipes raw RGB frames into ffmpeg in tick order; every worker has its own
+queue of at most queue_frames frames, so memory stays bounded however
+long the match is.  The parent polls the queues, so a worker that dies
+without a word (a crash, the OOM killer) fails the export instead of
+leaving it waiting forever.
+
+    python -m ponggame.export match.rep frames/          #numbered PNGs
+    python -m ponggame.export match.rep match.mp4        #needs ffmpeg on the PATH
+    python -m ponggame.export match.rep - | encoder ...  #raw rgb24 on stdout
+"""
+import argparse
+import multiprocessing
+import os
+import shutil
+import subprocess
+import sys
+import time
+import traceback
+from queue import Empty
+
+#the pygame banner would end up in the raw frames written to stdout
+os.environ.setdefault('PYGAME_HIDE_SUPPORT_PROMPT', '1')
+
+import pygame # pylint: disable=wrong-import-position
+from ponggame.pixels import offscreen_scene # pylint: disable=wrong-import-position
+from ponggame.replay import Recording, ReplayMismatchError, decode_input # pylint: disable=wrong-import-position
+
+DEFAULT_EVERY = 2 #draw every other tick, 60 fps for the 120 tick GameScene
+DEFAULT_QUEUE_FRAMES = 16
+_POLL_SECONDS = 0.5 #how often a waiting parent checks its worker is still alive
+
+_CHUNK_DONE = None
+
+
+def _init_pygame():
+    """This Function starts pygame without a window or sound card"""
+    os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+    os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+    pygame.mixer.pre_init(44100, -16, 2, 512)
+    pygame.init()
+
+
+def plan_chunks(recording, chunk_ticks, first_tick=0, last_tick=None):
+    """This Function plays recording headless, returns [(start, end, snapshot)]
+
+    Each snapshot is the match before tick start, and the checksums are
+    verified on the way.
+    """
+    last_tick = recording.ticks if last_tick is None else min(last_tick, recording.ticks)
+    scene = offscreen_scene((recording.width, recording.height), recording.seed)
+    inputs = recording.inputs()
+    chunks = []
+    for tick in range(last_tick):
+        if tick >= first_tick and (tick - first_tick) % chunk_ticks == 0:
+            chunks.append((tick, min(tick + chunk_ticks, last_tick), scene.snapshot()))
+        scene.set_player_input(*decode_input(inputs[tick]))
+        scene.update()
+        if scene.checksum() != recording.checksums[tick]:
+            raise ReplayMismatchError(tick, recording.checksums[tick], scene.checksum())
+    return chunks
+
+
+def _render_worker(recording_bytes, chunks, options, queue):
+    """This Function renders chunks in a worker, sending frames or chunk markers to queue"""
+    try:
+        _init_pygame()
+        recording = Recording.from_bytes(recording_bytes)
+        inputs = recording.inputs()
+        scene = offscreen_scene((recording.width, recording.height), recording.seed)
+        size = options['size']
+        scaled = None
+        if size != scene.size:
+            scaled = pygame.Surface(size, 0, 32)
+        for (start, end, snapshot) in chunks:
+            scene.restore(snapshot)
+            for tick in range(start, end):
+                scene.set_player_input(*decode_input(inputs[tick]))
+                scene.update()
+                if tick % options['every']:
+                    continue
+                scene.draw()
+                frame = scene.surface
+                if scaled:
+                    pygame.transform.smoothscale(frame, size, scaled)
+                    frame = scaled
+                if options['png_dir']:
+                    pygame.image.save(frame, os.path.join(options['png_dir'], f'{tick:07d}.png'))
+                else:
+                    queue.put(pygame.image.tostring(frame, 'RGB'))
+            queue.put(_CHUNK_DONE)
+    except Exception: # pylint: disable=broad-except
+        queue.put(('error', traceback.format_exc()))
+
+
+def _next_item(queue, process):
+    """This Function returns the next item process sent on queue, raises if it died first"""
+    while True:
+        try:
+            return queue.get(timeout=_POLL_SECONDS)
+        except Empty:
+            if not process.is_alive():
+                break
+    #whatever it sent before exiting is in the pipe by now
+    try:
+        return queue.get(timeout=_POLL_SECONDS)
+    except Empty:
+        raise RuntimeError(f'a render worker exited with code {process.exitcode} '
+                           'before finishing its chunks') from None
+
+
+def _ffmpeg(path, size, frame_rate):
+    """This Function starts ffmpeg reading raw rgb24 frames on stdin"""
+    ffmpeg = shutil.which('ffmpeg')
+    if ffmpeg is None:
+        raise RuntimeError('ffmpeg was not found, export to a directory of PNGs instead')
+    return subprocess.Popen(
+        [ffmpeg, '-loglevel', 'error', '-y',
+         '-f', 'rawvideo', '-pix_fmt', 'rgb24', '-s', f'{size[0]}x{size[1]}',
+         '-r', str(frame_rate), '-i', '-',
+         '-pix_fmt', 'yuv420p', path],
+        stdin=subprocess.PIPE)
+
+
+def export(recording, output, workers=None, every=DEFAULT_EVERY, scale=1.0,
+           queue_frames=DEFAULT_QUEUE_FRAMES, first_tick=0, last_tick=None, progress=None):
+    """This Function renders recording to output, returns how many frames were made
+
+    output is a directory for PNGs, '-' for raw rgb24 frames on stdout,
+    or a video file name for ffmpeg.  progress, if given, is called as
+    progress(chunks done, chunks).
+    """
+    workers = workers or os.cpu_count() or 1
+    size = (round(recording.width * scale), round(recording.height * scale))
+    png_dir = None
+    if output != '-' and (output.endswith(os.sep) or os.path.isdir(output)
+                          or not os.path.splitext(output)[1]):
+        png_dir = output
+        os.makedirs(png_dir, exist_ok=True)
+    #a worker can finish a whole chunk into its queue while the parent drains another
+    chunks = plan_chunks(recording, queue_frames * every, first_tick, last_tick)
+    options = {'size': size, 'every': every, 'png_dir': png_dir}
+    #before any worker runs, so a missing ffmpeg leaves none behind
+    sink = None
+    encoder = None
+    if png_dir is None:
+        if output == '-':
+            sink = sys.stdout.buffer
+        else:
+            encoder = _ffmpeg(output, size, round(recording.frame_rate / every))
+            sink = encoder.stdin
+    context = multiprocessing.get_context('spawn')
+    workers = max(1, min(workers, len(chunks)))
+    queues = [context.Queue(queue_frames + 1) for _ in range(workers)]
+    processes = [
+        context.Process(target=_render_worker,
+                        args=(recording.to_bytes(), chunks[index::workers], options, queues[index]),
+                        daemon=True)
+        for index in range(workers)]
+    for process in processes:
+        process.start()
+
+    frames = 0
+    try:
+        for index in range(len(chunks)):
+            worker = index % workers
+            while True:
+                item = _next_item(queues[worker], processes[worker])
+                if item is _CHUNK_DONE:
+                    break
+                if isinstance(item, tuple):
+                    raise RuntimeError(f'a render worker failed:\n{item[1]}')
+                try:
+                    sink.write(item)
+                except BrokenPipeError:
+                    if encoder is None:
+                        raise
+                    raise RuntimeError(f'ffmpeg exited with code {encoder.wait()}') from None
+                frames += 1
+            if png_dir:
+                (start, end, _) = chunks[index]
+                frames += len(range(start + (-start % every), end, every))
+            if progress:
+                progress(index + 1, len(chunks))
+    except BaseException:
+        for process in processes:
+            process.terminate()
+        for process in processes:
+            process.join()
+        raise
+    finally:
+        if encoder:
+            try:
+                encoder.stdin.close()
+            except BrokenPipeError:
+                pass #it already exited, wait() has its code
+            encoder.wait()
+        elif sink:
+            sink.flush()
+    for process in processes:
+        process.join()
+    if encoder and encoder.returncode:
+        raise RuntimeError(f'ffmpeg exited with code {encoder.returncode}')
+    return frames
+
+
+def main(argv=None):
+    """This function exports a recording from the command line"""
+    parser = argparse.ArgumentParser(description='Render a recorded pong match without a window')
+    parser.add_argument('replay', help='recording written by pg.py --record')
+    parser.add_argument('output', help='directory for PNGs, a video file, or - for raw rgb24')
+    parser.add_argument('--workers', type=int, help='render processes, every core by default')
+    parser.add_argument('--every', type=int, default=DEFAULT_EVERY,
+                        help='draw one frame every EVERY ticks (default 2, 60 fps)')
+    parser.add_argument('--scale', type=float, default=1.0, help='frame size relative to the court')
+    parser.add_argument('--queue-frames', type=int, default=DEFAULT_QUEUE_FRAMES,
+                        help='frames each worker may have waiting, bounds the memory used')
+    parser.add_argument('--from-tick', type=int, default=0)
+    parser.add_argument('--to-tick', type=int)
+    args = parser.parse_args(argv)
+
+    _init_pygame()
+    recording = Recording.load(args.replay)
+
+    def progress(done, total):
+        print(f'\r{done}/{total} chunks', end='', file=sys.stderr)
+
+    start = time.perf_counter()
+    frames = export(recording, args.output, args.workers, args.every, args.scale,
+                    args.queue_frames, args.from_tick, args.to_tick, progress)
+    seconds = time.perf_counter() - start
+    print(f'\n{frames} frames in {seconds:.2f} s ({frames / seconds:.0f} frames/s)',
+          file=sys.stderr)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,16 +1,34 @@
 
 """This module contains the main game loop"""
 
+import time
 import pygame
 
-from ponggame.scene import TitleScene, GameScene, WinScene, LoseScene
+from ponggame.diagnostics import FrameDiagnostics, hold_gc, release_gc
+from ponggame.profiler import FrameProfiler
+
+from ponggame.scene import TitleScene, GameScene, WinScene, LoseScene, ArenaScene
+
+FADE_RATE = 60 #frames per second drawn during a crossfade
 
 class VideoGame():
     """This class defines the basic video game loop"""
     def __init__(self,
                  window_width=1200,
                  window_height=800,
-                 window_title='Wowee, PONG'):
+                 window_title='Wowee, PONG',
+                 *,
+                 dirty_rects=True,
+                 render_rate=None,
+                 max_catch_up=5,
+                 profile_path=None,
+                 show_hud=False,
+                 crossfade_ms=0,
+                 idle_pacing=False,
+                 busy_loop=False,
+                 diagnose=False,
+                 gc_mode='normal',
+                 poll_input=False):
         pygame.mixer.pre_init(44100, -16, 2, 512)
         pygame.init()
 
@@ -20,6 +38,23 @@ class VideoGame():
         self._title = window_title
         pygame.display.set_caption(self._title)
         self._game_is_over = False
+        self._dirty_rects = dirty_rects
+        self._render_rate = render_rate
+        self._max_catch_up = max_catch_up
+        self._profile_path = profile_path
+        self._profiler = None
+        self._hud_rect = None
+        self._crossfade_ms = crossfade_ms
+        self._idle_pacing = idle_pacing
+        #tick_busy_loop spins the last millisecond for less jitter, at the cost of a core
+        self._tick_clock = self._clock.tick_busy_loop if busy_loop else self._clock.tick
+        self._gc_mode = gc_mode
+        self._poll_input = poll_input
+        if profile_path or show_hud or diagnose:
+            #diagnostics also count the memory every phase allocates, at a cost
+            self._profiler = FrameDiagnostics() if diagnose else FrameProfiler()
+            if show_hud:
+                self._profiler.toggle_hud()
 
         if not pygame.font:
             print('Warning: fonts are disabled.')
@@ -29,36 +64,192 @@ class VideoGame():
         self._scene_graph = None
 
 
-    def build_scene_graph(self):
-        """This method defines the scene graph"""
+    def build_scene_graph(self, arena_options=None):
+        """This method defines the scene graph
+
+        With arena_options, a dict of ArenaScene arguments such as balls
+        and paddles, the match is played in the arena.
+        """
+        if arena_options is None:
+            match = GameScene(self._screen, (0, 0, 0))
+        else:
+            match = ArenaScene(self._screen, (0, 0, 0), **arena_options)
         self._scene_graph = [
             TitleScene("Wowee, PONG", self._screen, (255, 100, 200)),
-            GameScene(self._screen, (0, 0, 0)),
+            match,
             WinScene("YOU WON!", self._screen, (0, 255, 255)),
             LoseScene("You Lost", self._screen, (255, 0, 0))
         ]
+        for scene in self._scene_graph:
+            scene.set_dirty_rects(self._dirty_rects)
+            scene.set_profiler(self._profiler)
+            scene.prefetch() #every soundtrack is in memory before its scene starts
+
 
+    @property
+    def scene_graph(self):
+        """This Property returns the scenes built by build_scene_graph"""
+        return self._scene_graph
 
     def run(self):
-        """This is the main run function for the whole program"""
-        # while not self._game_is_over:
+        """This is the main run function for the whole program
+
+        Each scene is simulated at its own fixed frame_rate no matter how
+        often it is drawn.  Real time is put in an accumulator that is
+        spent in whole ticks, at most max_catch_up per rendered frame so
+        a slow frame drops time instead of piling up more work, and the
+        leftover fraction of a tick is used to interpolate the drawing.
+
+        While a scene runs, the scenes it is likely to hand over to are
+        prewarmed, one per frame, so a transition builds nothing.  With
+        crossfade_ms the last frame of a scene fades out over the next.
+
+        With idle_pacing, a scene where nothing moves sleeps in
+        pygame.event.wait until its next tick is due or input arrives,
+        and a frame whose draw_state is unchanged is neither drawn nor
+        pushed to the display.
+
+        gc_mode, one of diagnostics.GC_MODES, keeps the cyclic garbage
+        collector from pausing a scene while it runs.
+
+        Events are fetched after the sleep, as late as they can be before
+        the updates.  With poll_input the held keys are also read again
+        with pygame.key.get_pressed right before every single update.
+        """
         pos = 0 # scene number
+        profiler = self._profiler
+        fade_from = None
         while pos < len(self._scene_graph):
-            self._scene_graph[pos].start()
-            while self._scene_graph[pos].is_valid:
-                self._clock.tick(self._scene_graph[pos].frame_rate)
-                for event in pygame.event.get():
-                    self._scene_graph[pos].handle_event(event)
-                self._scene_graph[pos].update()
-                self._scene_graph[pos].draw()
-                pygame.display.update()
-            pos = self._scene_graph[pos].stop()
+            scene = self._scene_graph[pos]
+            scene.start()
+            hold_gc(self._gc_mode)
+            tick_length = 1.0 / scene.frame_rate
+            render_rate = scene.frame_rate if self._render_rate is None else self._render_rate
+            lag = tick_length #simulate one tick before the first frame
+            last_time = time.perf_counter()
+            fade_start = last_time
+            warmed = set()
+            while scene.is_valid:
+                if profiler:
+                    mark = profiler.begin_frame()
+                if self._idle_pacing and not fade_from and not scene.is_animating():
+                    events = self._wait_for_event(last_time + tick_length - lag)
+                else:
+                    #a slow scene still fades smoothly
+                    self._tick_clock(max(render_rate, FADE_RATE) if fade_from else render_rate)
+                    events = []
+                now = time.perf_counter()
+                lag += now - last_time
+                last_time = now
+                if profiler:
+                    mark = profiler.lap('tick_sleep', mark)
+                events += pygame.event.get()
+                if profiler:
+                    mark = profiler.lap('event_pump', mark)
+                for event in events:
+                    if event.type == pygame.KEYDOWN and event.key == pygame.K_F3 and profiler:
+                        self._toggle_hud()
+                        scene.redraw()
+                        continue
+                    scene.handle_event(event)
+                if profiler:
+                    mark = profiler.lap('handle_event', mark)
+                steps = 0
+                while lag >= tick_length and scene.is_valid:
+                    if steps == self._max_catch_up:
+                        lag %= tick_length #too far behind, let the extra time go
+                        break
+                    if self._poll_input:
+                        pygame.event.pump() #the key state as of now, the events stay queued
+                        scene.poll_input(pygame.key.get_pressed())
+                    scene.update()
+                    lag -= tick_length
+                    steps += 1
+                if profiler:
+                    mark = profiler.lap('update', mark)
+                self._prewarm_next(scene, warmed)
+                if profiler:
+                    mark = profiler.lap('prewarm', mark)
+                if fade_from:
+                    scene.redraw() #the old frame covers the whole screen
+                elif self._idle_pacing and not (profiler and profiler.show_hud) \
+                     and not scene.needs_draw():
+                    if profiler:
+                        profiler.end_frame()
+                    continue #the screen already shows this state
+                #a scene that just ended skipped its updates, so lag can pass a tick
+                dirty_rects = scene.draw(min(lag / tick_length, 1.0))
+                if fade_from:
+                    fade_from = self._blend_fade(fade_from, now - fade_start)
+                    dirty_rects = None
+                if profiler:
+                    hud_rect = profiler.draw_hud(self._screen)
+                    if hud_rect != self._hud_rect:
+                        scene.redraw() #the HUD changed size, wipe the old one next frame
+                        self._hud_rect = hud_rect
+                    if hud_rect and dirty_rects is not None:
+                        dirty_rects.append(hud_rect)
+                    mark = profiler.lap('draw', mark)
+                if dirty_rects is None:
+                    pygame.display.update()
+                else:
+                    pygame.display.update(dirty_rects)
+                if profiler:
+                    profiler.lap('display_update', mark)
+                    profiler.end_frame()
+            release_gc(self._gc_mode)
+            pos = scene.stop()
+            if self._crossfade_ms:
+                fade_from = self._screen.copy()
 
+        if profiler and self._profile_path:
+            self._profiler.dump(self._profile_path)
+        if profiler:
+            profiler.close()
         pygame.display.quit()
         pygame.quit()
         return 0
 
+    def _wait_for_event(self, deadline):
+        """This Method sleeps until deadline (a perf_counter time) or the next event
+
+        Returns a list with the event that woke it, if any.
+        """
+        timeout = round((deadline - time.perf_counter()) * 1000)
+        if timeout < 1: #0 would wait forever
+            return []
+        event = pygame.event.wait(timeout)
+        return [] if event.type == pygame.NOEVENT else [event]
+
+    def _prewarm_next(self, scene, warmed):
+        """This Method prewarms one scene scene is likely to hand over to, if any is left"""
+        for index in scene.likely_next_scenes():
+            if index not in warmed and index < len(self._scene_graph):
+                warmed.add(index)
+                self._scene_graph[index].prewarm()
+                return
+
+    def _blend_fade(self, fade_from, elapsed):
+        """This Method blends the last frame of the old scene over the new one
+
+        Returns fade_from while the fade lasts and None once it is over.
+        """
+        opacity = 1.0 - elapsed * 1000 / self._crossfade_ms
+        if opacity <= 0:
+            return None
+        fade_from.set_alpha(round(255 * opacity))
+        self._screen.blit(fade_from, (0, 0))
+        return fade_from
+
+    def _toggle_hud(self):
+        """This Method shows or hides the profiler HUD, F3 in game"""
+        self._profiler.toggle_hud()
+
 class PongGame(VideoGame):
-    """This class defines the basic pong game loop"""
-    def __init__(self, window_width=800, window_height=500, window_title='Wowee, PONG'):
-        super().__init__(window_width, window_height, window_title)
+    """This class defines the basic pong game loop
+
+    options are the keyword-only VideoGame loop options, passed on as they are.
+    """
+    def __init__(self, window_width=800, window_height=500, window_title='Wowee, PONG',
+                 **options):
+        super().__init__(window_width, window_height, window_title, **options)
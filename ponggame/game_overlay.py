@@ -1,9 +1,30 @@
 
 from ponggame.ball import Ball
+from ponggame import text_cache
+from ponggame.timers import Timer
+import struct
 import pygame
 
+#scores, flags, ticks until the tutorial ends and the arrows next flash
+_SNAPSHOT = struct.Struct('<BBBHH')
+
+def draw_centerline(surface, color):
+    """This Function draws the dashed centerline of the court"""
+    (width, height) = surface.get_size()
+    segments = 21
+    for i in range(segments):
+        if not i % 2:
+            point_one = ((width * 0.5), height * (i+1)/segments)
+        else:
+            point_two = ((width * 0.5), height * (i+1)/segments)
+            pygame.draw.line(surface, color, point_one, point_two, 10)
+
 class Overlay:
-    def __init__(self, surface, color = pygame.Color(255, 255, 255)):
+    SNAPSHOT_SIZE = _SNAPSHOT.size
+    tutorial_ticks = 840   #ticks the tutorial shows at the start of a match
+    arrow_flash_ticks = 90 #ticks between two flashes of the arrows
+
+    def __init__(self, surface, color = pygame.Color(255, 255, 255), *, timers):
         self._surface = surface
         self._color = color
         self._color_flasher = pygame.Color(0, 255, 255)
@@ -15,8 +36,13 @@ class Overlay:
         self._player_one_win = False
         self._player_two_win = False
         self._show_tutorial = False
-        self._tutorial_display_timer = 840
-        self._arrow_flash_timer = 180
+        self._drawn_rects = []
+        #the match's TimerWheel, whoever updates the overlay advances it before
+        self._timers = timers
+        self._tutorial_timer = self._timers.schedule(Timer(), Overlay.tutorial_ticks)
+        self._arrow_timer = self._timers.schedule(Timer(self, Overlay._flash_arrows),
+                                                  Overlay.arrow_flash_ticks,
+                                                  Overlay.arrow_flash_ticks)
 
     def update(self, ball):
         score = ball.get_point()
@@ -25,134 +51,177 @@ class Overlay:
         elif score[0] > 0:
             self._score_two = self._score_two + score[0]
         self._find_if_winner(ball)
-        if self._tutorial_display_timer:
-            self._tutorial_display_timer -= 1
-        if self._arrow_flash_timer:
-            self._arrow_flash_timer -= 1
 
-    def draw(self):
+    def _flash_arrows(self):
+        #the arrow timer calls this every arrow_flash_ticks
+        if self._color_arrow_top == self._color:
+            self._color_arrow_top = self._color_flasher
+        else:
+            self._color_arrow_top = self._color
+
+        if self._color_arrow_bot == self._color:
+            self._color_arrow_bot = self._color_flasher
+        else:
+            self._color_arrow_bot = self._color
+
+    def _get_tutorial_ticks(self):
+        #ticks the tutorial still shows
+        return self._timers.remaining(self._tutorial_timer)
+
+    def draw(self, alpha=1.0):
         (width, height) = self._surface.get_size()
+        self._drawn_rects = []
 
         #Draws both of the scores
-        score_font = pygame.font.Font(pygame.font.get_default_font(), 100)
-        rendered_score_one = score_font.render(str(self._score_one), True, self._color)
-        rendered_score_two = score_font.render(str(self._score_two), True, self._color)
-        score_one_position = rendered_score_one.get_rect(center = (width * 0.4, height * 0.1))
-        score_two_position = rendered_score_two.get_rect(center = (width * 0.6, height * 0.1))
-        self._surface.blit(rendered_score_one, score_one_position)
-        self._surface.blit(rendered_score_two, score_two_position)
-
-        segments = 21
-        #Draws dashed centerline
-        for i in range(segments):
-            if not i % 2:
-                point_one = ((width * 0.5), height * (i+1)/segments) 
-            else:
-                point_two = ((width * 0.5), height * (i+1)/segments) 
-                pygame.draw.line(self._surface, self._color, point_one, point_two, 10)
+        score_digits = text_cache.score_digits(100, self._color)
+        for (score, x_fraction) in ((self._score_one, 0.4), (self._score_two, 0.6)):
+            self._drawn_rects.append(score_digits.draw(
+                self._surface, score, center = (width * x_fraction, height * 0.1)))
 
         self._draw_win_lose(width, height)
-        if self._tutorial_display_timer or self._show_tutorial:
+        if self._tutorial_timer.pending or self._show_tutorial:
             self._draw_mini_tutorial(width, height)
-        if self._tutorial_display_timer:
+        if self._tutorial_timer.pending:
             self._draw_countdown(width, height)
-        if not self._tutorial_display_timer:
+        if not self._tutorial_timer.pending:
             self._draw_subtext(width, height)
 
+    def draw_static(self, surface):
+        """This Method draws the parts of the overlay that never change"""
+        draw_centerline(surface, self._color)
+
+    def _blit_text(self, text, size, color, **position):
+        self._drawn_rects.append(text_cache.blit(self._surface, text, size, color, **position))
+
     def _draw_win_lose(self, width, height):
-        outcome_font = pygame.font.Font(pygame.font.get_default_font(), 100)
-        continue_font = pygame.font.Font(pygame.font.get_default_font(), 25)
         if self._player_one_win:
-            # "YOU"
-            rendered_player_win_1 = outcome_font.render("YOU", True, pygame.Color(0, 255, 0))
-            winner_banner_position_1 = rendered_player_win_1.get_rect(center = (width * 0.3, height * 0.5))
-            self._surface.blit(rendered_player_win_1, winner_banner_position_1)
-            # "WON"
-            rendered_player_win_2 = outcome_font.render("WON", True, pygame.Color(0, 255, 0))
-            winner_banner_position_2 = rendered_player_win_2.get_rect(center = (width * 0.7, height * 0.5))
-            self._surface.blit(rendered_player_win_2, winner_banner_position_2)
-            # "Press Enter to Continue"
-            rendered_continue = continue_font.render("Press 'Enter' to Continue", True, pygame.Color(0, 255, 0))
-            continue_position = rendered_continue.get_rect(center = (width * 0.5, height * 0.7))
-            self._surface.blit(rendered_continue, continue_position)
+            color = pygame.Color(0, 255, 0)
+            banner = ("YOU", "WON")
         elif self._player_two_win:
-            # "You"
-            rendered_comp_win_1 = outcome_font.render("You", True, pygame.Color(255, 0, 0))
-            loser_banner_position_1 = rendered_comp_win_1.get_rect(center = (width * 0.3, height * 0.5))
-            self._surface.blit(rendered_comp_win_1, loser_banner_position_1)
-            # "Lost"
-            rendered_comp_win_2 = outcome_font.render("Lost", True, pygame.Color(255, 0, 0))
-            loser_banner_position_2 = rendered_comp_win_2.get_rect(center = (width * 0.7, height * 0.5))
-            self._surface.blit(rendered_comp_win_2, loser_banner_position_2)
-            # "Press Enter to Continue"
-            rendered_continue = continue_font.render("Press 'Enter' to Continue", True, pygame.Color(255, 0, 0))
-            continue_position = rendered_continue.get_rect(center = (width * 0.5, height * 0.7))
-            self._surface.blit(rendered_continue, continue_position)
+            color = pygame.Color(255, 0, 0)
+            banner = ("You", "Lost")
+        else:
+            return
+        self._blit_text(banner[0], 100, color, center = (width * 0.3, height * 0.5))
+        self._blit_text(banner[1], 100, color, center = (width * 0.7, height * 0.5))
+        # "Press Enter to Continue"
+        self._blit_text("Press 'Enter' to Continue", 25, color, center = (width * 0.5, height * 0.7))
 
     def _draw_mini_tutorial(self, width, height):
         arrow_thickness = 8
-        tutorial_font = pygame.font.Font(pygame.font.get_default_font(), 14)
-
-        if self._arrow_flash_timer % 90 == 0:
-            if self._color_arrow_top == self._color:
-                self._color_arrow_top = self._color_flasher
-            else:
-                self._color_arrow_top = self._color
-        
-        if self._arrow_flash_timer % 90 == 0:
-            if self._color_arrow_bot == self._color:
-                self._color_arrow_bot = self._color_flasher
-            else:
-                self._color_arrow_bot = self._color
-
-        if self._arrow_flash_timer == 0:
-            self._arrow_flash_timer = 180
 
         #draws bottom arrow
         arrow_tip_one = (width * 0.2, height * 0.9)
         arrow_base_one = (width * 0.2, height * 0.7)
         arrow_left_one = (width * 0.19, height * 0.85)
         arrow_right_one = (width * 0.21, height * 0.85)
-        pygame.draw.line(self._surface, self._color_arrow_bot, arrow_tip_one, arrow_base_one, arrow_thickness)
-        pygame.draw.line(self._surface, self._color_arrow_bot, arrow_tip_one, arrow_left_one, arrow_thickness)
-        pygame.draw.line(self._surface, self._color_arrow_bot, arrow_tip_one, arrow_right_one, arrow_thickness)
+        for arrow_end in (arrow_base_one, arrow_left_one, arrow_right_one):
+            self._drawn_rects.append(pygame.draw.line(
+                self._surface, self._color_arrow_bot, arrow_tip_one, arrow_end, arrow_thickness))
 
         #draws top arrow
         arrow_tip_two = (width * 0.2, height * 0.1)
         arrow_base_two = (width * 0.2, height * 0.3)
         arrow_left_two = (width * 0.19, height * 0.15)
         arrow_right_two = (width * 0.21, height * 0.15)
-        pygame.draw.line(self._surface, self._color_arrow_top, arrow_tip_two, arrow_base_two, arrow_thickness)
-        pygame.draw.line(self._surface, self._color_arrow_top, arrow_tip_two, arrow_left_two, arrow_thickness)
-        pygame.draw.line(self._surface, self._color_arrow_top, arrow_tip_two, arrow_right_two, arrow_thickness)
+        for arrow_end in (arrow_base_two, arrow_left_two, arrow_right_two):
+            self._drawn_rects.append(pygame.draw.line(
+                self._surface, self._color_arrow_top, arrow_tip_two, arrow_end, arrow_thickness))
 
         #instructions under top arroa
-        rendered_up = tutorial_font.render("Press 'W' or 'Up'", True, self._color)
-        up_position = rendered_up.get_rect(center = (width * 0.2, height * 0.35))
-        self._surface.blit(rendered_up, up_position)
+        self._blit_text("Press 'W' or 'Up'", 14, self._color, center = (width * 0.2, height * 0.35))
 
         #instructions above bottom arrow
-        rendered_down = tutorial_font.render("Press 'S' or 'Down'", True, self._color)
-        down_position = rendered_down.get_rect(center = (width * 0.2, height * 0.65))
-        self._surface.blit(rendered_down, down_position)
+        self._blit_text("Press 'S' or 'Down'", 14, self._color, center = (width * 0.2, height * 0.65))
 
     def _draw_countdown(self, width, height):
-        countdown_font = pygame.font.Font(pygame.font.get_default_font(), 22)
-        game_starts = "Beginning in " + str(self._tutorial_display_timer // 120) + " seconds . . ."
-        rendered_countdown = countdown_font.render(game_starts, True, self._color)
-        countdown_position = rendered_countdown.get_rect(center = (width * 0.3, height * 0.5))
-        self._surface.blit(rendered_countdown, countdown_position)
+        game_starts = "Beginning in " + str(self._get_tutorial_ticks() // 120) + " seconds . . ."
+        self._blit_text(game_starts, 22, self._color, center = (width * 0.3, height * 0.5))
 
     def _draw_subtext(self, width, height):
         if self.check_winner():
             subtext = "(T) Toggle Tutorial    (M) Toggle Volume    (Enter) Finish Game"
         else:
             subtext = "(T) Toggle Tutorial    (M) Toggle Volume"
-        subtext_font = pygame.font.Font(pygame.font.get_default_font(), 10)
-        rendered_subtext = subtext_font.render(subtext, True, self._color)
-        subtext_position = rendered_subtext.get_rect(topleft = (width * 0.06, height * 0.98))
-        self._surface.blit(rendered_subtext, subtext_position)
+        self._blit_text(subtext, 10, self._color, topleft = (width * 0.06, height * 0.98))
    
+    def get_drawn_rects(self):
+        """This Method returns the rects the last draw changed"""
+        return self._drawn_rects
+
+    def get_scores(self):
+        return (self._score_one, self._score_two)
+
+    def get_draw_state(self):
+        #everything draw reads, the countdown only changes once a second
+        return (
+            self._score_one,
+            self._score_two,
+            self._player_one_win,
+            self._player_two_win,
+            self._show_tutorial,
+            self._tutorial_timer.pending,
+            self._get_tutorial_ticks() // 120,
+            tuple(self._color_arrow_top),
+            tuple(self._color_arrow_bot),
+        )
+
+    def get_winning_points(self):
+        return self._winning_points
+
+    def prewarm(self):
+        #renders the text of the first seconds of a match before it starts
+        text_cache.score_digits(100, self._color)
+        for seconds in range(self._get_tutorial_ticks() // 120 + 1):
+            text_cache.render("Beginning in " + str(seconds) + " seconds . . .", 22, self._color)
+        text_cache.render("Press 'W' or 'Up'", 14, self._color)
+        text_cache.render("Press 'S' or 'Down'", 14, self._color)
+        text_cache.render("(T) Toggle Tutorial    (M) Toggle Volume", 10, self._color)
+
+    def get_state(self):
+        #scores, winner, timers and which way the arrows flash as plain numbers
+        return (
+            self._score_one,
+            self._score_two,
+            self._player_one_win,
+            self._player_two_win,
+            self._get_tutorial_ticks(),
+            self._timers.remaining(self._arrow_timer),
+            self._color_arrow_top == self._color_flasher,
+        )
+
+    def snapshot(self):
+        #the scores and timers packed into SNAPSHOT_SIZE bytes, see restore
+        flags = (self._player_one_win
+                 | self._player_two_win << 1
+                 | self._show_tutorial << 2
+                 | (self._color_arrow_top == self._color_flasher) << 3
+                 | (self._color_arrow_bot == self._color_flasher) << 4)
+        return _SNAPSHOT.pack(
+            self._score_one,
+            self._score_two,
+            flags,
+            self._get_tutorial_ticks(),
+            self._timers.remaining(self._arrow_timer),
+        )
+
+    def restore(self, data, offset=0):
+        #puts the scores and timers back, returns the offset after them
+        (self._score_one, self._score_two, flags, tutorial_ticks,
+         arrow_ticks) = _SNAPSHOT.unpack_from(data, offset)
+        self._player_one_win = bool(flags & 1)
+        self._player_two_win = bool(flags & 2)
+        self._show_tutorial = bool(flags & 4)
+        self._color_arrow_top = self._color_flasher if flags & 8 else self._color
+        self._color_arrow_bot = self._color_flasher if flags & 16 else self._color
+        #0 is a tutorial that ended, the arrows flash for the whole match
+        if tutorial_ticks:
+            self._timers.schedule(self._tutorial_timer, tutorial_ticks)
+        else:
+            self._timers.cancel(self._tutorial_timer)
+        self._timers.schedule(self._arrow_timer, arrow_ticks, Overlay.arrow_flash_ticks)
+        return offset + _SNAPSHOT.size
+
     def toggle_tutorial(self):
         self._show_tutorial = not self._show_tutorial
 
@@ -1,10 +1,34 @@
 
 """This Module Handles Paddles"""
-from random import randrange
+from random import getrandbits
+import struct
 import pygame
+from ponggame import sim
+from ponggame.timers import Timer
+
+_PADDLE_SNAPSHOT = struct.Struct('<dB') #y, held keys
+#ticks until the delay ends, ball offset, approaching, target y, solved velocity, generator state
+_AI_SNAPSHOT = struct.Struct('<HhBdddI')
+
+#the keys that move the player's paddle, True for up and False for down
+KEYMAP = {pygame.K_w: True, pygame.K_UP: True, pygame.K_s: False, pygame.K_DOWN: False}
+
+
+def poll_keys(pressed):
+    """This Function returns (going_up, going_down) from a pygame.key.get_pressed()"""
+    return (pressed[pygame.K_w] or pressed[pygame.K_UP],
+            pressed[pygame.K_s] or pressed[pygame.K_DOWN])
+
 
 class Paddle:
     """This Class Handles the base Paddle and its collision"""
+    __slots__ = (
+        '_size', '_speed', '_surface', '_paddle_length', '_color', '_going_down', '_going_up',
+        '_lower_bound', '_upper_bound', '_position', '_draw_from_y', '_goal_line_x', '_height',
+        '_rect', '_drawn_rect',
+    )
+    SNAPSHOT_SIZE = _PADDLE_SNAPSHOT.size
+
     def __init__(self, surface, x_pos=40, width=30, height=120):
         self._size = (width, height)
         self._speed = 5
@@ -18,123 +42,198 @@ class Paddle:
         self._lower_bound = win_height - height
         self._upper_bound = 0
         self._position = pygame.math.Vector2(x_pos, (win_height/2) - (height/2))
+        self._draw_from_y = self._position.y
         self._goal_line_x = x_pos
         self._height = height
 
         self._rect = pygame.Rect(
             self._position,
             self._size)
-        self._collide_heights = None
+        self._drawn_rect = None
 
-    def draw(self, draw_line=True):
-        """This Method redraws paddle"""
-        (_, win_height) = self._surface.get_size()
-        self._rect = pygame.Rect(
-            self._position,
+    def draw(self, alpha=1.0, draw_line=False):
+        """This Method redraws paddle alpha of the way into its last update
+
+        The goal line is normally on the static layer.
+        """
+        self._rect.update(
+            (self._position.x, self._draw_from_y + (self._position.y - self._draw_from_y) * alpha),
             self._size
         )
-        pygame.draw.rect(
+        self._drawn_rect = pygame.draw.rect(
             self._surface,
             self._color,
             self._rect
         )
         if draw_line:
-            pygame.draw.line(
-                self._surface,
-                self._color,
-                (self._goal_line_x, win_height),
-                (self._goal_line_x, 0),
-            )
+            self.draw_static(self._surface)
+
+    def draw_static(self, surface):
+        """This Method draws the goal line, which never moves"""
+        (_, win_height) = surface.get_size()
+        pygame.draw.line(
+            surface,
+            self._color,
+            (self._goal_line_x, win_height),
+            (self._goal_line_x, 0),
+        )
+
+    def get_draw_state(self):
+        """This Method returns where draw puts the paddle, equal tuples draw the same"""
+        return (self._draw_from_y, self._position.y)
+
+    def is_moving(self):
+        """This Method returns if the paddle moved in its last update"""
+        return self._draw_from_y != self._position.y
+
+    def get_drawn_rects(self):
+        """This Method returns the rects the last draw moved, the goal lines never move"""
+        return [self._drawn_rect] if self._drawn_rect else []
 
     def update(self):
         """This Method updates the Paddle position"""
+        self._draw_from_y = self._position.y
         if self._going_down and self._position.y <= self._lower_bound - 20:
             self._position.y = self._position.y + self._speed
         elif self._going_up and self._position.y >= self._upper_bound + 20:
             self._position.y = self._position.y - self._speed
 
     def move(self, event):
-        """This Method handles control of the paddle"""
-        if event.type == pygame.KEYDOWN and event.key == pygame.K_s:
-            self._going_down = True
-        elif event.type == pygame.KEYUP and event.key == pygame.K_s:
-            self._going_down = False
-        if event.type == pygame.KEYDOWN and event.key == pygame.K_DOWN:
-            self._going_down = True
-        elif event.type == pygame.KEYUP and event.key == pygame.K_DOWN:
-            self._going_down = False
-        elif event.type == pygame.KEYDOWN and event.key == pygame.K_w:
-            self._going_up = True
-        elif event.type == pygame.KEYUP and event.key == pygame.K_w:
-            self._going_up = False
-        elif event.type == pygame.KEYDOWN and event.key == pygame.K_UP:
-            self._going_up = True
-        elif event.type == pygame.KEYUP and event.key == pygame.K_UP:
-            self._going_up = False
-
-    def collide(self, x_y_position, x_y_speed, rad):
-        """This Method handles the Paddle collision with the ball"""
-        start_count = 4
-        check_count = 10
-        check_collision = False
-        for i in range(start_count, check_count):
-            point_x_true = x_y_position.x
-            point_y_true = x_y_position.y
-            point_x = x_y_position.x + (x_y_speed.x / i)
-            point_y = x_y_position.y + (x_y_speed.y / i)
-
-            if self._rect.collidepoint(point_x_true, point_y_true) \
-            or self._rect.collidepoint(point_x_true, point_y_true + rad) \
-            or self._rect.collidepoint(point_x_true, point_y_true - rad):
-                check_collision = True
-                break
-            elif x_y_speed.magnitude() > rad \
-            and (self._rect.collidepoint(point_x + rad/2.5, point_y + rad/2.5) \
-            or self._rect.collidepoint(point_x - rad/2.5, point_y - rad/2.5) \
-            or self._rect.collidepoint(point_x - rad/2.5, point_y + rad/2.5) \
-            or self._rect.collidepoint(point_x + rad/2.5, point_y - rad/2.5) \
-            or self._rect.collidepoint(point_x, point_y + 2 * rad) \
-            or self._rect.collidepoint(point_x, point_y - 2 * rad) \
-            or self._rect.collidepoint(point_x - rad, point_y) \
-            or self._rect.collidepoint(point_x + rad, point_y)):
-                check_collision = True
-                break
-        return check_collision
+        """This Method handles control of the paddle, a KEYMAP key going down or up"""
+        if event.type != pygame.KEYDOWN and event.type != pygame.KEYUP:
+            return
+        going_up = KEYMAP.get(event.key)
+        if going_up is None:
+            return
+        if going_up:
+            self._going_up = event.type == pygame.KEYDOWN
+        else:
+            self._going_down = event.type == pygame.KEYDOWN
+
+    def get_input(self):
+        """This Method returns (going_up, going_down)"""
+        return (self._going_up, self._going_down)
+
+    def set_input(self, going_up, going_down):
+        """This Method sets the held keys directly, for replays and bots"""
+        self._going_up = going_up
+        self._going_down = going_down
+
+    def get_y(self):
+        """This Method returns the top of the paddle"""
+        return self._position.y
+
+    def get_state(self):
+        """This Method returns everything the next update depends on, as plain numbers"""
+        return (self._position.y, self._going_up, self._going_down)
+
+    def snapshot(self):
+        """This Method packs the paddle into SNAPSHOT_SIZE bytes, see restore"""
+        return _PADDLE_SNAPSHOT.pack(self._position.y, self._going_up | self._going_down << 1)
+
+    def restore(self, data, offset=0):
+        """This Method puts the paddle back where snapshot was taken, returns the offset after it"""
+        (y_position, keys) = _PADDLE_SNAPSHOT.unpack_from(data, offset)
+        self._position.y = y_position
+        self._draw_from_y = y_position
+        self._going_up = bool(keys & 1)
+        self._going_down = bool(keys & 2)
+        return offset + _PADDLE_SNAPSHOT.size
+
+    def collide(self, x_y_position, x_y_move, rad):
+        """This Method finds when the ball moving by x_y_move first touches the Paddle
+
+        Returns (time, x_normal, y_normal) or None, see sim.sweep_circle_rect
+        """
+        return sim.sweep_circle_rect(
+            x_y_position.x,
+            x_y_position.y,
+            x_y_move.x,
+            x_y_move.y,
+            rad,
+            (self._position.x, self._position.y, self._size[0], self._size[1]))
 
     def rebound_direction(self, y_position):
         """This Method determines which direction the ball should go in"""
-        self._collide_heights = [
-            self._position.y,                              #top_corner
-            self._position.y + (self._size[1] * 0.25),     #top_quarter
-            self._position.y + (self._size[1] * 0.40),     #top_near_center
-            self._position.y + (self._size[1] * 0.50),     #center
-            self._position.y + (self._size[1] * 0.60),     #bottom_near_center
-            self._position.y + (self._size[1] * 0.75),     #bottom_near_center
-            self._position.y + (self._size[1]),            #bottom
-        ]
-        best = 100000
-        direction = -1
-        for index, position in enumerate(self._collide_heights):
-            if abs(position - y_position) < best:
-                best = abs(position - y_position)
-                direction = index
-        return direction
+        return sim.rebound_direction(self._position.y, self._size[1], y_position)
 
 class OpponentAI(Paddle):
     """This Class defines the AI paddle"""
-    def __init__(self, surface, x_pos=20, width=30, height=120):
+    __slots__ = (
+        '_rng_state', '_timers', '_delay_timer', '_offset_range', '_ball_offset', '_width',
+        '_target_y', '_solved_velocity', '_approaching',
+    )
+    SNAPSHOT_SIZE = _PADDLE_SNAPSHOT.size + _AI_SNAPSHOT.size
+
+    def __init__(self, surface, x_pos=20, width=30, height=120, offset_range=sim.AI_OFFSET_RANGE,
+                 seed=None, *, timers):
         super().__init__(surface, x_pos, width, height)
-        self._ai_delay = 10
-        self._ball_offset_timer = 0
+        self._rng_state = sim.seed_random(getrandbits(32) if seed is None else seed)
+        #the match's TimerWheel, whoever updates the AI advances it before
+        self._timers = timers
+        self._delay_timer = Timer()
+        self._schedule_delay(sim.AI_DELAY)
+        self._offset_range = offset_range
         self._ball_offset = 0
         self._width = 30
+        self._target_y = self._position.y + height / 2
+        self._solved_velocity = None
+        self._approaching = False
 
-    def draw(self, draw_line=False):
-        """This Method redraws paddle"""
-        super().draw(draw_line)
-        (_, win_height) = self._surface.get_size()
+    def _schedule_delay(self, delay):
+        """This Method keeps the AI still for delay updates"""
+        if delay:
+            self._timers.schedule(self._delay_timer, delay + 1)
+        else:
+            self._timers.cancel(self._delay_timer)
+
+    def seed(self, seed):
+        """This Method restarts the offset generator, the same seed plays the same"""
+        self._rng_state = sim.seed_random(seed)
+
+    def get_state(self):
+        """This Method returns everything the next update depends on, as plain numbers"""
+        (solved_x, solved_y) = self._solved_velocity or (float('nan'), float('nan'))
+        return super().get_state() + (
+            self._timers.remaining(self._delay_timer),
+            self._ball_offset,
+            self._target_y,
+            self._approaching,
+            solved_x,
+            solved_y,
+            self._rng_state,
+        )
+
+    def snapshot(self):
+        """This Method packs the paddle and its AI into SNAPSHOT_SIZE bytes"""
+        (solved_x, solved_y) = self._solved_velocity or (float('nan'), float('nan'))
+        return super().snapshot() + _AI_SNAPSHOT.pack(
+            self._timers.remaining(self._delay_timer),
+            self._ball_offset,
+            self._approaching,
+            self._target_y,
+            solved_x,
+            solved_y,
+            self._rng_state)
+
+    def restore(self, data, offset=0):
+        """This Method puts the paddle and its AI back, returns the offset after them"""
+        offset = super().restore(data, offset)
+        (delay_ticks, self._ball_offset, approaching, self._target_y,
+         solved_x, solved_y, self._rng_state) = _AI_SNAPSHOT.unpack_from(data, offset)
+        if delay_ticks:
+            self._timers.schedule(self._delay_timer, delay_ticks)
+        else:
+            self._timers.cancel(self._delay_timer)
+        self._approaching = bool(approaching)
+        self._solved_velocity = None if solved_x != solved_x else [solved_x, solved_y] #nan is None
+        return offset + _AI_SNAPSHOT.size
+
+    def draw_static(self, surface):
+        """This Method draws the goal line behind the AI paddle"""
+        (_, win_height) = surface.get_size()
         pygame.draw.line(
-            self._surface,
+            surface,
             self._color,
             (self._goal_line_x + self._width, win_height),
             (self._goal_line_x + self._width, 0),
@@ -142,10 +241,9 @@ class OpponentAI(Paddle):
 
     def update(self, ball):
         """This Method updates paddle position"""
-        if not self._ai_delay:
-            self._move(ball.get_position())
-        else:
-            self._ai_delay = self._ai_delay - 1
+        self._draw_from_y = self._position.y
+        if not self._delay_timer.pending:
+            self._move(ball)
 
         if self._going_up:
             self._position.y = self._position.y - self._speed
@@ -154,37 +252,44 @@ class OpponentAI(Paddle):
 
     def _new_ball_offset(self):
         """This Method randomizes an offset so the paddle is imperfect"""
-        if not self._ball_offset_timer:
-            self._ball_offset_timer = 360
-            self._ball_offset = randrange(self._height * -0.4, self._height * 0.4)
+        (self._ball_offset, self._rng_state) = sim.random_offset(
+            self._rng_state, self._height * self._offset_range)
+
+    def _solve(self, ball):
+        """This Method predicts where the ball will reach the paddle"""
+        (win_width, win_height) = self._surface.get_size()
+        (x_pos, y_pos) = ball.get_position()
+        (x_velocity, y_velocity) = ball.get_velocity()
+        heading = sim.intercept_y(
+            x_pos,
+            y_pos,
+            x_velocity,
+            y_velocity,
+            sim.ai_goal_x(self._position.x, self._size[0], win_width, ball.get_radius()),
+            win_height)
+        if heading is None:
+            self._approaching = False
+            self._target_y = win_height / 2
         else:
-            self._ball_offset_timer -= 1
+            if not self._approaching:
+                self._approaching = True
+                self._new_ball_offset()
+            self._target_y = heading + self._ball_offset
 
-    def _move(self, x_y_position):
-        """This Method determines where the paddle moves relative to ball"""
-        ball_y = x_y_position[1]
-        self._going_up = False
-        self._going_down = False
-        self._new_ball_offset()
-        #moving up
-        if ball_y + self._ball_offset < self._position.y + self._height * 0.4 \
-        and self._position.y >= self._upper_bound + 20:
-            if self._position.y <= self._upper_bound + 25:
-                self._going_up = False
-            elif (self._position.y + self._height * 0.25) - abs(ball_y + self._ball_offset) > 15:
-                self._going_up = True
-                self._ai_delay = 0
-            else:
-                self._going_up = False
-                self._going_down = False
-        #moving down
-        elif ball_y + self._ball_offset > self._position.y - self._height * 0.8 \
-        and self._position.y <= self._lower_bound - 20:
-            if self._position.y >= self._lower_bound - 25:
-                self._going_down = False
-            elif (self._position.y - self._height * 0.75) - abs(ball_y + self._ball_offset) < -15:
-                self._going_down = True
-                self._ai_delay = 0
-            else:
-                self._going_up = False
-                self._going_down = False
+    def _move(self, ball):
+        """This Method determines where the paddle moves relative to ball
+
+        The intercept is only solved again when the ball changes velocity,
+        which happens on a paddle hit, a wall bounce or a serve.
+        """
+        velocity = ball.get_velocity()
+        if velocity != self._solved_velocity:
+            self._solved_velocity = velocity
+            self._solve(ball)
+        (self._going_up, self._going_down) = sim.ai_direction(
+            self._target_y,
+            self._position.y,
+            self._height,
+            self._upper_bound,
+            self._lower_bound,
+            self._speed)
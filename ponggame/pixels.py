@@ -0,0 +1,99 @@
+"""This Module renders a GameScene off screen into NumPy frames
+
+OffscreenRenderer gives the scene a plain pygame.Surface instead of the
+display, scales every drawn frame down into one preallocated surface and
+reads it through pygame.surfarray.pixels3d, which is a view and not a
+copy.  FrameStack turns those views into grayscale and keeps the last
+few in a preallocated ring, so a frame costs the drawing and the
+scaling and nothing is allocated or pushed to a display.
+
+Fonts and the mixer are used by the scene, so pygame.init() must have
+been called; the dummy SDL drivers are enough.
+"""
+import numpy as np
+import pygame
+from ponggame.scene import GameScene
+
+DEFAULT_SIZE = (84, 84)
+DEFAULT_STACK = 4
+
+#ITU-R 601 luma in 8 bit fixed point, they add up to 256
+_LUMA = (77, 150, 29)
+
+
+def offscreen_scene(court_size=(800, 500), seed=None):
+    """This Function returns a started GameScene that draws onto a plain Surface"""
+    scene = GameScene(pygame.Surface(court_size), (0, 0, 0), soundtrack=None, seed=seed)
+    scene.start()
+    return scene
+
+
+class FrameStack:
+    """This Class keeps the last `depth` grayscale frames in a ring buffer
+
+    Every frame is written twice, depth slots apart, so the newest depth
+    frames are always one contiguous slice and frames() never copies.
+    """
+    def __init__(self, size, depth=DEFAULT_STACK):
+        (width, height) = size
+        self.depth = depth
+        self._ring = np.zeros((2 * depth, height, width), dtype=np.uint8)
+        self._luma = np.empty((width, height), dtype=np.uint16)
+        self._channel = np.empty((width, height), dtype=np.uint16)
+        self._newest = depth - 1
+
+    def push(self, pixels):
+        """This Method adds a (width, height, 3) pixels3d view as the newest frame"""
+        luma = self._luma
+        channel = self._channel
+        np.multiply(pixels[:, :, 0], _LUMA[0], out=luma, dtype=np.uint16)
+        np.multiply(pixels[:, :, 1], _LUMA[1], out=channel, dtype=np.uint16)
+        luma += channel
+        np.multiply(pixels[:, :, 2], _LUMA[2], out=channel, dtype=np.uint16)
+        luma += channel
+        luma >>= 8
+        self._newest = (self._newest + 1) % self.depth
+        #surfarray is indexed [x, y], the frames are [y, x] like images
+        np.copyto(self._ring[self._newest].T, luma, casting='unsafe')
+        np.copyto(self._ring[self._newest + self.depth].T, luma, casting='unsafe')
+
+    def frames(self):
+        """This Method returns a (depth, height, width) view, oldest frame first"""
+        start = self._newest + 1
+        return self._ring[start:start + self.depth]
+
+    def clear(self):
+        """This Method blanks every frame, for a new episode"""
+        self._ring.fill(0)
+
+
+class OffscreenRenderer:
+    """This Class draws a scene off screen and hands out downscaled frames
+
+    size is the (width, height) of the frames.  With depth, every render
+    is also pushed onto a grayscale FrameStack.  smooth averages the
+    pixels being shrunk; without it the scaling is nearest neighbour,
+    which is cheaper but can drop one pixel wide lines.
+    """
+    def __init__(self, scene, size=DEFAULT_SIZE, depth=DEFAULT_STACK, smooth=True):
+        self._scene = scene
+        self._size = size
+        self._scale = pygame.transform.smoothscale if smooth else pygame.transform.scale
+        self._small = pygame.Surface(size, 0, 32)
+        self.stack = FrameStack(size, depth) if depth else None
+
+    def render(self, alpha=1.0):
+        """This Method draws the scene, scales it down and stacks it"""
+        self._scene.draw(alpha)
+        self._scale(self._scene.surface, self._size, self._small)
+        if self.stack:
+            pixels = pygame.surfarray.pixels3d(self._small)
+            self.stack.push(pixels)
+            del pixels #the view locks the surface until it is gone
+
+    def pixels(self):
+        """This Method returns a (width, height, 3) view of the last frame
+
+        The view locks the surface; drop it before the next render.
+        """
+        return pygame.surfarray.pixels3d(self._small)
@@ -0,0 +1,202 @@
+"""This Module times every phase of a frame
+
+FrameProfiler keeps the last `capacity` frames of each phase in a fixed
+size ring buffer, so it can stay on for a whole session.  It reports
+p50/p95/p99 and histograms, draws a small HUD and dumps to CSV or JSON.
+"""
+import csv
+import json
+import math
+import time
+from array import array
+import pygame
+
+PHASES = (
+    'tick_sleep',
+    'event_pump',
+    'handle_event',
+    'update',
+    'draw',
+    'display_update',
+)
+
+HUD_REFRESH_FRAMES = 30
+
+
+def _percentile(ordered, percent):
+    """This Function returns the nearest-rank percentile of a sorted list"""
+    if not ordered:
+        return 0.0
+    rank = math.ceil(percent / 100 * len(ordered)) - 1
+    return ordered[max(0, min(len(ordered) - 1, rank))]
+
+
+class FrameProfiler:
+    """This Class records how long each phase of every frame took"""
+    def __init__(self, capacity=2048):
+        self._capacity = capacity
+        self._samples = {}
+        self._phases = []
+        self._current = {}
+        self._frame_count = 0
+        self._frame_start = 0.0
+        self._show_hud = False
+        self._hud_surface = None
+        self._hud_font = None
+        for phase in PHASES + ('frame',):
+            self._add_phase(phase)
+
+    def _add_phase(self, phase):
+        """This Method starts a ring buffer for a phase seen for the first time"""
+        self._samples[phase] = array('d', bytes(8 * self._capacity))
+        self._phases.append(phase)
+
+    def begin_frame(self):
+        """This Method starts timing a new frame, returns the start time"""
+        self._current.clear()
+        self._frame_start = time.perf_counter()
+        return self._frame_start
+
+    def add(self, phase, seconds):
+        """This Method adds seconds to a phase of the current frame"""
+        self._current[phase] = self._current.get(phase, 0.0) + seconds
+
+    def lap(self, phase, start):
+        """This Method charges the time since start to phase, returns now for the next lap"""
+        now = time.perf_counter()
+        self._current[phase] = self._current.get(phase, 0.0) + (now - start)
+        return now
+
+    def end_frame(self):
+        """This Method stores the current frame into the ring buffers"""
+        self._current['frame'] = time.perf_counter() - self._frame_start
+        slot = self._frame_count % self._capacity
+        for phase in self._current:
+            if phase not in self._samples:
+                self._add_phase(phase)
+        for phase in self._phases:
+            self._samples[phase][slot] = self._current.get(phase, 0.0)
+        self._frame_count += 1
+
+    @property
+    def frame_count(self):
+        """This Property returns how many frames were recorded in total"""
+        return self._frame_count
+
+    def samples(self, phase):
+        """This Method returns the stored samples of a phase in seconds, oldest first"""
+        return self._oldest_first(self._samples[phase])
+
+    def _oldest_first(self, ring):
+        """This Method returns the stored frames of a ring buffer as a list, oldest first"""
+        if self._frame_count <= self._capacity:
+            return ring[:self._frame_count].tolist()
+        slot = self._frame_count % self._capacity
+        return ring[slot:].tolist() + ring[:slot].tolist()
+
+    def percentiles(self, phase, percents=(50, 95, 99)):
+        """This Method returns {percent: milliseconds} for a phase"""
+        ordered = sorted(self.samples(phase))
+        return {percent: _percentile(ordered, percent) * 1000 for percent in percents}
+
+    def histogram(self, phase, bin_ms=1.0, bins=33):
+        """This Method returns counts of a phase per bin_ms wide bin, the last bin is open"""
+        counts = [0] * bins
+        for sample in self.samples(phase):
+            counts[min(bins - 1, int(sample * 1000 / bin_ms))] += 1
+        return counts
+
+    def summary(self):
+        """This Method returns mean, max and p50/p95/p99 in milliseconds for every phase"""
+        result = {}
+        for phase in self._phases:
+            samples = self.samples(phase)
+            ordered = sorted(samples)
+            result[phase] = {
+                'mean': sum(samples) / len(samples) * 1000 if samples else 0.0,
+                'max': ordered[-1] * 1000 if ordered else 0.0,
+                'p50': _percentile(ordered, 50) * 1000,
+                'p95': _percentile(ordered, 95) * 1000,
+                'p99': _percentile(ordered, 99) * 1000,
+            }
+        return result
+
+    def report(self):
+        """This Method returns everything dump writes as JSON, as a dict"""
+        return {
+            'frames': self._frame_count,
+            'summary': self.summary(),
+            'histogram_ms': {phase: self.histogram(phase) for phase in self._phases},
+            'samples_ms': {phase: [sample * 1000 for sample in self.samples(phase)]
+                           for phase in self._phases},
+        }
+
+    def _columns(self):
+        """This Method returns (names, formatted samples) of every column dump writes as CSV"""
+        names = [phase + '_ms' for phase in self._phases]
+        columns = [[f'{sample * 1000:.4f}' for sample in self.samples(phase)]
+                   for phase in self._phases]
+        return (names, columns)
+
+    def dump(self, path):
+        """This Method writes the stored frames to path, JSON if it ends in .json, else CSV"""
+        if path.endswith('.json'):
+            with open(path, 'w') as report_file:
+                json.dump(self.report(), report_file, indent=1)
+            return
+        (names, columns) = self._columns()
+        first_frame = self._frame_count - len(columns[0])
+        with open(path, 'w', newline='') as report_file:
+            writer = csv.writer(report_file)
+            writer.writerow(['frame'] + names)
+            for (index, row) in enumerate(zip(*columns)):
+                writer.writerow([first_frame + index] + list(row))
+
+    def close(self):
+        """This Method stops anything the profiler started, FrameProfiler starts nothing"""
+
+    def toggle_hud(self):
+        """This Method shows or hides the on-screen HUD"""
+        self._show_hud = not self._show_hud
+        self._hud_surface = None
+
+    @property
+    def show_hud(self):
+        """This Property returns if the HUD is on"""
+        return self._show_hud
+
+    def draw_hud(self, surface):
+        """This Method draws the HUD in the top right corner, returns its rect or None
+
+        The text is only re-rendered every HUD_REFRESH_FRAMES frames and
+        is drawn on a solid box, so drawing it again over itself is safe.
+        """
+        if not self._show_hud:
+            return None
+        if self._hud_surface is None or self._frame_count % HUD_REFRESH_FRAMES == 0:
+            self._hud_surface = self._render_hud()
+        rect = self._hud_surface.get_rect(topright=(surface.get_width() - 4, 4))
+        surface.blit(self._hud_surface, rect)
+        return rect
+
+    def _render_hud(self):
+        """This Method renders the HUD text onto one surface"""
+        if self._hud_font is None:
+            self._hud_font = pygame.font.Font(pygame.font.get_default_font(), 11)
+        summary = self.summary()
+        frame = summary['frame']
+        fps = 1000 / frame['mean'] if frame['mean'] else 0.0
+        lines = [f'{fps:6.1f} fps  frame p50 {frame["p50"]:.2f}  p95 {frame["p95"]:.2f}'
+                 f'  p99 {frame["p99"]:.2f} ms']
+        for phase in self._phases:
+            if phase != 'frame':
+                lines.append(f'{phase:>16} p95 {summary[phase]["p95"]:7.3f} ms')
+        rendered = [self._hud_font.render(line, True, (255, 255, 0), (0, 0, 0)) for line in lines]
+        width = max(line.get_width() for line in rendered)
+        height = sum(line.get_height() for line in rendered)
+        hud = pygame.Surface((width + 8, height + 8))
+        y_pos = 4
+        for line in rendered:
+            hud.blit(line, (4, y_pos))
+            y_pos += line.get_height()
+        return hud
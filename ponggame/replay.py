@@ -0,0 +1,314 @@
+"""This Module records and replays GameScene matches bit for bit
+
+A match is decided by the AI seed and by which keys the player holds on
+every tick, so that is all a Recording keeps: the seed, the ticks where
+the held keys changed (delta encoded), and a crc32 of the game state
+after every tick so a replay can tell exactly where it went different.
+
+    python -m ponggame.replay match.rep              #headless, as fast as it runs
+    python -m ponggame.replay match.rep --realtime   #watch it at the scene's frame rate
+"""
+import argparse
+import os
+import struct
+import sys
+import time
+import zlib
+from array import array
+import pygame
+from ponggame.scene import GameScene
+
+MAGIC = b'PONGREP1'
+_HEADER = struct.Struct('<8sIIHHHI') #magic, seed, ticks, width, height, frame_rate, changes
+
+INPUT_UP = 1
+INPUT_DOWN = 2
+
+
+def encode_input(going_up, going_down):
+    """This Function packs the held keys into two bits"""
+    return (INPUT_UP if going_up else 0) | (INPUT_DOWN if going_down else 0)
+
+
+def decode_input(bits):
+    """This Function returns (going_up, going_down) from encode_input bits"""
+    return (bool(bits & INPUT_UP), bool(bits & INPUT_DOWN))
+
+
+def _write_varint(out, value):
+    """This Function appends value as a little endian base 128 varint"""
+    while value >= 0x80:
+        out.append(value & 0x7F | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def _read_varint(data, pos):
+    """This Function returns (value, next position) of the varint at pos"""
+    value = 0
+    shift = 0
+    while True:
+        byte = data[pos]
+        pos += 1
+        value |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return (value, pos)
+        shift += 7
+
+
+class ReplayMismatchError(Exception):
+    """This Class is raised when a replayed tick does not match the recording"""
+    def __init__(self, tick, expected, actual):
+        super().__init__(f'tick {tick}: checksum {actual:08x}, recorded {expected:08x}')
+        self.tick = tick
+        self.expected = expected
+        self.actual = actual
+
+
+class Recording:
+    """This Class holds one recorded match"""
+    def __init__(self, seed, width, height, frame_rate):
+        self.seed = seed
+        self.width = width
+        self.height = height
+        self.frame_rate = frame_rate
+        self.changes = [] #(tick, input bits) every time the held keys change
+        self.checksums = array('I')
+        self._last_bits = 0
+
+    @property
+    def ticks(self):
+        """This Property returns how many ticks were recorded"""
+        return len(self.checksums)
+
+    def append(self, bits, checksum):
+        """This Method adds one tick"""
+        if bits != self._last_bits:
+            self.changes.append((len(self.checksums), bits))
+            self._last_bits = bits
+        self.checksums.append(checksum)
+
+    def inputs(self):
+        """This Method returns the input bits of every tick as a bytearray"""
+        expanded = bytearray(self.ticks)
+        for (index, (tick, bits)) in enumerate(self.changes):
+            end = self.changes[index + 1][0] if index + 1 < len(self.changes) else self.ticks
+            expanded[tick:end] = bytes([bits]) * (end - tick)
+        return expanded
+
+    def to_bytes(self):
+        """This Method returns the recording in its file format"""
+        body = bytearray()
+        last_tick = 0
+        for (tick, bits) in self.changes:
+            _write_varint(body, tick - last_tick)
+            body.append(bits)
+            last_tick = tick
+        checksums = array('I', self.checksums)
+        if sys.byteorder == 'big':
+            checksums.byteswap()
+        body += checksums.tobytes()
+        header = _HEADER.pack(MAGIC, self.seed, self.ticks, self.width, self.height,
+                              self.frame_rate, len(self.changes))
+        return header + zlib.compress(bytes(body), 9)
+
+    @classmethod
+    def from_bytes(cls, data):
+        """This Method reads a recording written by to_bytes"""
+        (magic, seed, ticks, width, height, frame_rate, change_count) = \
+            _HEADER.unpack_from(data)
+        if magic != MAGIC:
+            raise ValueError('not a pong replay')
+        body = zlib.decompress(data[_HEADER.size:])
+        recording = cls(seed, width, height, frame_rate)
+        pos = 0
+        tick = 0
+        for _ in range(change_count):
+            (delta, pos) = _read_varint(body, pos)
+            tick += delta
+            recording.changes.append((tick, body[pos]))
+            pos += 1
+        recording.checksums.frombytes(body[pos:pos + 4 * ticks])
+        if sys.byteorder == 'big':
+            recording.checksums.byteswap()
+        recording._last_bits = recording.changes[-1][1] if recording.changes else 0
+        return recording
+
+    def save(self, path):
+        """This Method writes the recording to path"""
+        with open(path, 'wb') as replay_file:
+            replay_file.write(self.to_bytes())
+
+    @classmethod
+    def load(cls, path):
+        """This Method reads a recording from path"""
+        with open(path, 'rb') as replay_file:
+            return cls.from_bytes(replay_file.read())
+
+
+class Recorder:
+    """This Class records every match a GameScene plays, see GameScene.set_replay
+
+    With a path, each match is written there when the scene stops.
+    """
+    drives_input = False
+
+    def __init__(self, path=None):
+        self._path = path
+        self.recording = None
+
+    def start(self, scene):
+        """This Method starts a new recording when a match starts"""
+        (width, height) = scene.size
+        self.recording = Recording(scene.match_seed, width, height, scene.frame_rate)
+
+    def before_update(self, scene):
+        """This Method does nothing, the player's input is only read after the tick"""
+
+    def after_update(self, scene):
+        """This Method stores the tick's input and checksum"""
+        self.recording.append(encode_input(*scene.get_player_input()), scene.checksum())
+
+    def stop(self, scene):
+        """This Method writes the recording if there is a path"""
+        if self._path and self.recording:
+            self.recording.save(self._path)
+
+
+class Player:
+    """This Class feeds a Recording back into a GameScene, see GameScene.set_replay
+
+    The scene ends once every tick was played.  With verify, every tick's
+    checksum is compared; strict raises ReplayMismatchError on the first
+    difference, otherwise it is kept in mismatch_tick.
+    """
+    drives_input = True
+
+    def __init__(self, recording, verify=True, strict=True):
+        self._recording = recording
+        self._inputs = recording.inputs()
+        self._verify = verify
+        self._strict = strict
+        self._tick = 0
+        self.mismatch_tick = None
+
+    def start(self, scene):
+        """This Method rewinds to the first tick"""
+        self._tick = 0
+        self.mismatch_tick = None
+
+    def before_update(self, scene):
+        """This Method sets the recorded input of the tick, or ends the scene after the last"""
+        if self._tick >= self._recording.ticks:
+            scene.end()
+            return
+        scene.set_player_input(*decode_input(self._inputs[self._tick]))
+
+    def after_update(self, scene):
+        """This Method checks the tick against the recording"""
+        if self._tick >= self._recording.ticks:
+            return
+        if self._verify and self.mismatch_tick is None:
+            expected = self._recording.checksums[self._tick]
+            actual = scene.checksum()
+            if actual != expected:
+                self.mismatch_tick = self._tick
+                if self._strict:
+                    raise ReplayMismatchError(self._tick, expected, actual)
+        self._tick += 1
+
+    def stop(self, scene):
+        """This Method does nothing, the player keeps its result"""
+
+    @property
+    def tick(self):
+        """This Property returns how many ticks were played"""
+        return self._tick
+
+    @property
+    def finished(self):
+        """This Property returns if every recorded tick was played"""
+        return self._tick >= self._recording.ticks
+
+
+def _game_scene(recording, screen, soundtrack):
+    """This Function builds a GameScene set up to play recording"""
+    if screen.get_size() != (recording.width, recording.height):
+        raise ValueError(f'the recording is {recording.width}x{recording.height}, '
+                         f'the screen is {screen.get_width()}x{screen.get_height()}')
+    kwargs = {} if soundtrack else {'soundtrack': None}
+    return GameScene(screen, (0, 0, 0), seed=recording.seed, **kwargs)
+
+
+def play_headless(recording, screen, verify=True, strict=True):
+    """This Function replays recording as fast as it updates, nothing is drawn
+
+    Returns the Player, whose tick and mismatch_tick tell how it went.
+    """
+    scene = _game_scene(recording, screen, soundtrack=False)
+    player = Player(recording, verify, strict)
+    scene.set_replay(player)
+    scene.start()
+    while scene.is_valid and not player.finished:
+        scene.update()
+    scene.set_replay(None)
+    return player
+
+
+def play_realtime(recording, screen, verify=True, strict=True):
+    """This Function replays recording on screen at its frame rate, escape stops it"""
+    scene = _game_scene(recording, screen, soundtrack=True)
+    player = Player(recording, verify, strict)
+    scene.set_replay(player)
+    clock = pygame.time.Clock()
+    scene.start()
+    while scene.is_valid:
+        clock.tick(recording.frame_rate)
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT:
+                scene.end()
+            scene.handle_event(event)
+        scene.update()
+        dirty_rects = scene.draw()
+        if dirty_rects is None:
+            pygame.display.update()
+        else:
+            pygame.display.update(dirty_rects)
+    scene.stop()
+    scene.set_replay(None)
+    return player
+
+
+def main(argv=None):
+    """This function replays a recording from the command line"""
+    parser = argparse.ArgumentParser(description='Replay a recorded pong match')
+    parser.add_argument('path', help='recording written by pg.py --record')
+    parser.add_argument('--realtime', action='store_true',
+                        help='show the match at its frame rate instead of headless at full speed')
+    parser.add_argument('--no-verify', action='store_true', help='skip the per-tick checksums')
+    args = parser.parse_args(argv)
+
+    recording = Recording.load(args.path)
+    if not args.realtime:
+        os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+        os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+    pygame.mixer.pre_init(44100, -16, 2, 512)
+    pygame.init()
+    screen = pygame.display.set_mode((recording.width, recording.height))
+    play = play_realtime if args.realtime else play_headless
+    start = time.perf_counter()
+    try:
+        player = play(recording, screen, not args.no_verify, strict=False)
+    finally:
+        pygame.quit()
+    seconds = time.perf_counter() - start
+    print(f'{player.tick}/{recording.ticks} ticks in {seconds:.3f} s '
+          f'({player.tick / seconds if seconds else 0:.0f} ticks/s)')
+    if player.mismatch_tick is not None:
+        print(f'checksum mismatch at tick {player.mismatch_tick}')
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,10 +1,39 @@
 
 """Game scenes"""
 import os
+import struct
+import time
+import zlib
+from itertools import repeat
+from random import getrandbits
+import numpy as np
 import pygame
+from ponggame import arena, assets, sim, text_cache
 from ponggame.ball import Ball
-from ponggame.paddle import OpponentAI, Paddle
+from ponggame.paddle import KEYMAP, OpponentAI, Paddle, poll_keys
 from ponggame.game_overlay import Overlay
+from ponggame.timers import TimerWheel
+
+def _drawn_rects(drawables):
+    """This Function collects the rects every drawable changed in its last draw"""
+    rects = []
+    for drawable in drawables:
+        rects.extend(drawable.get_drawn_rects())
+    return rects
+
+
+def _merge_rects(rects):
+    """This Function unions overlapping rects so no pixel is pushed twice"""
+    merged = []
+    for rect in rects:
+        rect = pygame.Rect(rect)
+        index = rect.collidelist(merged)
+        while index != -1:
+            rect.union_ip(merged.pop(index))
+            index = rect.collidelist(merged)
+        merged.append(rect)
+    return merged
+
 
 class Scene:
     """This Class Defines the Base Scene"""
@@ -15,8 +44,8 @@ class Scene:
 
     def __init__(self, screen, background_color, soundtrack=None):
         self._screen = screen
-        self._background = pygame.Surface(self._screen.get_size())
-        self._background.fill(background_color)
+        self._background_color = background_color
+        self._background = None
         self._is_valid = True
         self._playing_song = False
         self._frame_rate = 60
@@ -26,14 +55,104 @@ class Scene:
         else:
             self._soundtrack = None
         self._is_soundtrack_on = True
+        self._use_dirty_rects = False
+        self._full_redraw = True
+        self._last_drawn_rects = []
+        self._drawn_state = None
+        self._profiler = None
 
     def update(self):
         """This Method Defines update for usage in other classes"""
         pass
 
-    def draw(self):
-        """This Method Defines draw for usage in other classes"""
-        self._screen.blit(self._background, (0, 0))
+    def draw(self, alpha=1.0):
+        """This Method Defines draw for usage in other classes
+
+        alpha is how far (0 to 1) real time is between the last two
+        updates, for scenes that interpolate.  draw returns the list of
+        rects it changed, or None if the whole screen has to be pushed.
+        """
+        self._screen.blit(self._get_background(), (0, 0))
+        self._full_redraw = False
+
+    def is_animating(self):
+        """This Method returns if something on screen moves from tick to tick"""
+        return False
+
+    def draw_state(self):
+        """This Method returns what the drawing depends on, equal states draw the same frame"""
+        return None
+
+    def needs_draw(self):
+        """This Method returns if the screen is out of date, taking the current state as drawn"""
+        state = self.draw_state()
+        changed = self._full_redraw or state != self._drawn_state
+        self._drawn_state = state
+        return changed
+
+    def _get_background(self):
+        """This Method returns the static layer, building it again if the window changed size"""
+        if self._background is None or self._background.get_size() != self._screen.get_size():
+            self._background = self._build_static_layer(self._screen.get_size())
+        return self._background
+
+    def _build_static_layer(self, size):
+        """This Method renders everything that never changes during a scene once"""
+        layer = pygame.Surface(size)
+        layer.fill(self._background_color)
+        self._draw_static(layer)
+        if pygame.display.get_surface() is not None:
+            layer = layer.convert()
+        return layer
+
+    def _draw_static(self, layer):
+        """This Method draws the court markings of a scene onto its static layer"""
+        pass
+
+    def set_dirty_rects(self, use_dirty_rects):
+        """This Method turns dirty rectangle drawing on or off"""
+        self._use_dirty_rects = use_dirty_rects
+        self._full_redraw = True
+
+    def redraw(self):
+        """This Method makes the next draw push the whole screen"""
+        self._full_redraw = True
+
+    def set_profiler(self, profiler):
+        """This Method gives the scene a FrameProfiler to time its sub-phases, or None"""
+        self._profiler = profiler
+
+    def _draw_drawables(self, drawables, alpha):
+        """This Method draws every drawable, timing each one if there is a profiler"""
+        if not self._profiler:
+            for drawable in drawables:
+                drawable.draw(alpha)
+            return
+        mark = time.perf_counter()
+        for drawable in drawables:
+            drawable.draw(alpha)
+            mark = self._profiler.lap('draw.' + type(drawable).__name__, mark)
+
+    def _draw_dirty(self, drawables, alpha=1.0):
+        """This Method redraws drawables over their old rects, returns the rects to push
+
+        Everything drawn last frame is restored from the background first,
+        so antialiased text is never drawn twice over itself.
+        """
+        if not self._use_dirty_rects or self._full_redraw:
+            Scene.draw(self)
+            self._draw_drawables(drawables, alpha)
+            self._full_redraw = False
+            self._last_drawn_rects = _drawn_rects(drawables)
+            return None
+        background = self._get_background()
+        for rect in self._last_drawn_rects:
+            self._screen.blit(background, rect, rect)
+        self._draw_drawables(drawables, alpha)
+        drawn_rects = _drawn_rects(drawables)
+        dirty_rects = _merge_rects(self._last_drawn_rects + drawn_rects)
+        self._last_drawn_rects = drawn_rects
+        return dirty_rects
 
     def toggle_soundtrack(self):
         """This Method toggles whether the soundtrack plays or not"""
@@ -46,15 +165,27 @@ class Scene:
     def start(self):
         """This Method initiliazes and starts a Scene"""
         self._is_valid = True
+        self._full_redraw = True
         self._is_soundtrack_on = True
         if self._soundtrack:
-            try:
-                pygame.mixer.music.load(self._soundtrack)
-                pygame.mixer.music.set_volume(0.1)
-                pygame.mixer.music.play(-1, 0.0, 500) #fades in and plays forever
-            except pygame.error as pygame_error:
-                print(f'Cannot open {self._soundtrack}')
-                raise SystemExit(1) from pygame_error
+            assets.play_music(self._soundtrack, 0.1, -1, 500) #fades in and plays forever
+
+    def prefetch(self):
+        """This Method starts loading the soundtrack in the background"""
+        assets.prefetch_music(self._soundtrack)
+
+    def prewarm(self):
+        """This Method does the slow parts of start() and the first draw ahead of time
+
+        It is called while another scene is running, so it must not draw
+        on the screen; it loads the music and renders the static layer.
+        """
+        self.prefetch()
+        self._get_background()
+
+    def likely_next_scenes(self):
+        """This Method returns the scene numbers this scene may hand over to soon"""
+        return ()
 
     def stop(self):
         """This Method Defines stopping a Scene"""
@@ -66,6 +197,16 @@ class Scene:
         """This Property returns if a scene is valid"""
         return self._is_valid
 
+    @property
+    def surface(self):
+        """This Property returns the surface the scene draws onto"""
+        return self._screen
+
+    @property
+    def size(self):
+        """This Property returns the (width, height) the scene is drawn at"""
+        return self._screen.get_size()
+
     @property
     def frame_rate(self):
         """This Property returns the frame rate of a scene"""
@@ -78,6 +219,10 @@ class Scene:
             self._is_valid = False
             self._next_scene = 4
 
+    def poll_input(self, pressed):
+        """This Method reads held keys from pygame.key.get_pressed() right before an update"""
+        pass
+
 class TitleScene(Scene):
     """This Class Defines update for usage in other classes"""
     def __init__(self,
@@ -91,59 +236,53 @@ class TitleScene(Scene):
         self._flasher = False
         self._next_scene = 1
 
-    def draw(self):
-        """This Method draws all title screen text"""
-        super().draw()
-        (width, height) = self._screen.get_size()
-        # title_font = pygame.font.Font(pygame.font.match_font('lato'), 100)
-        title_font = pygame.font.Font(pygame.font.get_default_font(), 100)
-        enter_font = pygame.font.Font(pygame.font.get_default_font(), 30)
-        instruction_font = pygame.font.Font(pygame.font.get_default_font(), 20)
+    def update(self):
+        """This Method flashes the title text once per tick"""
+        self._flasher = not self._flasher
+
+    def draw_state(self):
+        """This Method returns the flash, the only thing that changes"""
+        return self._flasher
+
+    def _draw_static(self, layer):
+        """This Method bakes the title and the rules into the static layer"""
+        (width, height) = layer.get_size()
 
         #Creates Main title
-        rendered_title = title_font.render(self._title, True, (0, 50, 0))
-        title_position = rendered_title.get_rect(center=(width * 0.5, height * 0.5))
-        self._screen.blit(rendered_title, title_position)
+        text_cache.blit(layer, self._title, 100, (0, 50, 0),
+                        center=(width * 0.5, height * 0.5))
+
+        for (line, y_fraction) in (("Win by being the first paddle to reach 3 points", 0.8),
+                                   ("by using 'W' and 'S', or the arrow keys,", 0.84),
+                                   ("to hit the ball past the other paddle", 0.88)):
+            text_cache.blit(layer, line, 20, (255, 255, 255),
+                            center=(width * 0.5, height * y_fraction))
+
+    def prewarm(self):
+        """This Method also renders both colors of the flashing text"""
+        super().prewarm()
+        for flash_color in (100, (255, 255, 255)):
+            text_cache.render("Press any button to continue. . .", 30, flash_color)
+            text_cache.render("Use 'Escape' at any time to close the Game", 20, flash_color)
+
+    def likely_next_scenes(self):
+        """This Method returns the game scene, any key starts it"""
+        return (self._next_scene,)
+
+    def draw(self, alpha=1.0):
+        """This Method draws the flashing text over the static layer"""
+        super().draw(alpha)
+        (width, height) = self._screen.get_size()
 
         #Creates flashing text
         if self._flasher:
-            rendered_enter = enter_font.render("Press any button to continue. . .", True, 100)
-            enter_position = rendered_enter.get_rect(center=(width * 0.5, height/1.5))
-            self._screen.blit(rendered_enter, enter_position)
-            rendered_enter = instruction_font.render("Use 'Escape' at any time to close the Game",
-                                                     True,
-                                                     100)
-            enter_position = rendered_enter.get_rect(center=(width * 0.5, height/1.4))
-            self._screen.blit(rendered_enter, enter_position)
-            self._flasher = not self._flasher
+            flash_color = 100
         else:
-            rendered_enter = enter_font.render("Press any button to continue. . .",
-                                               True,
-                                               (255, 255, 255))
-            enter_position = rendered_enter.get_rect(center=(width * 0.5, height/1.5))
-            self._screen.blit(rendered_enter, enter_position)
-            rendered_enter = instruction_font.render("Use 'Escape' at any time to close the Game",
-                                                     True,
-                                                     (255, 255, 255))
-            enter_position = rendered_enter.get_rect(center=(width * 0.5, height/1.4))
-            self._screen.blit(rendered_enter, enter_position)
-            self._flasher = not self._flasher
-
-        rendered_instr = instruction_font.render("Win by being the first paddle to reach 3 points",
-                                                 True,
-                                                 (255, 255, 255))
-        instruction_position = rendered_instr.get_rect(center=(width * 0.5, height * 0.8))
-        self._screen.blit(rendered_instr, instruction_position)
-        rendered_instr = instruction_font.render("by using 'W' and 'S', or the arrow keys,",
-                                                 True,
-                                                 (255, 255, 255))
-        instruction_position = rendered_instr.get_rect(center=(width * 0.5, height * 0.84))
-        self._screen.blit(rendered_instr, instruction_position)
-        rendered_instr = instruction_font.render("to hit the ball past the other paddle",
-                                                 True,
-                                                 (255, 255, 255))
-        instruction_position = rendered_instr.get_rect(center=(width * 0.5, height * 0.88))
-        self._screen.blit(rendered_instr, instruction_position)
+            flash_color = (255, 255, 255)
+        text_cache.blit(self._screen, "Press any button to continue. . .", 30, flash_color,
+                        center=(width * 0.5, height/1.5))
+        text_cache.blit(self._screen, "Use 'Escape' at any time to close the Game", 20, flash_color,
+                        center=(width * 0.5, height/1.4))
 
     def stop(self):
         """This Method returns the next scene number"""
@@ -163,45 +302,201 @@ class TitleScene(Scene):
         #     self._is_valid = False
 
 
+_SNAPSHOT_MAGIC = b'PS'
+_SNAPSHOT_VERSION = 2
+#magic, version, width, height, match seed, next scene, next screen available
+_SNAPSHOT_HEADER = struct.Struct('<2sBHHIBB')
+SNAPSHOT_SIZE = (_SNAPSHOT_HEADER.size + Ball.SNAPSHOT_SIZE + Paddle.SNAPSHOT_SIZE
+                 + OpponentAI.SNAPSHOT_SIZE + Overlay.SNAPSHOT_SIZE)
+
+
 class GameScene(Scene):
     """This Class handles the game scene logic"""
-    def __init__(self, screen, background_color, soundtrack='HoliznaCC0 - Dance Till You Die.wav'):
+    #KEYDOWN actions by method name, the paddle keys are in paddle.KEYMAP
+    _KEY_ACTIONS = {
+        pygame.K_RETURN: '_leave',
+        pygame.K_m: '_toggle_sound',
+        pygame.K_t: '_toggle_tutorial',
+    }
+
+    def __init__(self, screen, background_color, soundtrack='HoliznaCC0 - Dance Till You Die.wav',
+                 seed=None):
         super().__init__(screen, background_color, soundtrack)
         self._frame_rate = 120
         self._next_screen_available = False
         self._next_scene = 0
+        self._seed = seed
+        self._match_seed = None
+        self._replay = None
+        self._prepared_match = None
+        self._build_match()
+
+    def _new_match(self):
+        """This Method returns (size, seed, overlay, left paddle, right paddle, ball, timers) of a new match
+
+        The ball, the AI and the overlay keep their timers on the match's
+        TimerWheel, which update advances once per tick.
+        """
         (width, height) = self._screen.get_size()
-        self._overlay = Overlay(screen)
-        self._paddle_left = Paddle(screen)
-        self._paddle_right = OpponentAI(screen, width - 70)
-        self._paddle_list = [self._paddle_left, self._paddle_right]
-        self._ball = Ball(
-            screen,
-            self._paddle_list,
+        match_seed = getrandbits(32) if self._seed is None else self._seed
+        timers = TimerWheel()
+        overlay = Overlay(self._screen, timers=timers)
+        paddle_left = Paddle(self._screen)
+        paddle_right = OpponentAI(self._screen, width - 70, seed=match_seed, timers=timers)
+        ball = Ball(
+            self._screen,
+            [paddle_left, paddle_right],
             width/2,
             height/2,
+            timers=timers,
         )
+        return ((width, height), match_seed, overlay, paddle_left, paddle_right, ball, timers)
+
+    def _build_match(self):
+        """This Method sets up the ball, paddles and overlay of a new match
+
+        The match prewarm() prepared is used if the screen is still the
+        same size, so starting a match builds nothing.
+        """
+        match = self._prepared_match
+        self._prepared_match = None
+        if match is None or match[0] != self._screen.get_size():
+            match = self._new_match()
+        (_, self._match_seed, self._overlay, self._paddle_left,
+         self._paddle_right, self._ball, self._timers) = match
+        self._paddle_list = [self._paddle_left, self._paddle_right]
+
+    def prewarm(self):
+        """This Method also builds the next match and renders the text it starts with"""
+        super().prewarm()
+        if self._prepared_match is None:
+            self._prepared_match = self._new_match()
+            self._prepared_match[2].prewarm()
+
+    def likely_next_scenes(self):
+        """This Method returns the win and lose scenes once someone is a point from winning"""
+        if self._next_screen_available:
+            return (self._next_scene,)
+        (score_one, score_two) = self._overlay.get_scores()
+        match_point = self._overlay.get_winning_points() - 1
+        if score_one < match_point and score_two < match_point:
+            return ()
+        return (2, 3) if score_one >= score_two else (3, 2)
 
     def start(self):
-        """This Method reinitializes the Scene and starts it"""
+        """This Method reinitializes the Scene and starts it
+
+        Every match starts from the same positions, so a match is fully
+        decided by its seed and the player's input on every tick.
+        """
         super().start()
         self._next_scene = 0
+        self._build_match()
+        if self._replay:
+            self._replay.start(self)
+
+    def set_seed(self, seed):
+        """This Method fixes the AI seed of the following matches, None picks a new one each match"""
+        self._seed = seed
+        self._prepared_match = None
+
+    @property
+    def match_seed(self):
+        """This Property returns the seed the current match was started with"""
+        return self._match_seed
+
+    def set_replay(self, replay):
+        """This Method attaches a replay.Recorder or replay.Player, or None to detach"""
+        self._replay = replay
+
+    def get_player_input(self):
+        """This Method returns the (going_up, going_down) of the player's paddle"""
+        return self._paddle_left.get_input()
+
+    def set_player_input(self, going_up, going_down):
+        """This Method sets which keys the player is holding"""
+        self._paddle_left.set_input(going_up, going_down)
+
+    def end(self):
+        """This Method ends the scene after the current frame"""
+        self._is_valid = False
+
+    def snapshot(self):
+        """This Method packs the whole match into SNAPSHOT_SIZE bytes
+
+        The layout is fixed, so snapshots can be stored in arrays or
+        files and handed to restore() for a rematch, a rollback or to
+        fan out what-if simulations from one position.
+        """
         (width, height) = self._screen.get_size()
-        self._ball = Ball(
-            self._screen,
-            self._paddle_list,
-            width/2,
-            height/2,
-        )
-        self._overlay = Overlay(self._screen)
+        return b''.join((
+            _SNAPSHOT_HEADER.pack(
+                _SNAPSHOT_MAGIC,
+                _SNAPSHOT_VERSION,
+                width,
+                height,
+                self._match_seed,
+                self._next_scene,
+                self._next_screen_available),
+            self._ball.snapshot(),
+            self._paddle_left.snapshot(),
+            self._paddle_right.snapshot(),
+            self._overlay.snapshot(),
+        ))
+
+    def restore(self, data):
+        """This Method puts the match back exactly where snapshot() was taken"""
+        (magic, version, width, height, self._match_seed, self._next_scene,
+         next_screen_available) = _SNAPSHOT_HEADER.unpack_from(data)
+        if (magic, version) != (_SNAPSHOT_MAGIC, _SNAPSHOT_VERSION) or len(data) != SNAPSHOT_SIZE:
+            raise ValueError('not a GameScene snapshot')
+        if (width, height) != self._screen.get_size():
+            raise ValueError(f'the snapshot is {width}x{height}, the scene is '
+                             f'{self._screen.get_width()}x{self._screen.get_height()}')
+        self._next_screen_available = bool(next_screen_available)
+        offset = self._ball.restore(data, _SNAPSHOT_HEADER.size)
+        offset = self._paddle_left.restore(data, offset)
+        offset = self._paddle_right.restore(data, offset)
+        self._overlay.restore(data, offset)
+        self._full_redraw = True
+
+    def get_state(self):
+        """This Method returns everything the next update depends on as one tuple of numbers"""
+        return (self._ball.get_state() + self._paddle_left.get_state()
+                + self._paddle_right.get_state() + self._overlay.get_state())
+
+    def get_positions(self):
+        """This Method returns (ball_x, ball_y, left_paddle_y, right_paddle_y)"""
+        (x_pos, y_pos) = self._ball.get_position()
+        return (x_pos, y_pos, self._paddle_left.get_y(), self._paddle_right.get_y())
+
+    def get_scores(self):
+        """This Method returns (score_one, score_two, winner), winner as in Overlay.check_winner"""
+        return self._overlay.get_scores() + (self._overlay.check_winner(),)
+
+    def checksum(self):
+        """This Method returns a crc32 of everything the next update depends on"""
+        state = self.get_state()
+        return zlib.crc32(struct.pack(f'<{len(state)}d', *state))
 
     def update(self):
         """This Method updates the ball, paddles, overlay, sound, and etc"""
         # print('I am the game scene, you will quote everything i say')
+        if self._replay:
+            self._replay.before_update(self)
+        if self._profiler:
+            mark = time.perf_counter()
         self._ball.update()
+        self._timers.advance() #serves, rebounds, the AI delay, the tutorial and arrow flashes
+        if self._profiler:
+            mark = self._profiler.lap('update.ball', mark)
         self._paddle_left.update()
         self._paddle_right.update(self._ball)
+        if self._profiler:
+            mark = self._profiler.lap('update.paddles', mark)
         self._overlay.update(self._ball)
+        if self._profiler:
+            self._profiler.lap('update.overlay', mark)
         if not self._playing_song:
             self._playing_song = True
         if self._overlay.check_winner():
@@ -210,43 +505,69 @@ class GameScene(Scene):
                 self._next_scene = 2
             if self._overlay.check_winner() == 2:
                 self._next_scene = 3
-
-    def draw(self):
-        """This Method redraws all game scene objects"""
-        super().draw()
-        self._overlay.draw()
-        self._ball.draw()
-        self._paddle_left.draw()
-        self._paddle_right.draw()
+        if self._replay:
+            self._replay.after_update(self)
+
+    def is_animating(self):
+        """This Method returns if the ball or a paddle moved in the last update"""
+        return (self._ball.is_moving or self._paddle_left.is_moving()
+                or self._paddle_right.is_moving())
+
+    def draw_state(self):
+        """This Method returns everything the ball, paddles and overlay are drawn from"""
+        return (self._ball.get_draw_state() + self._paddle_left.get_draw_state()
+                + self._paddle_right.get_draw_state() + self._overlay.get_draw_state())
+
+    def _draw_static(self, layer):
+        """This Method bakes the centerline and goal lines into the static layer"""
+        self._overlay.draw_static(layer)
+        self._paddle_left.draw_static(layer)
+        self._paddle_right.draw_static(layer)
+
+    def draw(self, alpha=1.0):
+        """This Method redraws all game scene objects, alpha of the way into the last update"""
+        return self._draw_dirty(
+            (self._overlay, self._ball, self._paddle_left, self._paddle_right), alpha)
 
     def handle_event(self, event):
-        """This Method user inputs"""
+        """This Method user inputs, looked up in the key tables"""
         super().handle_event(event)
-        if event.type == pygame.KEYDOWN and event.key == pygame.K_RETURN \
-           and self._next_screen_available:
+        if event.type != pygame.KEYDOWN and event.type != pygame.KEYUP:
+            return
+        if event.type == pygame.KEYDOWN and event.key in self._KEY_ACTIONS:
+            getattr(self, self._KEY_ACTIONS[event.key])()
+        elif event.key in KEYMAP and not (self._replay and self._replay.drives_input):
+            self._paddle_left.move(event) #paddles move or stop moving
+
+    def poll_input(self, pressed):
+        """This Method sets the player's paddle from the keys held right now"""
+        if not (self._replay and self._replay.drives_input):
+            self._paddle_left.set_input(*poll_keys(pressed))
+
+    def _leave(self):
+        """This Method ends the scene once the match is over, Enter"""
+        if self._next_screen_available:
             self._is_valid = False
-        # elif event.type == pygame.KEYDOWN and event.key == pygame.K_q:
-        #     if self._ball.is_moving:
-        #         self._ball.stop()
-        #     else:
-        #         self._ball.start()
-        elif event.type == pygame.KEYDOWN and event.key == pygame.K_m:
-            self._ball.toggle_sfx()
-            self.toggle_soundtrack()
-        elif event.type == pygame.KEYDOWN and event.key == pygame.K_t:
-            self._overlay.toggle_tutorial()
-        elif (event.type == pygame.KEYDOWN and \
-        (event.key == pygame.K_s \
-         or event.key == pygame.K_w \
-         or event.key == pygame.K_UP \
-         or event.key == pygame.K_DOWN)):
-            self._paddle_left.move(event) #paddles move
-        elif event.type == pygame.KEYUP:
-            self._paddle_left.move(event) #paddles stop moving
+
+    def _toggle_sound(self):
+        """This Method turns the bounce sound and the soundtrack on or off, M"""
+        self._ball.toggle_sfx()
+        self.toggle_soundtrack()
+
+    def _toggle_tutorial(self):
+        """This Method shows or hides the tutorial, T"""
+        self._overlay.toggle_tutorial()
+
+    def get_player_drawn_rect(self):
+        """This Method returns the rect the player's paddle was last drawn at, or None"""
+        rects = self._paddle_left.get_drawn_rects()
+        return rects[0] if rects else None
 
     def stop(self):
         """This Method stops the current scene and returns the next scene int"""
         super().stop()
+        if self._replay:
+            self._replay.stop(self)
         return self._next_scene
 
 class WinScene(Scene):
@@ -261,24 +582,22 @@ class WinScene(Scene):
         self._frame_rate = 2
         self._next_scene = 4
 
-    def draw(self):
-        """This Method draws all win screen text"""
-        super().draw()
-        (width, height) = self._screen.get_size()
+    def _draw_static(self, layer):
+        """This Method bakes all win screen text into the static layer"""
+        (width, height) = layer.get_size()
 
         #You Win title
-        title_font = pygame.font.Font(pygame.font.get_default_font(), 100)
-        rendered_title = title_font.render(self._title, True, (0, 0, 0))
-        title_position = rendered_title.get_rect(center=(width * 0.5, height * 0.5))
-        self._screen.blit(rendered_title, title_position)
+        text_cache.blit(layer, self._title, 100, (0, 0, 0),
+                        center=(width * 0.5, height * 0.5))
 
         #Subtext to win
         subtitle = "Press 'ENTER' to play again, or 'ESC' to exit"
-        subtitle_font = pygame.font.Font(pygame.font.get_default_font(), 16)
-        rendered_subtitle = subtitle_font.render(subtitle, True, (0, 0, 0))
-        subtitle_position = rendered_subtitle.get_rect(center=(width * 0.5, height * 0.6))
-        self._screen.blit(rendered_subtitle, subtitle_position)
+        text_cache.blit(layer, subtitle, 16, (0, 0, 0),
+                        center=(width * 0.5, height * 0.6))
 
+    def likely_next_scenes(self):
+        """This Method returns the game scene, for a rematch"""
+        return (1,)
 
     def start(self):
         """This Method starts the Win screen"""
@@ -309,23 +628,22 @@ class LoseScene(Scene):
         self._frame_rate = 2
         self._next_scene = 4
 
-    def draw(self):
-        """This Method draws all Lose screen text"""
-        super().draw()
-        (width, height) = self._screen.get_size()
+    def _draw_static(self, layer):
+        """This Method bakes all Lose screen text into the static layer"""
+        (width, height) = layer.get_size()
 
         #You Lost title
-        title_font = pygame.font.Font(pygame.font.get_default_font(), 100)
-        rendered_title = title_font.render(self._title, True, (255, 255, 255))
-        title_position = rendered_title.get_rect(center=(width * 0.5, height * 0.5))
-        self._screen.blit(rendered_title, title_position)
+        text_cache.blit(layer, self._title, 100, (255, 255, 255),
+                        center=(width * 0.5, height * 0.5))
 
         #Subtext to lose
         subtitle = "...but you can try again by pressing 'ENTER', or 'ESC' if you want to exit"
-        subtitle_font = pygame.font.Font(pygame.font.get_default_font(), 16)
-        rendered_subtitle = subtitle_font.render(subtitle, True, (255, 255, 255))
-        subtitle_position = rendered_subtitle.get_rect(center=(width * 0.5, height * 0.6))
-        self._screen.blit(rendered_subtitle, subtitle_position)
+        text_cache.blit(layer, subtitle, 16, (255, 255, 255),
+                        center=(width * 0.5, height * 0.6))
+
+    def likely_next_scenes(self):
+        """This Method returns the game scene, for a rematch"""
+        return (1,)
 
     def start(self):
         """This Method starts the Lose screen"""
@@ -343,3 +661,185 @@ class LoseScene(Scene):
         if event.type == pygame.KEYDOWN and event.key == pygame.K_RETURN:
             self._is_valid = False
             self._next_scene = 1
+
+
+class ArenaScene(Scene):
+    """This Class plays the arena, hundreds of balls against two to eight paddles
+
+    The rules are ponggame.arena's; the player has the left paddle, W and
+    S or the arrow keys move it like in the GameScene.
+    """
+    _KEY_ACTIONS = {pygame.K_RETURN: '_leave', pygame.K_m: '_toggle_sound'}
+
+    def __init__(self, screen, background_color, balls=arena.DEFAULT_BALLS,
+                 paddles=arena.DEFAULT_PADDLES, lives=None,
+                 soundtrack='HoliznaCC0 - Dance Till You Die.wav', seed=None):
+        super().__init__(screen, background_color, soundtrack)
+        self._frame_rate = 120
+        self._next_scene = 0
+        self._next_screen_available = False
+        self._balls = balls
+        self._paddles = paddles
+        self._lives = lives
+        self._seed = seed
+        self._going_up = False
+        self._going_down = False
+        self._color = pygame.Color(255, 255, 255)
+        self._paddle_color = pygame.Color(0, 255, 255)
+        self._ball_sprite = None
+        self._is_sound_on = True
+        self._bounce_sound = assets.get_sound(Ball.bounce_sound, 0.2)
+        self._bounce_channel = assets.get_channel(2) if self._bounce_sound else None
+        self._sides_in_play = None
+        self._arena = None
+        self._new_arena()
+
+    def _new_arena(self):
+        """This Method sets up a new arena match"""
+        (width, height) = self._screen.get_size()
+        seed = getrandbits(32) if self._seed is None else self._seed
+        self._arena = arena.Arena(self._balls, self._paddles, width, height, self._lives, seed)
+        sides_in_play = self._get_sides_in_play()
+        if sides_in_play != self._sides_in_play:
+            self._sides_in_play = sides_in_play
+            self._background = None
+
+    def _get_sides_in_play(self):
+        """This Method returns which sides are still goals"""
+        return tuple(self._arena.goal & (self._arena.lives > 0))
+
+    def set_seed(self, seed):
+        """This Method fixes the seed of the following arenas, None picks a new one each time"""
+        self._seed = seed
+
+    def start(self):
+        """This Method starts a new arena match"""
+        super().start()
+        self._next_scene = 0
+        self._next_screen_available = False
+        self._going_up = False
+        self._going_down = False
+        self._new_arena()
+
+    def update(self):
+        """This Method steps the arena and plays the bounce sound on paddle hits"""
+        events = self._arena.step(self._going_up, self._going_down)
+        if events & sim.EVENT_PADDLE and self._is_sound_on and self._bounce_channel:
+            self._bounce_channel.play(self._bounce_sound)
+        sides_in_play = self._get_sides_in_play()
+        if sides_in_play != self._sides_in_play:
+            self._sides_in_play = sides_in_play
+            self._background = None #a side is out, its goal line turns into a wall
+        if self._arena.winner and not self._next_screen_available:
+            self._next_screen_available = True
+            self._next_scene = 2 if self._arena.winner == 1 else 3
+
+    def is_animating(self):
+        """This Method returns True, the balls never stop"""
+        return True
+
+    def draw_state(self):
+        """This Method returns the frame, every frame looks different"""
+        return self._arena.frame
+
+    def likely_next_scenes(self):
+        """This Method returns the win and lose scenes once a side is nearly out"""
+        if self._next_screen_available:
+            return (self._next_scene,)
+        lives = self._arena.lives[self._arena.goal]
+        if lives.min() > max(1, lives.max() // 4):
+            return ()
+        return (3, 2) if self._arena.lives[arena.LEFT] == lives.min() else (2, 3)
+
+    def _draw_static(self, layer):
+        """This Method draws the goal lines of the sides in play and walls for the others"""
+        (width, height) = layer.get_size()
+        depth = arena.GOAL_DEPTH
+        for (side, goal_line, wall) in (
+                (arena.LEFT, ((depth, 0), (depth, height)), ((0, 0), (0, height))),
+                (arena.RIGHT, ((width - depth, 0), (width - depth, height)),
+                 ((width - 1, 0), (width - 1, height))),
+                (arena.TOP, ((0, depth), (width, depth)), ((0, 0), (width, 0))),
+                (arena.BOTTOM, ((0, height - depth), (width, height - depth)),
+                 ((0, height - 1), (width, height - 1)))):
+            if self._sides_in_play[side]:
+                pygame.draw.line(layer, self._paddle_color, *goal_line)
+            else:
+                pygame.draw.line(layer, self._color, *wall, 10)
+
+    def _get_ball_sprite(self):
+        """This Method returns the ball drawn once, so every ball is a blit"""
+        if self._ball_sprite is None:
+            radius = self._arena.radius
+            sprite = pygame.Surface((radius * 2 + 1, radius * 2 + 1))
+            sprite.fill((0, 0, 0))
+            pygame.draw.circle(sprite, sim.BALL_COLOR, (radius, radius), radius)
+            sprite.set_colorkey((0, 0, 0))
+            if pygame.display.get_surface() is not None:
+                sprite = sprite.convert()
+            self._ball_sprite = sprite
+        return self._ball_sprite
+
+    def draw(self, alpha=1.0):
+        """This Method draws the arena, alpha of the way into the last update"""
+        super().draw(alpha)
+        the_arena = self._arena
+        (width, height) = self._screen.get_size()
+        corner = np.stack((the_arena.last_x + (the_arena.x - the_arena.last_x) * alpha,
+                           the_arena.last_y + (the_arena.y - the_arena.last_y) * alpha), axis=1)
+        corner -= the_arena.radius
+        self._screen.blits(zip(repeat(self._get_ball_sprite()), corner.astype(np.int32).tolist()),
+                           False)
+        for rect in the_arena.paddle_rects():
+            pygame.draw.rect(self._screen, self._paddle_color, rect)
+
+        #lives left on every side in play
+        digits = text_cache.score_digits(40, self._color)
+        for (side, center) in ((arena.LEFT, (width * 0.12, height * 0.5)),
+                               (arena.RIGHT, (width * 0.88, height * 0.5)),
+                               (arena.TOP, (width * 0.5, height * 0.16)),
+                               (arena.BOTTOM, (width * 0.5, height * 0.84))):
+            if self._sides_in_play[side]:
+                digits.draw(self._screen, int(the_arena.lives[side]), center=center)
+
+        if the_arena.winner:
+            if the_arena.winner == 1:
+                (banner, color) = ("YOU WON", pygame.Color(0, 255, 0))
+            else:
+                (banner, color) = ("You Lost", pygame.Color(255, 0, 0))
+            text_cache.blit(self._screen, banner, 100, color, center=(width * 0.5, height * 0.45))
+            text_cache.blit(self._screen, "Press 'Enter' to Continue", 25, color,
+                            center=(width * 0.5, height * 0.6))
+        return None
+
+    def handle_event(self, event):
+        """This Method moves the player's paddle and handles Enter and M"""
+        super().handle_event(event)
+        if event.type != pygame.KEYDOWN and event.type != pygame.KEYUP:
+            return
+        if event.type == pygame.KEYDOWN and event.key in self._KEY_ACTIONS:
+            getattr(self, self._KEY_ACTIONS[event.key])()
+        elif event.key in KEYMAP:
+            if KEYMAP[event.key]:
+                self._going_up = event.type == pygame.KEYDOWN
+            else:
+                self._going_down = event.type == pygame.KEYDOWN
+
+    def poll_input(self, pressed):
+        """This Method sets the player's paddle from the keys held right now"""
+        (self._going_up, self._going_down) = poll_keys(pressed)
+
+    def _leave(self):
+        """This Method ends the arena once it is won, Enter"""
+        if self._next_screen_available:
+            self._is_valid = False
+
+    def _toggle_sound(self):
+        """This Method turns the bounce sound and the soundtrack on or off, M"""
+        self._is_sound_on = not self._is_sound_on
+        self.toggle_soundtrack()
+
+    def stop(self):
+        """This Method stops the arena and returns the next scene int"""
+        super().stop()
+        return self._next_scene
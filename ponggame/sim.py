@@ -0,0 +1,446 @@
+"""This Module holds the headless pong simulation
+
+A match is kept as plain numbers in a MatchState so it can be stepped
+without a window or an audio device.  step() follows the same order as
+GameScene.update: Ball.update, Paddle.update, OpponentAI.update and then
+the scoring half of Overlay.update.  Drawing and sound are optional
+observers that get called with the events of every step.
+"""
+import math
+
+DEFAULT_RADIUS = 5
+BALL_COLOR = (0, 255, 0)
+REBOUND_FRAMES = 40
+START_DELAY = 840
+RESET_DELAY = 60
+AI_DELAY = 10
+WINNING_POINTS = 3
+AI_OFFSET_RANGE = 0.4 #the AI aims up to this fraction of its height off the ball, either way
+
+#step() events, or'ed together
+EVENT_WALL = 1
+EVENT_PADDLE = 2
+EVENT_POINT = 4
+EVENT_GAME_OVER = 8
+EVENT_BOUNCE = EVENT_WALL | EVENT_PADDLE
+
+NO_INPUT = (False, False)
+
+#fractions of the paddle height that pick one of the seven rebound angles
+_REBOUND_HEIGHTS = (0, 0.25, 0.40, 0.50, 0.60, 0.75, 1)
+_REBOUND_ANGLES = (-70, -45, -20, 0, 20, 45, 70)
+
+
+def _rotation(angle):
+    """This Function returns (cos, sin) the way Vector2.rotate computes them"""
+    angle = math.fmod(angle, 360.)
+    if angle < 0:
+        angle += 360.
+    if angle == 0:
+        return (1., 0.)
+    angle = angle * math.pi / 180.
+    return (math.cos(angle), math.sin(angle))
+
+_REBOUND_ROTATIONS = tuple(_rotation(angle) for angle in _REBOUND_ANGLES)
+
+
+def next_random(rng_state):
+    """This Function advances a 32 bit xorshift generator"""
+    rng_state ^= (rng_state << 13) & 0xFFFFFFFF
+    rng_state ^= rng_state >> 17
+    rng_state ^= (rng_state << 5) & 0xFFFFFFFF
+    return rng_state
+
+
+def seed_random(seed):
+    """This Function turns any int into a valid (non zero) generator state"""
+    return (seed & 0xFFFFFFFF) or 0x9E3779B9
+
+
+def random_offset(rng_state, half_range):
+    """This Function returns (offset, new_state) with -half_range <= offset < half_range"""
+    rng_state = next_random(rng_state)
+    span = int(half_range * 2)
+    if span <= 0:
+        return (0, rng_state)
+    return (rng_state % span - int(half_range), rng_state)
+
+
+def rebound_direction(paddle_y, paddle_height, y_position):
+    """This Function returns which of the seven rebound angles a hit picks"""
+    best = 100000
+    direction = -1
+    for index, fraction in enumerate(_REBOUND_HEIGHTS):
+        distance = abs(paddle_y + paddle_height * fraction - y_position)
+        if distance < best:
+            best = distance
+            direction = index
+    return direction
+
+
+def change_angle(x_velocity, y_velocity, direction):
+    """This Function returns the velocity after a paddle hit in a direction"""
+    speed = math.sqrt(x_velocity * x_velocity + y_velocity * y_velocity)
+    (cos_value, sin_value) = _REBOUND_ROTATIONS[direction]
+    new_x = cos_value * speed
+    if x_velocity > 0:
+        new_x = -1 * new_x
+    return (new_x, sin_value * speed)
+
+
+def rebound_velocity(x_velocity, y_velocity, x_normal, y_normal, direction):
+    """This Function returns the velocity after hitting a paddle with a contact normal
+
+    Hits on the face use the rebound angle of direction, hits on the top,
+    bottom or a corner reflect off the normal.
+    """
+    if abs(x_normal) >= abs(y_normal):
+        (new_x, new_y) = change_angle(x_velocity, y_velocity, direction)
+        return (math.copysign(new_x, x_normal), new_y)
+    dot = x_velocity * x_normal + y_velocity * y_normal
+    return (x_velocity - 2 * dot * x_normal, y_velocity - 2 * dot * y_normal)
+
+
+def _slab(position, move, low, high):
+    """This Function returns when a moving point enters and leaves [low, high]"""
+    if move == 0:
+        if low <= position <= high:
+            return (-math.inf, math.inf)
+        return (math.inf, -math.inf)
+    if move > 0:
+        return ((low - position) / move, (high - position) / move)
+    return ((high - position) / move, (low - position) / move)
+
+
+def _touching_normal(x_pos, y_pos, rad, left, top, right, bottom):
+    """This Function returns the contact normal if the circle touches the rect"""
+    x_gap = x_pos - min(max(x_pos, left), right)
+    y_gap = y_pos - min(max(y_pos, top), bottom)
+    distance_squared = x_gap * x_gap + y_gap * y_gap
+    if distance_squared > rad * rad:
+        return None
+    if distance_squared > 0:
+        distance = math.sqrt(distance_squared)
+        return (x_gap / distance, y_gap / distance)
+    #center is inside the rect, push out through the closest side
+    depths = (x_pos - left, right - x_pos, y_pos - top, bottom - y_pos)
+    return ((-1., 0.), (1., 0.), (0., -1.), (0., 1.))[depths.index(min(depths))]
+
+
+def sweep_circle_rect(x_pos, y_pos, x_move, y_move, rad, rect):
+    """This Function finds the first contact of a moving circle with a rect
+
+    The circle moves from (x_pos, y_pos) by (x_move, y_move).  rect is
+    (left, top, width, height).  Returns (time, x_normal, y_normal) with
+    time in [0, 1] and the normal pointing out of the rect, or None.
+    """
+    (left, top, width, height) = rect
+    right = left + width
+    bottom = top + height
+    normal = _touching_normal(x_pos, y_pos, rad, left, top, right, bottom)
+    if normal:
+        if x_move * normal[0] + y_move * normal[1] >= 0:
+            return None #already leaving the rect
+        return (0., normal[0], normal[1])
+
+    #slabs of the rect grown by the radius
+    (x_near, x_far) = _slab(x_pos, x_move, left - rad, right + rad)
+    (y_near, y_far) = _slab(y_pos, y_move, top - rad, bottom + rad)
+    enter = max(0., x_near, y_near)
+    if enter > min(1., x_far, y_far):
+        return None
+    hit_x = x_pos + x_move * enter
+    hit_y = y_pos + y_move * enter
+    if y_near > x_near and y_near > 0:
+        if left <= hit_x <= right:
+            return (enter, 0., -math.copysign(1., y_move))
+    elif x_near > 0:
+        if top <= hit_y <= bottom:
+            return (enter, -math.copysign(1., x_move), 0.)
+
+    #entered the grown rect at a corner, so the real contact is on its arc
+    x_gap = x_pos - (left if hit_x < left else right)
+    y_gap = y_pos - (top if hit_y < top else bottom)
+    a_term = x_move * x_move + y_move * y_move
+    b_term = x_gap * x_move + y_gap * y_move
+    c_term = x_gap * x_gap + y_gap * y_gap - rad * rad
+    discriminant = b_term * b_term - a_term * c_term
+    if a_term == 0 or discriminant < 0:
+        return None
+    time = (-b_term - math.sqrt(discriminant)) / a_term
+    if time < 0 or time > 1:
+        return None
+    return (time, (x_gap + x_move * time) / rad, (y_gap + y_move * time) / rad)
+
+
+def intercept_y(x_pos, y_pos, x_velocity, y_velocity, goal_x, height):
+    """This Function returns where the ball will cross goal_x, or None
+
+    The top and bottom wall bounces of Ball._bounce are folded in by
+    unrolling the court: the ball's path is a straight line through
+    mirrored copies of the court, so the crossing only needs to be
+    reflected back into [0, height].
+    """
+    if x_velocity == 0 or (goal_x - x_pos) * x_velocity < 0:
+        return None
+    y_pos = y_pos + y_velocity * (goal_x - x_pos) / x_velocity
+    period = 2 * height
+    y_pos = y_pos % period
+    if y_pos > height:
+        y_pos = period - y_pos
+    return y_pos
+
+
+def ai_goal_x(paddle_x, paddle_width, court_width, rad):
+    """This Function returns the x where the ball center meets the AI paddle face"""
+    if paddle_x > court_width / 2:
+        return paddle_x - rad
+    return paddle_x + paddle_width + rad
+
+
+def ai_direction(target_y, paddle_y, height, upper_bound, lower_bound, speed):
+    """This Function returns (going_up, going_down) to center the paddle on target_y"""
+    center = paddle_y + height / 2
+    if target_y < center - speed and paddle_y - speed >= upper_bound:
+        return (True, False)
+    if target_y > center + speed and paddle_y + speed <= lower_bound:
+        return (False, True)
+    return NO_INPUT
+
+
+class BallState:
+    """This Class holds the ball part of a match"""
+    def __init__(self, x_pos, y_pos, radius=DEFAULT_RADIUS):
+        self.start_x = x_pos
+        self.start_y = y_pos
+        self.x = x_pos
+        self.y = y_pos
+        self.x_velocity = 0.
+        self.y_velocity = 0.
+        self.radius = radius
+        self.max_velocity = radius * 2
+        self.red = BALL_COLOR[0]
+        self.green = BALL_COLOR[1]
+        self.scored_left = False
+        self.round_in_progress = False
+        self.game_is_over = False
+        self.score = 0
+        self.rebound_frames = 0
+        self.reset_timer = START_DELAY
+
+
+class PaddleState:
+    """This Class holds a player paddle"""
+    def __init__(self, win_height, x_pos=40, width=30, height=120, speed=5):
+        self.x = x_pos
+        self.y = (win_height / 2) - (height / 2)
+        self.width = width
+        self.height = height
+        self.speed = speed
+        self.upper_bound = 0
+        self.lower_bound = win_height - height
+        self.going_up = False
+        self.going_down = False
+
+    @property
+    def rect(self):
+        """This Property returns the paddle as (left, top, width, height)"""
+        return (int(self.x), int(self.y), self.width, self.height)
+
+
+class AIState(PaddleState):
+    """This Class holds the AI paddle and its timers"""
+    def __init__(self, win_height, x_pos=20, width=30, height=120, speed=5,
+                 ai_delay=AI_DELAY, offset_range=AI_OFFSET_RANGE):
+        super().__init__(win_height, x_pos, width, height, speed)
+        self.ai_delay = ai_delay
+        self.offset_range = offset_range
+        self.ball_offset = 0
+        self.target_y = win_height / 2
+        self.solved_x_velocity = math.nan
+        self.solved_y_velocity = math.nan
+        self.approaching = False
+
+
+class MatchState:
+    """This Class holds one whole match without any pygame objects"""
+    def __init__(self, width=800, height=500, seed=1, winning_points=WINNING_POINTS):
+        self.width = width
+        self.height = height
+        self.ball = BallState(width / 2, height / 2)
+        self.left = PaddleState(height)
+        self.right = AIState(height, width - 70)
+        self.paddles = (self.left, self.right)
+        self.score_one = 0
+        self.score_two = 0
+        self.winning_points = winning_points
+        self.winner = 0
+        self.rng_state = seed_random(seed)
+        self.frame = 0
+
+
+def _update_ball(state):
+    """This Function moves the ball and does Ball._bounce, returns events"""
+    ball = state.ball
+    last_x = ball.x
+    last_y = ball.y
+    ball.x = ball.x + ball.x_velocity
+    ball.y = ball.y + ball.y_velocity
+    move_x = ball.x - last_x
+    move_y = ball.y - last_y
+    events = 0
+    width = state.width
+    bounced = False
+    scored = ball.x >= width - 30 or ball.x <= 30
+    if scored:
+        ball.scored_left = ball.x < width / 2
+        ball.score = 1
+        ball.x = ball.start_x
+        ball.y = ball.start_y
+        ball.x_velocity = 0.
+        ball.y_velocity = 0.
+        (ball.red, ball.green) = BALL_COLOR[:2]
+        ball.round_in_progress = False
+        ball.reset_timer = RESET_DELAY
+    if ball.y >= state.height or ball.y <= 0:
+        bounced = True
+        events |= EVENT_WALL
+        ball.y_velocity = ball.y_velocity * -1
+    for paddle in state.paddles:
+        if scored or ball.rebound_frames:
+            break
+        hit = sweep_circle_rect(last_x, last_y, move_x, move_y, ball.radius, paddle.rect)
+        if hit:
+            (time, x_normal, y_normal) = hit
+            ball.x = last_x + move_x * time
+            ball.y = last_y + move_y * time
+            direction = rebound_direction(paddle.y, paddle.height, ball.y)
+            (ball.x_velocity, ball.y_velocity) = rebound_velocity(
+                ball.x_velocity, ball.y_velocity, x_normal, y_normal, direction)
+            bounced = True
+            events |= EVENT_PADDLE
+            ball.rebound_frames = REBOUND_FRAMES
+    if bounced:
+        speed_squared = ball.x_velocity * ball.x_velocity + ball.y_velocity * ball.y_velocity
+        if speed_squared < ball.max_velocity * ball.max_velocity:
+            ball.x_velocity = ball.x_velocity * 1.1
+            ball.y_velocity = ball.y_velocity * 1.1
+            if ball.red + 10 <= 255 and ball.green - 10 >= 0:
+                ball.red += 15
+                ball.green -= 15
+    if ball.rebound_frames:
+        ball.rebound_frames -= 1
+    if not ball.round_in_progress and not ball.reset_timer:
+        speed = DEFAULT_RADIUS if ball.scored_left else -DEFAULT_RADIUS
+        ball.x_velocity = speed * 0.3
+        ball.y_velocity = speed * 0.1
+        ball.round_in_progress = True
+    elif not ball.game_is_over:
+        ball.reset_timer -= 1
+    return events
+
+
+def _update_paddle(paddle):
+    """This Function does Paddle.update"""
+    if paddle.going_down and paddle.y <= paddle.lower_bound - 20:
+        paddle.y = paddle.y + paddle.speed
+    elif paddle.going_up and paddle.y >= paddle.upper_bound + 20:
+        paddle.y = paddle.y - paddle.speed
+
+
+def _solve_ai(state, paddle):
+    """This Function re-solves where the AI should be after the ball changed velocity"""
+    ball = state.ball
+    paddle.solved_x_velocity = ball.x_velocity
+    paddle.solved_y_velocity = ball.y_velocity
+    goal_x = ai_goal_x(paddle.x, paddle.width, state.width, ball.radius)
+    heading = intercept_y(ball.x, ball.y, ball.x_velocity, ball.y_velocity,
+                          goal_x, state.height)
+    if heading is None:
+        paddle.approaching = False
+        paddle.target_y = state.height / 2
+        return
+    if not paddle.approaching:
+        paddle.approaching = True
+        (paddle.ball_offset, state.rng_state) = random_offset(
+            state.rng_state, paddle.height * paddle.offset_range)
+    paddle.target_y = heading + paddle.ball_offset
+
+
+def _update_ai(state, paddle):
+    """This Function does OpponentAI.update"""
+    if not paddle.ai_delay:
+        ball = state.ball
+        if ball.x_velocity != paddle.solved_x_velocity \
+        or ball.y_velocity != paddle.solved_y_velocity:
+            _solve_ai(state, paddle)
+        (paddle.going_up, paddle.going_down) = ai_direction(
+            paddle.target_y, paddle.y, paddle.height,
+            paddle.upper_bound, paddle.lower_bound, paddle.speed)
+    else:
+        paddle.ai_delay -= 1
+    if paddle.going_up:
+        paddle.y = paddle.y - paddle.speed
+    elif paddle.going_down:
+        paddle.y = paddle.y + paddle.speed
+
+
+def _update_score(state):
+    """This Function does the scoring half of Overlay.update, returns events"""
+    ball = state.ball
+    events = 0
+    if ball.score > 0:
+        events |= EVENT_POINT
+        if not ball.scored_left:
+            state.score_one += ball.score
+        else:
+            state.score_two += ball.score
+        ball.score = 0
+    if state.score_one == state.winning_points:
+        winner = 1
+    elif state.score_two == state.winning_points:
+        winner = state.winner or 2
+    else:
+        return events
+    if not state.winner:
+        events |= EVENT_GAME_OVER
+    state.winner = winner
+    ball.game_is_over = True
+    (ball.red, ball.green) = (0, 0)
+    return events
+
+
+def step(state, inputs=NO_INPUT, observers=()):
+    """This Function advances a match one frame and returns its events
+
+    inputs is (going_up, going_down) for the left paddle and is ignored
+    when the left paddle is an AIState too, every observer is called as
+    observer(state, events) once the frame is done.
+    """
+    left_is_ai = isinstance(state.left, AIState)
+    if not left_is_ai:
+        (state.left.going_up, state.left.going_down) = inputs
+    events = _update_ball(state)
+    if left_is_ai:
+        _update_ai(state, state.left)
+    else:
+        _update_paddle(state.left)
+    _update_ai(state, state.right)
+    events |= _update_score(state)
+    state.frame += 1
+    for observer in observers:
+        observer(state, events)
+    return events
+
+
+def run(state, frames, controller=None, observers=()):
+    """This Function steps a match up to frames times or until someone wins
+
+    controller is called as controller(state) and returns the left inputs.
+    """
+    for _ in range(frames):
+        inputs = controller(state) if controller else NO_INPUT
+        step(state, inputs, observers)
+        if state.winner:
+            break
+    return state
@@ -0,0 +1,51 @@
+"""This Module holds the optional pygame observers for the headless sim
+
+An observer is any callable taking (state, events); these two give a
+simulated match the same look and sound as the GameScene.
+"""
+import pygame
+from ponggame import assets, sim, text_cache
+from ponggame.ball import Ball
+from ponggame.game_overlay import draw_centerline
+
+
+class SoundObserver:
+    """This Class plays the bounce sound when the sim reports a bounce"""
+    def __init__(self, volume=0.2, channel=2):
+        self._bounce_sound = assets.get_sound(Ball.bounce_sound, volume)
+        self._bounce_channel = assets.get_channel(channel) if self._bounce_sound else None
+
+    def __call__(self, state, events):
+        if events & sim.EVENT_BOUNCE and self._bounce_channel:
+            self._bounce_channel.play(self._bounce_sound)
+
+
+class DrawObserver:
+    """This Class draws a simulated match onto a surface"""
+    def __init__(self, surface, background_color=(0, 0, 0),
+                 color=(255, 255, 255), paddle_color=(0, 255, 255)):
+        self._surface = surface
+        self._background_color = background_color
+        self._color = pygame.Color(color)
+        self._paddle_color = pygame.Color(paddle_color)
+
+    def __call__(self, state, events):
+        (width, height) = self._surface.get_size()
+        self._surface.fill(self._background_color)
+        #the GameScene's score digits and dashed centerline, from the shared caches
+        score_digits = text_cache.score_digits(100, self._color)
+        for (score, x_fraction) in ((state.score_one, 0.4), (state.score_two, 0.6)):
+            score_digits.draw(self._surface, score, center=(width * x_fraction, height * 0.1))
+        draw_centerline(self._surface, self._color)
+        (left, right) = state.paddles
+        #goal lines behind the paddles, like Paddle.draw_static and OpponentAI.draw_static
+        for goal_x in (left.x, right.x + right.width):
+            pygame.draw.line(self._surface, self._paddle_color, (goal_x, height), (goal_x, 0))
+        for paddle in state.paddles:
+            pygame.draw.rect(self._surface, self._paddle_color, paddle.rect)
+        ball = state.ball
+        pygame.draw.circle(
+            self._surface,
+            (ball.red, ball.green, 0),
+            (ball.x, ball.y),
+            ball.radius)
@@ -0,0 +1,130 @@
+"""This Module caches fonts and rendered text for the overlay and scenes
+
+Building a pygame.font.Font and rasterizing a string are the most
+expensive things a frame does, and almost every string on screen is the
+same from one frame to the next.  Fonts are kept in a registry keyed by
+(face, size) and rendered surfaces in a bounded LRU keyed by
+(text, size, color, antialias, face).
+
+A Font belongs to the pygame it was made with and crashes if it is used
+after pygame.quit(), so the caches empty themselves when pygame quits.
+"""
+from collections import OrderedDict
+import pygame
+
+DEFAULT_CACHE_SIZE = 256
+
+_fonts = {}
+_digits = {}
+_rendered = OrderedDict()
+_max_size = DEFAULT_CACHE_SIZE
+_clears_on_quit = False
+
+
+def _clear_on_quit():
+    """This Function has the next pygame.quit() clear the caches, pygame forgets it after"""
+    global _clears_on_quit # pylint: disable=global-statement
+    if not _clears_on_quit:
+        _clears_on_quit = True
+        pygame.register_quit(_on_quit)
+
+
+def _on_quit():
+    """This Function clears the caches, pygame.quit() calls it"""
+    global _clears_on_quit # pylint: disable=global-statement
+    _clears_on_quit = False
+    clear()
+
+
+def get_font(size, face=None):
+    """This Function returns the shared Font for face (default font if None) and size"""
+    key = (face, size)
+    font = _fonts.get(key)
+    if font is None:
+        _clear_on_quit()
+        font = pygame.font.Font(face or pygame.font.get_default_font(), size)
+        _fonts[key] = font
+    return font
+
+
+def _color_key(color):
+    """This Function turns any pygame color argument into a hashable key"""
+    if isinstance(color, (int, str)):
+        return color
+    return tuple(color)
+
+
+def render(text, size, color, antialias=True, face=None):
+    """This Function returns a rendered text surface, from the cache if it can
+
+    The returned surface is shared, so callers must only blit it.
+    """
+    key = (text, size, _color_key(color), antialias, face)
+    surface = _rendered.get(key)
+    if surface is not None:
+        _rendered.move_to_end(key)
+        return surface
+    surface = get_font(size, face).render(text, antialias, color)
+    _rendered[key] = surface
+    if len(_rendered) > _max_size:
+        _rendered.popitem(last=False)
+    return surface
+
+
+def blit(target, text, size, color, antialias=True, face=None, **position):
+    """This Function blits cached text placed like Rect.get_rect(**position), returns its rect"""
+    rendered = render(text, size, color, antialias, face)
+    rect = rendered.get_rect(**position)
+    target.blit(rendered, rect)
+    return rect
+
+
+def score_digits(size, color, antialias=True, face=None):
+    """This Function returns the shared ScoreDigits for a size and color"""
+    key = (size, _color_key(color), antialias, face)
+    digits = _digits.get(key)
+    if digits is None:
+        digits = ScoreDigits(size, color, antialias, face)
+        _digits[key] = digits
+    return digits
+
+
+def set_max_size(max_size):
+    """This Function changes how many rendered strings are kept"""
+    global _max_size
+    _max_size = max_size
+    while len(_rendered) > _max_size:
+        _rendered.popitem(last=False)
+
+
+def clear():
+    """This Function drops every cached font and rendered string"""
+    _fonts.clear()
+    _digits.clear()
+    _rendered.clear()
+
+
+class ScoreDigits:
+    """This Class pre-renders the ten digits once so numbers are only blitted"""
+    def __init__(self, size, color, antialias=True, face=None):
+        font = get_font(size, face)
+        self._glyphs = [font.render(str(digit), antialias, color) for digit in range(10)]
+        self._height = max(glyph.get_height() for glyph in self._glyphs)
+
+    def get_rect(self, number, **position):
+        """This Method returns where number would be drawn, like Surface.get_rect"""
+        width = sum(self._glyphs[int(digit)].get_width() for digit in str(number))
+        rect = pygame.Rect(0, 0, width, self._height)
+        for (name, value) in position.items():
+            setattr(rect, name, value)
+        return rect
+
+    def draw(self, target, number, **position):
+        """This Method blits number placed like Rect.get_rect(**position), returns its rect"""
+        rect = self.get_rect(number, **position)
+        x_pos = rect.x
+        for digit in str(number):
+            glyph = self._glyphs[int(digit)]
+            target.blit(glyph, (x_pos, rect.y))
+            x_pos += glyph.get_width()
+        return rect
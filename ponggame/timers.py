@@ -0,0 +1,178 @@
+"""This Module schedules callbacks on simulation ticks with a hierarchical timer wheel
+
+A TimerWheel belongs to one match.  The ball, the AI and the overlay
+are built with it and arm their Timers on it instead of counting down
+their own timers every tick, and whoever updates them calls advance()
+once per tick; nothing advances a wheel on its own.  A tick with
+nothing due looks at one empty slot and returns.
+
+The wheel has `levels` rings of 2**slot_bits slots.  Timers due within
+the current block of 2**slot_bits ticks sit in the slot of their tick
+on the first ring; later ones sit on a coarser ring and are moved down
+a ring whenever the ticks reach their block.  Timers past the last ring
+wait in an overflow slot.  Because everything is counted in ticks, a
+timer fires on the same update at any frame rate and when the match is
+simulated faster than real time.
+
+Timers are made once by their owner and armed again and again, and a
+slot is the first of a chain of the timers in it, so scheduling and
+advancing allocate nothing.  A timer only holds its owner weakly and
+the chains only point one way, so a wheel and its timers never form a
+reference cycle with the objects that use them.
+
+    timers = TimerWheel()
+    serve = Timer(ball, Ball.start)         #Ball.start(ball) when it fires
+    timers.schedule(serve, 60)              #on the 60th advance from now
+    flash = Timer(overlay, Overlay._flash_arrows)
+    timers.schedule(flash, 90, 90)          #and every 90 ticks after that
+    timers.remaining(serve)                 #advances until it fires
+    timers.cancel(serve)
+"""
+import weakref
+
+DEFAULT_SLOT_BITS = 8
+DEFAULT_LEVELS = 3
+
+_UNLINKED = -1
+
+
+class Timer:
+    """This Class is a countdown a TimerWheel runs, see TimerWheel.schedule
+
+    With an owner, callback(owner) is called when the timer fires.  The
+    owner is held weakly; once it is gone the timer is dropped instead.
+    A timer without an owner just runs out, see pending.
+    """
+    __slots__ = ('due', 'interval', '_owner', '_callback', '_level', '_next')
+
+    def __init__(self, owner=None, callback=None):
+        self.due = 0
+        self.interval = 0
+        self._owner = None if owner is None else weakref.ref(owner)
+        self._callback = callback
+        self._level = _UNLINKED #the ring it waits on
+        self._next = None       #the next timer in its slot
+
+    @property
+    def pending(self):
+        """This Property returns if the timer is scheduled and has not fired"""
+        return self._level != _UNLINKED
+
+
+class TimerWheel:
+    """This Class fires Timers after a number of ticks, see the module docstring"""
+    def __init__(self, slot_bits=DEFAULT_SLOT_BITS, levels=DEFAULT_LEVELS):
+        self._bits = slot_bits
+        self._mask = (1 << slot_bits) - 1
+        #the first Timer of every slot, the last ring is the overflow and has one slot
+        self._rings = [[None] * (1 << slot_bits) for _ in range(levels)] + [[None]]
+        self._overflow_level = levels
+        self._now = 0
+        self._pending = 0
+
+    @property
+    def now(self):
+        """This Property returns how many times the wheel was advanced"""
+        return self._now
+
+    def __len__(self):
+        return self._pending
+
+    def schedule(self, timer, ticks, interval=0):
+        """This Method arms timer to fire on the ticks-th advance from now, returns it
+
+        A timer that is already pending is moved.  With an interval it
+        fires again every interval ticks until it is cancelled.
+        """
+        if ticks < 1:
+            raise ValueError(f'a timer needs at least one tick, not {ticks}')
+        if timer._level == _UNLINKED:
+            self._pending += 1
+        else:
+            self._unlink(timer)
+        timer.due = self._now + ticks
+        timer.interval = interval
+        self._link(timer)
+        return timer
+
+    def cancel(self, timer):
+        """This Method stops timer from firing, a timer that is not pending is left alone"""
+        if timer._level != _UNLINKED:
+            self._unlink(timer)
+            self._pending -= 1
+
+    def remaining(self, timer):
+        """This Method returns how many advances are left until timer fires, 0 if it will not"""
+        return timer.due - self._now if timer._level != _UNLINKED else 0
+
+    def _slot(self, level, due):
+        """This Method returns the slot of the tick due on ring level"""
+        if level == self._overflow_level:
+            return 0
+        return (due >> (self._bits * level)) & self._mask
+
+    def _link(self, timer):
+        """This Method puts timer first in its slot on the finest ring that reaches its tick"""
+        level = 0
+        differs = timer.due ^ self._now
+        #due is not in the same block of the next coarser ring as now
+        while level < self._overflow_level and differs >> (self._bits * (level + 1)):
+            level += 1
+        ring = self._rings[level]
+        slot = self._slot(level, timer.due)
+        timer._level = level
+        timer._next = ring[slot]
+        ring[slot] = timer
+
+    def _unlink(self, timer):
+        """This Method takes timer out of its slot, the slots are short"""
+        ring = self._rings[timer._level]
+        slot = self._slot(timer._level, timer.due)
+        first = ring[slot]
+        if first is timer:
+            ring[slot] = timer._next
+        else:
+            while first._next is not timer:
+                first = first._next
+            first._next = timer._next
+        timer._level = _UNLINKED
+        timer._next = None
+
+    def _cascade(self, level):
+        """This Method moves the timers of the slot now reached on ring level down a ring"""
+        if level == self._overflow_level:
+            slot = 0
+        else:
+            slot = (self._now >> (self._bits * level)) & self._mask
+            if not slot:
+                self._cascade(level + 1) #the coarser ring wrapped too
+        ring = self._rings[level]
+        timer = ring[slot]
+        ring[slot] = None
+        while timer is not None:
+            following = timer._next
+            self._link(timer)
+            timer = following
+
+    def advance(self, ticks=1):
+        """This Method moves the wheel on by ticks, firing every timer that comes due"""
+        ring = self._rings[0]
+        for _ in range(ticks):
+            self._now += 1
+            slot = self._now & self._mask
+            if not slot:
+                self._cascade(1)
+            #taken one at a time, a callback may cancel or schedule other timers
+            timer = ring[slot]
+            while timer is not None:
+                self._unlink(timer)
+                owner = timer._owner() if timer._owner is not None else None
+                if timer.interval and (owner is not None or timer._owner is None):
+                    timer.due += timer.interval
+                    self._link(timer)
+                else:
+                    self._pending -= 1
+                if owner is not None:
+                    timer._callback(owner)
+                timer = ring[slot]
+
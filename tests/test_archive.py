@@ -0,0 +1,148 @@
+"""These tests write GameScene matches to an archive, seek in it and recover it after a crash"""
+import os
+import random
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+
+import numpy as np # pylint: disable=wrong-import-position
+import pygame # pylint: disable=wrong-import-position
+import pytest # pylint: disable=wrong-import-position
+from ponggame import archive, replay # pylint: disable=wrong-import-position
+from ponggame.scene import GameScene # pylint: disable=wrong-import-position
+
+KEYFRAME_INTERVAL = 100
+#(seed, ticks) of the matches every test archive starts with
+MATCHES = ((3, 1000), (4, 777))
+
+
+@pytest.fixture(name='screen')
+def fixture_screen():
+    """This Fixture starts pygame with the dummy drivers and stops it afterwards"""
+    pygame.init()
+    yield pygame.Surface((800, 500))
+    pygame.quit()
+
+
+def _scene(screen, seed):
+    """This Function returns a GameScene for matches with seed"""
+    return GameScene(screen, (0, 0, 0), soundtrack=None, seed=seed)
+
+
+def _play(screen, writer, seed, ticks):
+    """This Function records ticks of a match with changing input into writer"""
+    scene = _scene(screen, seed)
+    scene.set_replay(archive.ArchiveRecorder(writer))
+    scene.start()
+    randomness = random.Random(seed)
+    for _ in range(ticks):
+        if randomness.random() < 0.03:
+            scene.set_player_input(randomness.random() < 0.5, randomness.random() < 0.5)
+        scene.update()
+    scene.stop()
+
+
+@pytest.fixture(name='path')
+def fixture_path(screen, tmp_path):
+    """This Fixture returns the path of an archive holding MATCHES"""
+    path = str(tmp_path / 'matches')
+    with archive.ArchiveWriter(path, KEYFRAME_INTERVAL) as writer:
+        for (seed, ticks) in MATCHES:
+            _play(screen, writer, seed, ticks)
+    return path
+
+
+def _assert_at(scene, reader, match, tick):
+    """This Function checks scene is where match was at the end of tick"""
+    record = reader.tick(match, tick)
+    assert scene.checksum() == record['checksum'], f'match {match} tick {tick}'
+    assert np.allclose(scene.get_positions(), [record[name] for name in (
+        'ball_x', 'ball_y', 'left_y', 'right_y')])
+
+
+def test_index(path):
+    """Every match is indexed with its seed, ticks and keyframes"""
+    with archive.ArchiveReader(path) as reader:
+        assert len(reader) == len(MATCHES)
+        assert reader.index['seed'].tolist() == [seed for (seed, _) in MATCHES]
+        assert reader.index['ticks'].tolist() == [ticks for (_, ticks) in MATCHES]
+        assert len(reader.ticks) == sum(ticks for (_, ticks) in MATCHES)
+        assert reader.match_keyframes(1)['tick'].tolist() == list(range(0, 777, KEYFRAME_INTERVAL))
+
+
+@pytest.mark.parametrize('match, tick', [
+    (0, 0),
+    (0, 1),
+    (0, KEYFRAME_INTERVAL - 1),
+    (0, KEYFRAME_INTERVAL),
+    (0, 537),
+    (0, 999),
+    (1, 0),
+    (1, 776),
+])
+def test_seek(screen, path, match, tick):
+    """Seeking puts a scene exactly where the match was at that tick"""
+    scene = _scene(screen, 0)
+    scene.start()
+    with archive.ArchiveReader(path) as reader:
+        reader.seek(scene, match, tick)
+        _assert_at(scene, reader, match, tick)
+        with pytest.raises(IndexError):
+            reader.tick(match, int(reader.index[match]['ticks']))
+
+
+def test_seek_then_play_on(screen, path):
+    """A scene put at a tick by seek keeps matching the recording after it"""
+    scene = _scene(screen, 0)
+    scene.start()
+    with archive.ArchiveReader(path) as reader:
+        reader.seek(scene, 0, 250)
+        inputs = reader.match_ticks(0)['input'].copy() #views must be gone before close
+        for tick in range(251, 1000):
+            scene.set_player_input(*replay.decode_input(inputs[tick]))
+            scene.update()
+            _assert_at(scene, reader, 0, tick)
+
+
+def test_recording_replays(screen, path):
+    """The recording rebuilt from an archived match verifies as a replay"""
+    with archive.ArchiveReader(path) as reader:
+        recording = reader.recording(1)
+    player = replay.play_headless(recording, screen)
+    assert (player.finished, player.mismatch_tick) == (True, None)
+
+
+@pytest.mark.parametrize('torn', [
+    ('.ticks', 5 * archive.TICK_DTYPE.itemsize + 3),  #ticks of a match never indexed
+    ('.keys', archive.KEYFRAME_DTYPE.itemsize // 2),  #half a keyframe
+    ('.index', archive.INDEX_DTYPE.itemsize - 1),     #an index record cut short
+])
+def test_recovers_from_a_crash(screen, path, torn):
+    """Records a crash left after the last complete match are ignored, then overwritten"""
+    (suffix, size) = torn
+    with open(path + suffix, 'ab') as part:
+        part.write(b'\xff' * size)
+    with archive.ArchiveReader(path) as reader:
+        assert len(reader) == len(MATCHES)
+        assert len(reader.ticks) == sum(ticks for (_, ticks) in MATCHES)
+    with archive.ArchiveWriter(path, KEYFRAME_INTERVAL) as writer:
+        _play(screen, writer, 5, 300)
+    scene = _scene(screen, 0)
+    scene.start()
+    with archive.ArchiveReader(path) as reader:
+        assert len(reader) == len(MATCHES) + 1
+        assert int(reader.index[-1]['first_tick']) == sum(ticks for (_, ticks) in MATCHES)
+        for (match, tick) in ((1, 776), (2, 0), (2, 299)):
+            reader.seek(scene, match, tick)
+            _assert_at(scene, reader, match, tick)
+
+
+def test_other_versions_are_refused(path):
+    """An archive file of another version is refused"""
+    with open(path + '.index', 'r+b') as part:
+        part.seek(8)
+        part.write((archive.VERSION - 1).to_bytes(4, 'little'))
+    with pytest.raises(ValueError):
+        archive.ArchiveReader(path)
+    with pytest.raises(ValueError):
+        archive.ArchiveWriter(path)
@@ -0,0 +1,136 @@
+"""These tests check arena.SpatialHash against a brute force look at every pair of points"""
+import itertools
+
+import numpy as np
+import pytest
+from ponggame.arena import SpatialHash
+
+WIDTH = 100
+HEIGHT = 60
+CELL = 20
+
+
+def _cell(x_pos, y_pos, grid):
+    """This Function returns the (column, row) of a point, clamped onto the grid like SpatialHash"""
+    column = min(max(int(x_pos // CELL), 0), grid.columns - 1)
+    row = min(max(int(y_pos // CELL), 0), grid.rows - 1)
+    return (column, row)
+
+
+def _brute_pairs(x_pos, y_pos, grid):
+    """This Function returns every (first, second) pair in the same or touching cells, first < second"""
+    cells = [_cell(x, y, grid) for (x, y) in zip(x_pos, y_pos)]
+    return {(first, second) for (first, second) in itertools.combinations(range(len(cells)), 2)
+            if abs(cells[first][0] - cells[second][0]) <= 1
+            and abs(cells[first][1] - cells[second][1]) <= 1}
+
+
+def _assert_pairs(grid, x_pos, y_pos):
+    """This Function checks grid.pairs() lists exactly the brute force pairs, each once"""
+    (first, second) = grid.pairs()
+    found = [tuple(sorted(pair)) for pair in zip(first.tolist(), second.tolist())]
+    assert all(one != other for (one, other) in found)
+    assert len(found) == len(set(found))
+    assert set(found) == _brute_pairs(x_pos, y_pos, grid)
+    #cells as big as the collision distance: every pair that close is a candidate
+    close = {(one, other) for (one, other) in itertools.combinations(range(len(x_pos)), 2)
+             if np.hypot(x_pos[one] - x_pos[other], y_pos[one] - y_pos[other]) <= CELL}
+    assert close <= set(found)
+
+
+def _assert_query(grid, x_pos, y_pos, rect):
+    """This Function checks grid.query(*rect) returns exactly the points of the cells rect touches"""
+    (left, top, right, bottom) = rect
+    (first_column, first_row) = _cell(left, top, grid)
+    (last_column, last_row) = _cell(right, bottom, grid)
+    expected = [index for (index, (x, y)) in enumerate(zip(x_pos, y_pos))
+                if first_column <= _cell(x, y, grid)[0] <= last_column
+                and first_row <= _cell(x, y, grid)[1] <= last_row]
+    found = grid.query(*rect).tolist()
+    assert sorted(found) == expected
+    inside = [index for (index, (x, y)) in enumerate(zip(x_pos, y_pos))
+              if left <= x <= right and top <= y <= bottom]
+    assert set(inside) <= set(found)
+
+
+#points on and a hair either side of the cell borders, on the court's edges and off it
+_BORDERS = [-5.0, 0.0, 1e-9, CELL - 1e-9, CELL, CELL + 1e-9, 2 * CELL, 59.999, 60.0,
+            80.0, 99.9, 100.0, 130.0]
+
+
+def _border_points():
+    """This Function returns (x, y) arrays of a point at every pair of border coordinates"""
+    points = list(itertools.product(_BORDERS, _BORDERS))
+    return (np.array([x for (x, _) in points]), np.array([y for (_, y) in points]))
+
+
+def test_grid_shape():
+    """The grid has a cell more than fits, so points on the far edge have their own cells"""
+    grid = SpatialHash(WIDTH, HEIGHT, CELL)
+    assert (grid.columns, grid.rows) == (6, 4)
+
+
+def test_empty():
+    """A grid without points has no pairs and finds nothing"""
+    grid = SpatialHash(WIDTH, HEIGHT, CELL)
+    grid.update(np.empty(0), np.empty(0))
+    assert [len(part) for part in grid.pairs()] == [0, 0]
+    assert len(grid.query(0, 0, WIDTH, HEIGHT)) == 0
+
+
+def test_pairs_on_cell_borders():
+    """Points on, just before and just after every border pair up like the brute force check"""
+    (x_pos, y_pos) = _border_points()
+    grid = SpatialHash(WIDTH, HEIGHT, CELL)
+    assert grid.update(x_pos, y_pos) == len(x_pos)
+    _assert_pairs(grid, x_pos, y_pos)
+
+
+@pytest.mark.parametrize('rect', [
+    (0, 0, WIDTH, HEIGHT),            #everything
+    (CELL, CELL, 2 * CELL, 2 * CELL), #edges on borders take in the cells past them
+    (CELL + 1, CELL + 1, 2 * CELL - 1, 2 * CELL - 1),
+    (-50, -50, -10, -10),             #off the grid, clamped to its corner cell
+    (95, 55, 500, 500),
+    (30, 0, 30, HEIGHT),              #a line one column wide
+])
+def test_query_on_cell_borders(rect):
+    """query() returns the points of exactly the cells the rectangle touches"""
+    (x_pos, y_pos) = _border_points()
+    grid = SpatialHash(WIDTH, HEIGHT, CELL)
+    grid.update(x_pos, y_pos)
+    _assert_query(grid, x_pos, y_pos, rect)
+
+
+def test_incremental_updates_match_a_rebuild():
+    """After many small moves the incremental order still matches the brute force check"""
+    randomness = np.random.default_rng(21)
+    count = 80
+    x_pos = randomness.uniform(-10, WIDTH + 10, count)
+    y_pos = randomness.uniform(-10, HEIGHT + 10, count)
+    grid = SpatialHash(WIDTH, HEIGHT, CELL)
+    grid.update(x_pos, y_pos)
+    moved = 0
+    for step in range(60):
+        x_pos = x_pos + randomness.uniform(-6, 6, count)
+        y_pos = y_pos + randomness.uniform(-6, 6, count)
+        if step % 10 == 0: #snap some points onto borders
+            x_pos[:5] = np.round(x_pos[:5] / CELL) * CELL
+            y_pos[:5] = np.round(y_pos[:5] / CELL) * CELL
+        moved += grid.update(x_pos, y_pos)
+        assert np.all(np.diff(grid.cells[grid.order]) >= 0) #still sorted by cell
+        _assert_pairs(grid, x_pos, y_pos)
+        _assert_query(grid, x_pos, y_pos, (25, 15, 70, 40))
+    assert 0 < moved < 60 * count
+    assert grid.update(x_pos, y_pos) == 0
+
+
+def test_point_count_changes():
+    """Updating with a different number of points rebuilds the grid"""
+    randomness = np.random.default_rng(4)
+    grid = SpatialHash(WIDTH, HEIGHT, CELL)
+    for count in (30, 31, 5, 1, 40):
+        x_pos = randomness.uniform(0, WIDTH, count)
+        y_pos = randomness.uniform(0, HEIGHT, count)
+        assert grid.update(x_pos, y_pos) == count
+        _assert_pairs(grid, x_pos, y_pos)
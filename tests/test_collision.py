@@ -0,0 +1,140 @@
+"""These tests check sim.sweep_circle_rect, the ball's swept paddle collision
+
+Each case is also run through batch.sweep_circle_rect, which has to
+agree with the scalar function on every ball.
+"""
+import math
+import random
+
+import numpy as np
+import pytest
+from ponggame import batch, sim
+
+RAD = 5
+#the left paddle at its default size, its face is at x 70
+PADDLE = (40, 190, 30, 120)
+SQUARE = (0, 0, 10, 10)
+
+
+def _sweep(x_pos, y_pos, x_move, y_move, rect, rad=RAD):
+    """This Function returns sim.sweep_circle_rect after checking the batch version agrees"""
+    hit = sim.sweep_circle_rect(x_pos, y_pos, x_move, y_move, rad, rect)
+    arrays = [np.array([value], dtype=float) for value in (x_pos, y_pos, x_move, y_move)]
+    (hits, times, x_normals, y_normals) = batch.sweep_circle_rect(*arrays, rad, *rect)
+    assert bool(hits[0]) == (hit is not None)
+    if hit:
+        assert (times[0], x_normals[0], y_normals[0]) == pytest.approx(hit)
+    return hit
+
+
+def _distance(x_pos, y_pos, rect):
+    """This Function returns how far a point is from rect, 0 inside it"""
+    (left, top, width, height) = rect
+    x_gap = x_pos - min(max(x_pos, left), left + width)
+    y_gap = y_pos - min(max(y_pos, top), top + height)
+    return math.hypot(x_gap, y_gap)
+
+
+def test_face_hit():
+    """A ball moving into the paddle face stops where it first touches it"""
+    assert _sweep(80, 300, -10, 1, PADDLE) == (0.5, 1.0, 0.0)
+
+
+@pytest.mark.parametrize('x_pos, y_pos, x_move, y_move, normal', [
+    (5, -10, 0, 10, (0.0, -1.0)), #onto the top
+    (5, 20, 0, -10, (0.0, 1.0)),  #onto the bottom
+    (-10, 5, 10, 0, (-1.0, 0.0)), #onto the left side
+])
+def test_other_faces(x_pos, y_pos, x_move, y_move, normal):
+    """The normal of a face hit points out of the face that was hit"""
+    assert _sweep(x_pos, y_pos, x_move, y_move, SQUARE) == pytest.approx((0.5,) + normal)
+
+
+def test_corner_hit():
+    """A ball moving at a corner touches its arc, the normal points from the corner to the ball"""
+    (time, x_normal, y_normal) = _sweep(20, 20, -10, -10, SQUARE)
+    assert time == pytest.approx((10 - RAD / math.sqrt(2)) / 10)
+    assert (x_normal, y_normal) == pytest.approx((1 / math.sqrt(2), 1 / math.sqrt(2)))
+    assert _distance(20 - 10 * time, 20 - 10 * time, SQUARE) == pytest.approx(RAD)
+
+
+def test_corner_hit_off_the_diagonal():
+    """The normal of a corner hit is the unit vector from the corner to the ball at contact"""
+    (time, x_normal, y_normal) = _sweep(79, 194, -6, -8, PADDLE)
+    (x_pos, y_pos) = (79 - 6 * time, 194 - 8 * time)
+    assert _distance(x_pos, y_pos, PADDLE) == pytest.approx(RAD)
+    assert (x_normal, y_normal) == pytest.approx(((x_pos - 70) / RAD, (y_pos - 190) / RAD))
+
+
+def test_grazing_a_face():
+    """A ball sliding along a face at exactly its radius touches at the corner and is not turned"""
+    (time, x_normal, y_normal) = _sweep(20, -RAD, -30, 0, SQUARE)
+    assert (time, x_normal, y_normal) == pytest.approx((1 / 3, 0.0, -1.0))
+    assert sim.rebound_velocity(-30, 0, x_normal, y_normal, 0) == pytest.approx((-30, 0))
+
+
+def test_passing_just_outside():
+    """A ball passing a hair further than its radius misses"""
+    assert _sweep(20, -RAD - 1e-9, -30, 0, SQUARE) is None
+    assert _sweep(20, 20, 10, -30, SQUARE) is None
+
+
+@pytest.mark.parametrize('x_move, expected', [
+    (-1, (0.0, 1.0, 0.0)), #pressing in is a hit right away
+    (1, None),             #moving away is not
+    (0, None),             #and neither is standing still
+])
+def test_touching_at_the_start(x_move, expected):
+    """A ball that starts touching a face hits it at time 0 only when moving into it"""
+    assert _sweep(10 + RAD, 5, x_move, 0, SQUARE) == expected
+
+
+@pytest.mark.parametrize('x_pos, y_pos, x_move, y_move, expected', [
+    (2, 5, 1, 0, (0.0, -1.0, 0.0)), #closest to the left side, pushed out through it
+    (2, 5, -1, 0, None),            #already on its way out
+    (5, 8, 0, -1, (0.0, 0.0, 1.0)), #closest to the bottom
+    (5, 8, 0, 1, None),
+])
+def test_starting_inside(x_pos, y_pos, x_move, y_move, expected):
+    """A ball starting inside the rect is pushed out through its closest side"""
+    assert _sweep(x_pos, y_pos, x_move, y_move, SQUARE) == expected
+
+
+def test_fast_ball_clipping_a_corner():
+    """A ball at full speed that crosses a paddle corner between two updates still hits it
+
+    The probe loop this replaced only looked around where the ball ended
+    up, so it missed this move: neither end touches the paddle, but the
+    middle of the move does.
+    """
+    (x_move, y_move) = (-6, -8) #the ball's speed limit of 10
+    assert math.hypot(x_move, y_move) == 2 * RAD
+    assert _distance(78, 193, PADDLE) > RAD
+    assert _distance(78 + x_move, 193 + y_move, PADDLE) > RAD
+    hit = _sweep(78, 193, x_move, y_move, PADDLE)
+    assert hit is not None and 0 < hit[0] < 1
+
+
+def test_matches_a_sampled_path():
+    """Random moves hit exactly when some point along them comes within the radius"""
+    randomness = random.Random(3)
+    steps = 2000
+    checked = 0
+    while checked < 500:
+        (x_pos, y_pos) = (randomness.uniform(20, 90), randomness.uniform(170, 330))
+        angle = randomness.uniform(0, 2 * math.pi)
+        speed = randomness.uniform(0, 2 * RAD)
+        (x_move, y_move) = (speed * math.cos(angle), speed * math.sin(angle))
+        distances = [_distance(x_pos + x_move * step / steps, y_pos + y_move * step / steps, PADDLE)
+                     for step in range(steps + 1)]
+        if distances[0] <= RAD + 0.01 or abs(min(distances) - RAD) < 0.01:
+            continue #touching at the start or only grazing, covered above
+        checked += 1
+        hit = _sweep(x_pos, y_pos, x_move, y_move, PADDLE)
+        first = next((step for (step, distance) in enumerate(distances) if distance < RAD), None)
+        if first is None:
+            assert hit is None
+        else:
+            assert hit is not None and (first - 1) / steps <= hit[0] <= first / steps
+            assert _distance(x_pos + x_move * hit[0], y_pos + y_move * hit[0],
+                             PADDLE) == pytest.approx(RAD)
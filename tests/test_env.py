@@ -0,0 +1,121 @@
+"""These tests step the training envs and check their rewards, done flags and resets"""
+import numpy as np
+import pytest
+from ponggame import env, sim
+
+SEED = 5
+COUNT = 4
+#short enough for truncation, long enough that an idle agent loses some matches first
+MAX_FRAMES = 2500
+STEPS = 1500
+
+
+def _actions(randomness, count):
+    """This Function returns mostly idle random actions, so the AI wins now and then"""
+    actions = randomness.integers(0, env.ACTION_COUNT, count)
+    actions[randomness.random(count) < 0.7] = env.NOOP
+    return actions
+
+
+def test_reset_observation():
+    """reset scales the serve position into the court and the same seed plays the same"""
+    pong = env.PongEnv()
+    observation = pong.reset(SEED).copy()
+    assert observation.dtype == np.float32 and observation.shape == (env.OBSERVATION_SIZE,)
+    assert observation.tolist() == pytest.approx([0.5, 0.5, 0, 0, 0.38, 0.38, 0, 0])
+    played = [pong.step(env.UP)[0].copy() for _ in range(300)]
+    pong.reset(SEED)
+    assert all(np.array_equal(pong.step(env.UP)[0], before) for before in played)
+
+
+def test_seeds_advance_on_reset():
+    """reset without a seed continues from the seed before it"""
+    pong = env.PongEnv()
+    pong.reset(SEED)
+    pong.reset()
+    state = pong._state # pylint: disable=protected-access
+    assert state.rng_state == sim.MatchState(seed=SEED + 1).rng_state
+
+
+def test_idle_agent_loses():
+    """An agent that never moves gets -1 per AI point and is terminated on the last one"""
+    pong = env.PongEnv()
+    pong.reset(SEED)
+    rewards = []
+    while True:
+        (observation, reward, terminated, truncated, info) = pong.step(env.NOOP)
+        rewards.append(reward)
+        assert not truncated
+        assert info['frame'] % pong.frame_skip == 0 or terminated
+        if terminated:
+            break
+    assert rewards.count(-1.0) == sim.WINNING_POINTS and set(rewards) == {0.0, -1.0}
+    assert rewards[-1] == -1.0 and info['winner'] == 2
+    assert observation[7] == 1.0
+
+
+def test_truncated_after_max_frames():
+    """A match still going at max_frames is truncated, not terminated"""
+    pong = env.PongEnv(frame_skip=3, max_frames=100)
+    pong.reset(SEED)
+    dones = [pong.step(env.NOOP)[2:4] for _ in range(34)]
+    assert dones[:33] == [(False, False)] * 33
+    assert dones[33] == (False, True)
+
+
+def test_vector_env_matches_single_envs():
+    """Every match of a VecPongEnv plays like a PongEnv and is reset with the next seed when done"""
+    vector = env.VecPongEnv(COUNT, max_frames=MAX_FRAMES, seed=SEED)
+    observations = vector.reset().copy()
+    singles = [env.PongEnv(max_frames=MAX_FRAMES) for _ in range(COUNT)]
+    assert np.array_equal(observations, [single.reset(SEED + index)
+                                         for (index, single) in enumerate(singles)])
+    next_seed = SEED + COUNT
+    randomness = np.random.default_rng(SEED)
+    (ends, terminations) = (0, 0)
+    for _ in range(STEPS):
+        actions = _actions(randomness, COUNT)
+        (observations, rewards, terminated, truncated, _) = vector.step(actions)
+        for (index, single) in enumerate(singles):
+            (observation, reward, single_terminated, single_truncated, _) = \
+                single.step(actions[index])
+            assert (rewards[index], terminated[index], truncated[index]) == \
+                (reward, single_terminated, single_truncated)
+            if single_terminated or single_truncated:
+                #the final observation is kept, the match starts again right away
+                assert np.array_equal(vector.final_observations[index], observation)
+                observation = single.reset(next_seed)
+                next_seed += 1
+                ends += 1
+                terminations += single_terminated
+            assert np.array_equal(observations[index], observation)
+    assert terminations and ends > terminations
+
+
+def test_subprocess_env_matches_vector_envs():
+    """SubprocVecEnv rows play like one VecPongEnv per worker, auto-resets included"""
+    workers = 2
+    half = COUNT // workers
+    vectors = [env.VecPongEnv(half, max_frames=MAX_FRAMES,
+                              seed=SEED + index * env.WORKER_SEED_STRIDE)
+               for index in range(workers)]
+    randomness = np.random.default_rng(SEED)
+    with env.SubprocVecEnv(COUNT, workers, max_frames=MAX_FRAMES, seed=SEED) as subprocess_env:
+        observations = subprocess_env.reset()
+        assert np.array_equal(observations, np.concatenate([vector.reset() for vector in vectors]))
+        dones = 0
+        for _ in range(STEPS):
+            actions = _actions(randomness, COUNT)
+            (observations, rewards, terminated, truncated, _) = subprocess_env.step(actions)
+            expected = [vector.step(actions[index * half:(index + 1) * half])
+                        for (index, vector) in enumerate(vectors)]
+            for (got, part) in zip((observations, rewards, terminated, truncated),
+                                   zip(*expected)):
+                assert np.array_equal(got, np.concatenate(part))
+            dones += int(np.count_nonzero(terminated | truncated))
+            assert np.array_equal(subprocess_env.final_observations, np.concatenate(
+                [vector.final_observations for vector in vectors]))
+        assert dones
+        observations = subprocess_env.reset().copy()
+    #a reset without a seed continues the seeds of every worker
+    assert np.array_equal(observations, np.concatenate([vector.reset() for vector in vectors]))
@@ -0,0 +1,124 @@
+"""These tests lock in that ponggame.sim is the reference the other engines match
+
+BatchMatch is stepped next to one sim.MatchState per match and a
+GameScene next to a MatchState with the same seed; every field has to
+agree after every tick.
+"""
+import math
+import os
+import random
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+
+import numpy as np # pylint: disable=wrong-import-position
+import pygame # pylint: disable=wrong-import-position
+import pytest # pylint: disable=wrong-import-position
+from ponggame import sim # pylint: disable=wrong-import-position
+from ponggame.batch import BatchMatch # pylint: disable=wrong-import-position
+
+SEEDS = (1, 2, 7, 42, 1234, 0xDEADBEEF)
+TICKS = 6000
+INPUTS = (sim.NO_INPUT, (True, False), (False, True))
+
+
+def _fields(state):
+    """This Function returns every field of a MatchState as {name: value}"""
+    fields = {}
+    for (part, holder) in (('ball', state.ball), ('left', state.left), ('right', state.right)):
+        for (name, value) in vars(holder).items():
+            fields[f'{part}.{name}'] = value
+    for name in ('score_one', 'score_two', 'winner', 'rng_state', 'frame'):
+        fields[name] = getattr(state, name)
+    return fields
+
+
+def _same(value, expected):
+    """This Function compares two field values, nan equals nan"""
+    if isinstance(expected, float) and math.isnan(expected):
+        return math.isnan(value)
+    return value == expected
+
+
+def _assert_same_state(state, expected, tick, label):
+    """This Function fails on the first field where state differs from expected"""
+    (fields, expected_fields) = (_fields(state), _fields(expected))
+    for (name, value) in expected_fields.items():
+        assert _same(fields[name], value), (
+            f'{label} tick {tick}: {name} is {fields[name]!r}, sim has {value!r}')
+
+
+def _input_script(seed, ticks):
+    """This Function returns a held (going_up, going_down) for every tick"""
+    randomness = random.Random(seed)
+    script = []
+    held = sim.NO_INPUT
+    for _ in range(ticks):
+        if randomness.random() < 0.05:
+            held = randomness.choice(INPUTS)
+        script.append(held)
+    return script
+
+
+def _states():
+    """This Function returns one fresh MatchState per seed, with a few AI settings varied"""
+    states = []
+    for (index, seed) in enumerate(SEEDS):
+        state = sim.MatchState(seed=seed)
+        state.right.ai_delay = (0, 10, 30)[index % 3]
+        state.right.offset_range = (0.2, 0.4, 0.8)[index % 3]
+        states.append(state)
+    return states
+
+
+def test_batch_matches_sim():
+    """BatchMatch steps every match exactly like sim.step"""
+    states = _states()
+    batch = BatchMatch.from_states(_states())
+    scripts = [_input_script(seed, TICKS) for seed in SEEDS]
+    for tick in range(TICKS):
+        inputs = [script[tick] for script in scripts]
+        for (state, held) in zip(states, inputs):
+            sim.step(state, held)
+        batch.step(np.array([held[0] for held in inputs]),
+                   np.array([held[1] for held in inputs]))
+        for (index, state) in enumerate(states):
+            _assert_same_state(batch.to_state(index), state, tick, f'match {index}')
+    assert any(state.winner for state in states) #the ticks got through whole matches
+
+
+def test_batch_round_trips_states():
+    """from_states and to_state keep every field of a match in the middle of play"""
+    states = _states()
+    for state in states:
+        sim.run(state, 1500, lambda state: (state.ball.y < state.left.y, False))
+    batch = BatchMatch.from_states(states)
+    for (index, state) in enumerate(states):
+        _assert_same_state(batch.to_state(index), state, state.frame, f'match {index}')
+
+
+@pytest.fixture(name='screen')
+def fixture_screen():
+    """This Fixture starts pygame with the dummy drivers and stops it afterwards"""
+    pygame.init()
+    yield pygame.Surface((800, 500))
+    pygame.quit()
+
+
+@pytest.mark.parametrize('seed', SEEDS[:3])
+def test_game_scene_matches_sim(screen, seed):
+    """GameScene plays the same match as sim.step with the same seed and input"""
+    from ponggame.scene import GameScene # pylint: disable=import-outside-toplevel
+    scene = GameScene(screen, (0, 0, 0), soundtrack=None, seed=seed)
+    scene.start()
+    state = sim.MatchState(seed=seed)
+    for (tick, held) in enumerate(_input_script(seed, TICKS)):
+        scene.set_player_input(*held)
+        scene.update()
+        sim.step(state, held)
+        (x_pos, y_pos, left_y, right_y) = scene.get_positions()
+        ball = state.ball
+        assert (x_pos, y_pos, left_y, right_y) == (ball.x, ball.y, state.left.y, state.right.y), (
+            f'tick {tick}')
+        assert scene.get_scores() == (state.score_one, state.score_two, state.winner), (
+            f'tick {tick}')
@@ -0,0 +1,71 @@
+"""These tests render a recorded match with export's worker processes"""
+import multiprocessing
+import os
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+
+import pygame # pylint: disable=wrong-import-position
+import pytest # pylint: disable=wrong-import-position
+from ponggame import export, replay # pylint: disable=wrong-import-position
+from ponggame.scene import GameScene # pylint: disable=wrong-import-position
+
+TICKS = 120
+
+
+@pytest.fixture(name='recording')
+def fixture_recording():
+    """This Fixture returns a Recording of the first TICKS ticks of a match"""
+    pygame.init()
+    scene = GameScene(pygame.Surface((200, 120)), (0, 0, 0), soundtrack=None, seed=5)
+    recorder = replay.Recorder()
+    scene.set_replay(recorder)
+    scene.start()
+    scene.set_player_input(True, False)
+    for _ in range(TICKS):
+        scene.update()
+    yield recorder.recording
+    pygame.quit()
+
+
+def test_pngs(recording, tmp_path):
+    """Every other tick is drawn to a numbered PNG, spread over the workers"""
+    frames = export.export(recording, str(tmp_path / 'frames'), workers=2, queue_frames=8)
+    names = sorted(os.listdir(tmp_path / 'frames'))
+    assert frames == len(names) == TICKS // export.DEFAULT_EVERY
+    assert names[:2] == ['0000000.png', '0000002.png']
+
+
+def test_worker_error_is_raised(recording, tmp_path):
+    """An exception in a worker is raised in the parent with the worker's traceback"""
+    os.makedirs(tmp_path / 'frames' / '0000000.png') #the first frame cannot be saved
+    with pytest.raises(RuntimeError, match='render worker failed'):
+        export.export(recording, str(tmp_path / 'frames'), workers=2, queue_frames=8)
+
+
+def test_dead_worker_is_an_error():
+    """A worker that exits without a word fails the export instead of hanging it"""
+    context = multiprocessing.get_context('spawn')
+    queue = context.Queue()
+    process = context.Process(target=os._exit, args=(3,)) # pylint: disable=protected-access
+    process.start()
+    with pytest.raises(RuntimeError, match='exited with code 3'):
+        export._next_item(queue, process) # pylint: disable=protected-access
+
+
+def test_items_sent_before_exiting_are_read(recording):
+    """What a worker sent before it exited is still read, then its exit is an error"""
+    chunks = export.plan_chunks(recording, 4, last_tick=8)
+    options = {'size': (recording.width, recording.height), 'every': 2, 'png_dir': None}
+    context = multiprocessing.get_context('spawn')
+    queue = context.Queue()
+    process = context.Process(target=export._render_worker, # pylint: disable=protected-access
+                              args=(recording.to_bytes(), chunks, options, queue))
+    process.start()
+    items = []
+    for _ in range(6): #2 frames and the end marker of both chunks
+        items.append(export._next_item(queue, process)) # pylint: disable=protected-access
+    process.join()
+    assert [item is None for item in items] == [False, False, True] * 2
+    with pytest.raises(RuntimeError, match='exited with code 0'):
+        export._next_item(queue, process) # pylint: disable=protected-access
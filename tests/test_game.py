@@ -0,0 +1,35 @@
+"""These tests build the PongGame loop with the dummy drivers"""
+import os
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+
+import pygame # pylint: disable=wrong-import-position
+import pytest # pylint: disable=wrong-import-position
+from ponggame import game # pylint: disable=wrong-import-position
+
+
+@pytest.fixture(name='quit_pygame')
+def fixture_quit_pygame():
+    """This Fixture stops the pygame a PongGame started"""
+    yield
+    pygame.quit()
+
+
+def test_options_reach_the_loop(quit_pygame): # pylint: disable=unused-argument
+    """Every loop option given to PongGame ends up on the option it names"""
+    pong = game.PongGame(render_rate=30, max_catch_up=2, crossfade_ms=250, idle_pacing=True,
+                         gc_mode='freeze', poll_input=True, dirty_rects=False)
+    # pylint: disable=protected-access
+    assert pong._window_size == (800, 500)
+    assert (pong._render_rate, pong._max_catch_up, pong._crossfade_ms) == (30, 2, 250)
+    assert (pong._idle_pacing, pong._gc_mode, pong._poll_input) == (True, 'freeze', True)
+    assert not pong._dirty_rects and pong._profiler is None
+
+
+def test_options_are_keyword_only(quit_pygame): # pylint: disable=unused-argument
+    """Loop options cannot be passed by position and unknown ones are refused"""
+    with pytest.raises(TypeError):
+        game.PongGame(800, 500, 'Pong', False)
+    with pytest.raises(TypeError):
+        game.PongGame(render_speed=30)
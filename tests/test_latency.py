@@ -0,0 +1,35 @@
+"""These tests catch key presses that take longer to reach the screen
+
+Every press is timed by benchmarks.latency in a game of its own.  The
+update counts are checked, the milliseconds swing too much with the
+machine to test.
+"""
+import os
+import statistics
+
+import pytest
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+
+from benchmarks import latency # pylint: disable=wrong-import-position
+
+PRESSES = 12
+#a press is handled in the first update after it, some wait for the next frame
+MEDIAN_TICKS = 1
+#a slow frame runs up to max_catch_up (5) updates before it is drawn
+MAX_TICKS = 6
+
+
+@pytest.mark.parametrize('poll_input, idle_pacing', [
+    (False, False),
+    (True, False),
+    (False, True),
+])
+def test_every_press_moves_the_drawn_paddle(poll_input, idle_pacing):
+    """A press moves the drawn paddle after the first update on every input path"""
+    samples = latency.measure_apart(PRESSES, poll_input, idle_pacing)
+    assert len(samples) == PRESSES, f'{PRESSES - len(samples)} presses never moved the paddle'
+    ticks = sorted(sample[0] for sample in samples)
+    assert statistics.median_low(ticks) <= MEDIAN_TICKS, f'updates per press {ticks}'
+    assert ticks[-1] <= MAX_TICKS, f'updates per press {ticks}'
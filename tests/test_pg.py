@@ -0,0 +1,39 @@
+"""These tests check which command lines pg.py accepts"""
+import os
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+
+import pytest # pylint: disable=wrong-import-position
+import pg # pylint: disable=wrong-import-position
+from ponggame import arena # pylint: disable=wrong-import-position
+
+
+@pytest.mark.parametrize('argv, expected', [
+    ([], None),
+    (['--arena', '5'], {'balls': 5}),
+    (['--arena', '5', '--paddles', '2', '--lives', '1'], {'balls': 5, 'paddles': 2, 'lives': 1}),
+    (['--arena', '1', '--paddles', str(arena.MAX_PADDLES)],
+     {'balls': 1, 'paddles': arena.MAX_PADDLES}),
+])
+def test_arena_options(argv, expected):
+    """The arena flags become the arena options, no --arena plays a match"""
+    assert pg.parse_args(argv)[1] == expected
+
+
+@pytest.mark.parametrize('argv', [
+    ['--arena', '0'],                           #0 balls is not a match
+    ['--arena', '-2'],
+    ['--paddles', '3'],                         #arena flags without the arena
+    ['--lives', '3'],
+    ['--arena', '5', '--paddles', '1'],
+    ['--arena', '5', '--paddles', str(arena.MAX_PADDLES + 1)],
+    ['--arena', '5', '--lives', '0'],
+    ['--arena', '5', '--record', 'match.rep'],
+    ['--diagnose'],
+])
+def test_refused(argv):
+    """Command lines that cannot be played exit with a usage error"""
+    with pytest.raises(SystemExit) as usage_error:
+        pg.parse_args(argv)
+    assert usage_error.value.code == 2
@@ -0,0 +1,121 @@
+"""These tests check the grayscale FrameStack and the off screen renderer feeding it"""
+import os
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+
+import numpy as np # pylint: disable=wrong-import-position
+import pygame # pylint: disable=wrong-import-position
+import pytest # pylint: disable=wrong-import-position
+from ponggame import pixels # pylint: disable=wrong-import-position
+
+SIZE = (5, 3)
+DEPTH = 4
+
+
+def _solid(value, size=SIZE):
+    """This Function returns (width, height, 3) gray pixels of one value, like pixels3d"""
+    return np.full(size + (3,), value, dtype=np.uint8)
+
+
+def _values(stack):
+    """This Function returns the value of every stacked frame, oldest first"""
+    frames = stack.frames()
+    assert frames.shape == (DEPTH, SIZE[1], SIZE[0])
+    assert all(np.all(frame == frame[0, 0]) for frame in frames)
+    return [int(frame[0, 0]) for frame in frames]
+
+
+def test_ordering_and_first_frames():
+    """Frames come oldest first, blank ones fill the stack until depth frames were pushed"""
+    stack = pixels.FrameStack(SIZE, DEPTH)
+    assert _values(stack) == [0, 0, 0, 0]
+    expected = [0] * DEPTH
+    for value in range(10, 100, 10):
+        stack.push(_solid(value))
+        expected = expected[1:] + [value]
+        assert _values(stack) == expected
+    assert expected == [60, 70, 80, 90]
+
+
+def test_clear_starts_a_new_episode():
+    """After clear the first frame of the next episode has only blank frames before it"""
+    stack = pixels.FrameStack(SIZE, DEPTH)
+    for value in (10, 20, 30, 40, 50, 60):
+        stack.push(_solid(value))
+    stack.clear()
+    assert _values(stack) == [0, 0, 0, 0]
+    stack.push(_solid(7))
+    assert _values(stack) == [0, 0, 0, 7]
+
+
+def test_frames_is_a_view():
+    """frames() hands out a slice of the ring, never a copy"""
+    stack = pixels.FrameStack(SIZE, DEPTH)
+    for value in range(1, 7):
+        stack.push(_solid(value))
+        frames = stack.frames()
+        assert frames.base is stack._ring # pylint: disable=protected-access
+        assert frames.flags['C_CONTIGUOUS']
+
+
+@pytest.mark.parametrize('color, gray', [
+    ((255, 255, 255), 255),
+    ((0, 0, 0), 0),
+    ((255, 0, 0), 76),
+    ((0, 255, 0), 149),
+    ((0, 0, 255), 28),
+    ((100, 150, 200), (100 * 77 + 150 * 150 + 200 * 29) >> 8),
+])
+def test_grayscale(color, gray):
+    """Pixels are turned into 8 bit ITU-R 601 luma"""
+    stack = pixels.FrameStack(SIZE, DEPTH)
+    stack.push(np.broadcast_to(np.array(color, dtype=np.uint8), SIZE + (3,)))
+    assert _values(stack)[-1] == gray
+
+
+def test_frames_are_rows_of_pixels():
+    """A (width, height) pixels3d view becomes a (height, width) frame like an image"""
+    stack = pixels.FrameStack(SIZE, DEPTH)
+    view = np.zeros(SIZE + (3,), dtype=np.uint8)
+    view[4, 0] = 255 #top right
+    view[0, 2] = 255 #bottom left
+    stack.push(view)
+    newest = stack.frames()[-1]
+    assert newest[0, 4] == newest[2, 0] == 255
+    assert int(newest.sum()) == 2 * 255
+
+
+@pytest.fixture(name='scene')
+def fixture_scene():
+    """This Fixture starts pygame with the dummy drivers, returns an off screen scene"""
+    pygame.init()
+    yield pixels.offscreen_scene(seed=3)
+    pygame.quit()
+
+
+@pytest.mark.parametrize('smooth', [True, False])
+def test_renderer_stacks_what_it_drew(scene, smooth):
+    """Every render pushes the scaled frame it drew onto the stack"""
+    renderer = pixels.OffscreenRenderer(scene, (84, 84), DEPTH, smooth)
+    grays = []
+    for _ in range(DEPTH + 2):
+        for _ in range(30):
+            scene.update()
+        renderer.render()
+        view = renderer.pixels()
+        grays.append((view.astype(np.uint16) @ np.array([77, 150, 29], dtype=np.uint16)) >> 8)
+        del view
+    frames = renderer.stack.frames()
+    assert frames.shape == (DEPTH, 84, 84)
+    for (frame, gray) in zip(frames, grays[-DEPTH:]):
+        assert np.array_equal(frame, gray.T)
+    assert not np.array_equal(frames[0], frames[-1]) #the scene changed in between
+
+
+def test_renderer_without_a_stack(scene):
+    """With depth 0 the renderer only scales"""
+    renderer = pixels.OffscreenRenderer(scene, (40, 30), depth=0)
+    renderer.render()
+    assert renderer.stack is None
+    assert renderer.pixels().shape == (40, 30, 3)
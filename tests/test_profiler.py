@@ -0,0 +1,93 @@
+"""These tests feed FrameProfiler made up phase times and check what it reports"""
+import csv
+import json
+
+import pytest
+from ponggame.profiler import FrameProfiler
+
+
+def _profiler(milliseconds, capacity=2048, phase='update'):
+    """This Function returns a FrameProfiler with one frame per time in milliseconds"""
+    profiler = FrameProfiler(capacity)
+    for value in milliseconds:
+        profiler.begin_frame()
+        profiler.add(phase, value / 1000)
+        profiler.end_frame()
+    return profiler
+
+
+def _ms(samples):
+    """This Function returns samples in seconds as rounded milliseconds"""
+    return [round(sample * 1000, 6) for sample in samples]
+
+
+@pytest.mark.parametrize('frames', [0, 1, 3, 4, 5, 9, 12])
+def test_ring_keeps_the_last_frames_oldest_first(frames):
+    """Once the ring is full every frame replaces the oldest one"""
+    profiler = _profiler(range(1, frames + 1), capacity=4)
+    assert profiler.frame_count == frames
+    assert _ms(profiler.samples('update')) == list(range(max(1, frames - 3), frames + 1))
+
+
+def test_percentiles_are_nearest_rank():
+    """p50, p95 and p99 are the nearest-rank samples, in any order they came"""
+    profiler = _profiler([(value * 37) % 100 + 1 for value in range(100)])
+    assert profiler.percentiles('update') == pytest.approx({50: 50, 95: 95, 99: 99})
+    assert profiler.percentiles('update', (0, 100)) == pytest.approx({0: 1, 100: 100})
+    assert _profiler([7]).percentiles('update') == pytest.approx({50: 7, 95: 7, 99: 7})
+    assert _profiler([]).percentiles('update') == {50: 0.0, 95: 0.0, 99: 0.0}
+
+
+def test_percentiles_after_wrapping():
+    """Only the frames still in the ring count towards the percentiles"""
+    profiler = _profiler([1000] * 50 + list(range(1, 11)), capacity=10)
+    assert profiler.percentiles('update') == pytest.approx({50: 5, 95: 10, 99: 10})
+    summary = profiler.summary()['update']
+    assert (summary['mean'], summary['max']) == pytest.approx((5.5, 10))
+
+
+def test_time_adds_up_within_a_frame():
+    """Times charged to a phase more than once in a frame are summed"""
+    profiler = FrameProfiler(4)
+    profiler.begin_frame()
+    profiler.add('draw', 0.002)
+    profiler.add('draw', 0.003)
+    profiler.end_frame()
+    profiler.begin_frame()
+    profiler.end_frame()
+    assert _ms(profiler.samples('draw')) == [5, 0]
+
+
+def test_new_phase_reads_zero_before_it_was_seen():
+    """A phase first seen late has 0 for the frames before it, also after wrapping"""
+    profiler = _profiler([1, 2, 3], capacity=4)
+    profiler.begin_frame()
+    profiler.add('physics', 0.009)
+    profiler.end_frame()
+    assert _ms(profiler.samples('physics')) == [0, 0, 0, 9]
+    profiler.begin_frame()
+    profiler.end_frame()
+    assert _ms(profiler.samples('physics')) == [0, 0, 9, 0]
+
+
+def test_histogram_bins():
+    """Samples are counted per bin_ms wide bin and the last bin takes everything past it"""
+    profiler = _profiler([0.5, 1.0, 1.9, 2.5, 40, 900])
+    assert profiler.histogram('update', bin_ms=1.0, bins=4) == [1, 2, 1, 2]
+    assert profiler.histogram('update', bin_ms=2.0, bins=3) == [3, 1, 2]
+
+
+def test_dumps_number_the_stored_frames(tmp_path):
+    """The CSV rows carry the frame number of each stored frame, the JSON holds the same samples"""
+    profiler = _profiler(range(1, 8), capacity=4)
+    profiler.dump(str(tmp_path / 'frames.csv'))
+    with open(tmp_path / 'frames.csv', newline='') as report_file:
+        rows = list(csv.DictReader(report_file))
+    assert [int(row['frame']) for row in rows] == [3, 4, 5, 6]
+    assert [float(row['update_ms']) for row in rows] == [4, 5, 6, 7]
+    profiler.dump(str(tmp_path / 'frames.json'))
+    with open(tmp_path / 'frames.json') as report_file:
+        report = json.load(report_file)
+    assert report['frames'] == 7
+    assert report['samples_ms']['update'] == pytest.approx([4, 5, 6, 7])
+    assert report['summary']['update']['p50'] == pytest.approx(5)
@@ -0,0 +1,83 @@
+"""These tests record GameScene matches and replay them bit for bit"""
+import os
+import random
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+
+import pygame # pylint: disable=wrong-import-position
+import pytest # pylint: disable=wrong-import-position
+from ponggame import replay # pylint: disable=wrong-import-position
+from ponggame.scene import GameScene # pylint: disable=wrong-import-position
+
+SEED = 11
+TICKS = 3000
+
+
+@pytest.fixture(name='screen')
+def fixture_screen():
+    """This Fixture starts pygame with the dummy drivers and stops it afterwards"""
+    pygame.init()
+    yield pygame.Surface((800, 500))
+    pygame.quit()
+
+
+def _record(screen, path, ticks=TICKS):
+    """This Function plays ticks of a match with changing input, returns the Recording saved at path"""
+    scene = GameScene(screen, (0, 0, 0), soundtrack=None, seed=SEED)
+    scene.set_replay(replay.Recorder(path))
+    scene.start()
+    randomness = random.Random(SEED)
+    for _ in range(ticks):
+        if randomness.random() < 0.03:
+            scene.set_player_input(randomness.random() < 0.5, randomness.random() < 0.5)
+        scene.update()
+    scene.stop()
+    return replay.Recording.load(path)
+
+
+def test_replay_matches_the_recording(screen, tmp_path):
+    """A saved match replays with the recorded checksum on every tick"""
+    recording = _record(screen, str(tmp_path / 'match.rep'))
+    assert recording.ticks == TICKS and len(recording.changes) > 10
+    player = replay.play_headless(recording, screen)
+    assert (player.finished, player.tick, player.mismatch_tick) == (True, TICKS, None)
+
+
+def test_replay_records_the_same_checksums(screen, tmp_path):
+    """Recording a replayed match gives the recorded checksums and input back"""
+    recording = _record(screen, str(tmp_path / 'match.rep'))
+    again = _record(screen, str(tmp_path / 'again.rep'))
+    assert again.checksums == recording.checksums
+    assert again.changes == recording.changes
+    assert replay.Recording.from_bytes(recording.to_bytes()).inputs() == recording.inputs()
+
+
+@pytest.mark.parametrize('strict', [True, False])
+def test_changed_input_is_a_mismatch(screen, tmp_path, strict):
+    """A replay fed other input than was recorded stops on the first tick it changes"""
+    recording = _record(screen, str(tmp_path / 'match.rep'))
+    (tick, bits) = recording.changes[5]
+    recording.changes[5] = (tick, bits ^ replay.INPUT_UP)
+    if strict:
+        with pytest.raises(replay.ReplayMismatchError) as mismatch:
+            replay.play_headless(recording, screen)
+        assert mismatch.value.tick == tick
+    else:
+        assert replay.play_headless(recording, screen, strict=False).mismatch_tick == tick
+
+
+def test_changed_checksum_is_a_mismatch(screen, tmp_path):
+    """A recording whose checksum was altered fails on that tick and no other"""
+    recording = _record(screen, str(tmp_path / 'match.rep'))
+    recording.checksums[1234] ^= 1
+    player = replay.play_headless(recording, screen, strict=False)
+    assert player.mismatch_tick == 1234 and player.finished
+
+
+def test_other_files_are_refused(tmp_path):
+    """Loading a file that is not a replay raises ValueError"""
+    path = tmp_path / 'other.rep'
+    path.write_bytes(b'NOTPONG!' + bytes(64))
+    with pytest.raises(ValueError):
+        replay.Recording.load(str(path))
@@ -0,0 +1,173 @@
+"""These tests restore GameScene snapshots and check the match plays on the same
+
+Snapshots taken where the match's timers turn over are restored into a
+scene whose TimerWheel is at another tick, then both scenes are stepped
+side by side and have to agree on every tick, on the checksum, the drawn
+state and the next snapshot alike.
+"""
+import os
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+
+import pygame # pylint: disable=wrong-import-position
+import pytest # pylint: disable=wrong-import-position
+from ponggame.ball import Ball # pylint: disable=wrong-import-position
+from ponggame.game_overlay import Overlay # pylint: disable=wrong-import-position
+from ponggame.scene import SNAPSHOT_SIZE, GameScene # pylint: disable=wrong-import-position
+
+SEED = 7
+STEPS = 300
+#where Ball.get_state keeps the ticks left on the rebound guard and the serve
+REBOUND = 10
+SERVE = 11
+
+
+@pytest.fixture(name='screen')
+def fixture_screen():
+    """This Fixture starts pygame with the dummy drivers and stops it afterwards"""
+    pygame.init()
+    yield pygame.Surface((800, 500))
+    pygame.quit()
+
+
+def _scene(screen):
+    """This Function returns a started GameScene with the test seed"""
+    scene = GameScene(screen, (0, 0, 0), soundtrack=None, seed=SEED)
+    scene.start()
+    return scene
+
+
+def _step(scene):
+    """This Function updates scene once, the player moves in a fixed pattern"""
+    phase = scene.get_state()[0] // 97 % 3 #the ball's x, so both scenes get the same input
+    scene.set_player_input(phase == 0, phase == 1)
+    scene.update()
+
+
+def _ball_state(scene):
+    """This Function returns the ball's part of the scene state"""
+    return scene._ball.get_state() # pylint: disable=protected-access
+
+
+def _step_until(scene, done, limit=20000):
+    """This Function steps scene until done(scene), fails past limit updates"""
+    for _ in range(limit):
+        if done(scene):
+            return
+        _step(scene)
+    pytest.fail('the match never got there')
+
+
+def _assert_round_trip(screen, scene, steps=STEPS):
+    """This Function restores a snapshot of scene in a new scene and steps both side by side"""
+    restored = _scene(screen)
+    for _ in range(13):
+        _step(restored) #its wheel is at another tick
+    restored.restore(scene.snapshot())
+    assert restored.snapshot() == scene.snapshot()
+    for tick in range(steps):
+        _step(scene)
+        _step(restored)
+        assert restored.checksum() == scene.checksum(), f'tick {tick}'
+        assert restored.draw_state() == scene.draw_state(), f'tick {tick}'
+    assert restored.snapshot() == scene.snapshot()
+
+
+@pytest.mark.parametrize('ticks', [Ball.start_delay - 1, Ball.start_delay, Ball.start_delay + 1])
+def test_first_serve(screen, ticks):
+    """A snapshot next to the first serve serves on the same tick after restore"""
+    scene = _scene(screen)
+    for _ in range(ticks):
+        _step(scene)
+    assert _ball_state(scene)[7] == (ticks > Ball.start_delay) #round in progress
+    _assert_round_trip(screen, scene)
+
+
+#the serve is armed in the ball's update and the wheel advances once before a snapshot
+@pytest.mark.parametrize('serve_ticks', [Ball.reset_delay, 2, 1])
+def test_serve_after_a_point(screen, serve_ticks):
+    """A snapshot between a point and the next serve serves on the same tick after restore"""
+    scene = _scene(screen)
+    _step_until(scene, lambda scene: sum(scene.get_scores()[:2]) == 1)
+    _step_until(scene, lambda scene: _ball_state(scene)[SERVE] == serve_ticks)
+    _assert_round_trip(screen, scene)
+
+
+@pytest.mark.parametrize('rebound_ticks', [Ball.rebound_frames - 1, 1])
+def test_rebound_guard(screen, rebound_ticks):
+    """A snapshot while the ball cannot hit a paddle lifts the guard on the same tick"""
+    scene = _scene(screen)
+    _step_until(scene, lambda scene: _ball_state(scene)[REBOUND] == rebound_ticks)
+    _assert_round_trip(screen, scene)
+
+
+@pytest.mark.parametrize('after', [0, 1, 100])
+def test_game_over(screen, after):
+    """A snapshot of a won match never serves again after restore"""
+    scene = _scene(screen)
+    _step_until(scene, lambda scene: scene.get_scores()[2])
+    for _ in range(after):
+        _step(scene)
+    assert _ball_state(scene)[SERVE] == 0
+    _assert_round_trip(screen, scene)
+    assert not scene._ball.is_moving # pylint: disable=protected-access
+
+
+@pytest.mark.parametrize('ticks', [
+    Overlay.arrow_flash_ticks - 1,
+    Overlay.arrow_flash_ticks,
+    Overlay.arrow_flash_ticks + 1,
+    2 * Overlay.arrow_flash_ticks - 1,
+    2 * Overlay.arrow_flash_ticks,
+    2 * Overlay.arrow_flash_ticks + 1,
+])
+def test_arrow_flash(screen, ticks):
+    """A snapshot on either side of an arrow flash flashes on the same tick after restore"""
+    scene = _scene(screen)
+    for _ in range(ticks):
+        _step(scene)
+    _assert_round_trip(screen, scene, 2 * Overlay.arrow_flash_ticks + 2)
+
+
+def test_tutorial_end(screen):
+    """A snapshot as the tutorial ends hides it on the same tick after restore"""
+    scene = _scene(screen)
+    for _ in range(Overlay.tutorial_ticks - 1):
+        _step(scene)
+    _assert_round_trip(screen, scene, 3)
+
+
+def test_old_snapshots_are_refused(screen):
+    """A snapshot of another version is refused instead of restored wrong"""
+    scene = _scene(screen)
+    data = bytearray(scene.snapshot())
+    data[2] -= 1 #the version
+    with pytest.raises(ValueError):
+        scene.restore(bytes(data))
+
+
+def test_restoring_along_the_way_matches_an_uninterrupted_run(screen):
+    """A match moved to a new scene by snapshot and restore every few hundred ticks plays the same"""
+    uninterrupted = _scene(screen)
+    checksums = []
+    for _ in range(6000):
+        _step(uninterrupted)
+        checksums.append(uninterrupted.checksum())
+    assert uninterrupted.get_scores()[2] #the ticks got through a whole match
+    scene = _scene(screen)
+    for (tick, checksum) in enumerate(checksums):
+        if tick % 487 == 100:
+            restored = _scene(screen)
+            restored.restore(scene.snapshot())
+            scene = restored
+        _step(scene)
+        assert scene.checksum() == checksum, f'tick {tick}'
+
+
+def test_snapshot_size(screen):
+    """A snapshot always has the same, small size"""
+    scene = _scene(screen)
+    assert len(scene.snapshot()) == SNAPSHOT_SIZE < 256
+    _step_until(scene, lambda scene: scene.get_scores()[2])
+    assert len(scene.snapshot()) == SNAPSHOT_SIZE
@@ -0,0 +1,96 @@
+"""These tests check which rendered strings text_cache keeps and which it drops"""
+import os
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+
+import pygame # pylint: disable=wrong-import-position
+import pytest # pylint: disable=wrong-import-position
+from ponggame import text_cache # pylint: disable=wrong-import-position
+
+CAP = 3
+WHITE = (255, 255, 255)
+
+
+@pytest.fixture(name='cache')
+def fixture_cache():
+    """This Fixture starts pygame with an empty cache of CAP strings, stops it afterwards"""
+    pygame.init()
+    text_cache.clear()
+    text_cache.set_max_size(CAP)
+    yield text_cache
+    text_cache.set_max_size(text_cache.DEFAULT_CACHE_SIZE)
+    pygame.quit()
+
+
+def _cached(cache):
+    """This Function returns the texts in the cache, least recently used first"""
+    return [key[0] for key in cache._rendered] # pylint: disable=protected-access
+
+
+def test_hit_returns_the_same_surface(cache):
+    """A string rendered again with the same arguments is the cached surface"""
+    surface = cache.render('one', 20, WHITE)
+    assert cache.render('one', 20, list(WHITE)) is surface
+
+
+@pytest.mark.parametrize('other', [
+    ('one', 21, WHITE, True),
+    ('one', 20, (255, 255, 254), True),
+    ('one', 20, WHITE, False),
+    ('One', 20, WHITE, True),
+])
+def test_every_argument_is_in_the_key(cache, other):
+    """Changing the text, size, color or antialias renders another surface"""
+    surface = cache.render('one', 20, WHITE)
+    assert cache.render(*other) is not surface
+    assert _cached(cache) == ['one', other[0]]
+
+
+def test_least_recently_used_is_dropped(cache):
+    """Past the cap the string used longest ago is dropped, a hit counts as a use"""
+    surfaces = {text: cache.render(text, 20, WHITE) for text in ('a', 'b', 'c')}
+    assert _cached(cache) == ['a', 'b', 'c']
+    cache.render('a', 20, WHITE)
+    assert _cached(cache) == ['b', 'c', 'a']
+    cache.render('d', 20, WHITE)
+    assert _cached(cache) == ['c', 'a', 'd']
+    assert cache.render('a', 20, WHITE) is surfaces['a']
+    assert cache.render('b', 20, WHITE) is not surfaces['b'] #dropped, rendered again
+    assert _cached(cache) == ['d', 'a', 'b']
+
+
+def test_cap_holds_over_many_strings(cache):
+    """However many strings are rendered, the cache never holds more than the cap"""
+    for number in range(50):
+        cache.render(str(number), 12, WHITE)
+        assert len(_cached(cache)) == min(number + 1, CAP)
+    assert _cached(cache) == ['47', '48', '49']
+
+
+def test_shrinking_drops_the_oldest(cache):
+    """Lowering the cap drops the least recently used strings right away"""
+    for text in ('a', 'b', 'c'):
+        cache.render(text, 20, WHITE)
+    cache.set_max_size(1)
+    assert _cached(cache) == ['c']
+    cache.set_max_size(CAP)
+    cache.render('d', 20, WHITE)
+    assert _cached(cache) == ['c', 'd']
+
+
+def test_fonts_and_digits_are_shared(cache):
+    """Fonts and score digits are built once per size and color"""
+    assert cache.get_font(20) is cache.get_font(20)
+    assert cache.get_font(20) is not cache.get_font(21)
+    assert cache.score_digits(100, WHITE) is cache.score_digits(100, list(WHITE))
+
+
+def test_quitting_pygame_empties_the_cache(cache):
+    """Fonts of a quit pygame are never handed out again"""
+    font = cache.get_font(20)
+    cache.render('a', 20, WHITE)
+    pygame.quit()
+    assert not _cached(cache)
+    pygame.init()
+    assert cache.get_font(20) is not font
@@ -0,0 +1,204 @@
+"""These tests pin down when a TimerWheel fires its Timers
+
+The default wheel cascades at 256 and 65536 ticks and keeps timers past
+2**24 ticks in its overflow slot; a wheel of 2 rings of 4 slots reaches
+the same overflow path after only 16 ticks.
+"""
+import gc
+import random
+
+import pytest
+from ponggame.timers import Timer, TimerWheel
+
+SMALL = {'slot_bits': 2, 'levels': 2}
+
+
+class _Owner:
+    """This Class writes down the wheel's tick every time one of its timers fires"""
+    def __init__(self, wheel):
+        self.wheel = wheel
+        self.fired = []
+        self.on_fire = None
+
+    def fire(self):
+        """This Method is the callback of the test timers"""
+        self.fired.append(self.wheel.now)
+        if self.on_fire:
+            self.on_fire()
+
+
+def _armed(wheel, ticks, interval=0):
+    """This Function returns (owner, timer) with the timer scheduled on wheel"""
+    owner = _Owner(wheel)
+    timer = wheel.schedule(Timer(owner, _Owner.fire), ticks, interval)
+    return (owner, timer)
+
+
+@pytest.mark.parametrize('wheel_args, start, ticks', [
+    ({}, 0, 1),
+    ({}, 0, 255),
+    ({}, 0, 256),
+    ({}, 0, 257),
+    ({}, 200, 56),  #due on the first cascade
+    ({}, 200, 57),
+    ({}, 255, 1),
+    ({}, 0, 65535),
+    ({}, 0, 65536),
+    ({}, 0, 65537),
+    ({}, 65000, 536), #due on the second ring's wrap
+    ({}, 65535, 1),
+    ({}, 65535, 256),
+    (SMALL, 0, 15),
+    (SMALL, 0, 16), #the first tick past the last ring
+    (SMALL, 0, 17),
+    (SMALL, 3, 100),
+    (SMALL, 15, 1000),
+])
+def test_fires_exactly_when_due(wheel_args, start, ticks):
+    """A timer fires on the ticks-th advance, not one early or late"""
+    wheel = TimerWheel(**wheel_args)
+    wheel.advance(start)
+    (owner, timer) = _armed(wheel, ticks)
+    wheel.advance(ticks - 1)
+    assert owner.fired == [] and timer.pending
+    wheel.advance()
+    assert owner.fired == [start + ticks] and not timer.pending
+
+
+def test_far_timers_wait_in_the_overflow():
+    """A timer past the last ring goes to the overflow slot and still fires on time"""
+    wheel = TimerWheel(**SMALL)
+    (owner, timer) = _armed(wheel, 40)
+    assert timer._level == SMALL['levels'] # pylint: disable=protected-access
+    wheel.advance(39)
+    assert not owner.fired
+    wheel.advance()
+    assert owner.fired == [40]
+
+
+@pytest.mark.parametrize('wheel_args, ticks, interval', [
+    ({}, 5, 7),
+    ({}, 250, 300),
+    (SMALL, 3, 5),
+    (SMALL, 20, 17),
+])
+def test_interval_fires_again(wheel_args, ticks, interval):
+    """A timer with an interval fires every interval ticks until it is cancelled"""
+    wheel = TimerWheel(**wheel_args)
+    (owner, timer) = _armed(wheel, ticks, interval)
+    wheel.advance(ticks + 10 * interval)
+    assert owner.fired == [ticks + repeat * interval for repeat in range(11)]
+    assert timer.pending and len(wheel) == 1
+    wheel.cancel(timer)
+    wheel.advance(2 * interval)
+    assert len(owner.fired) == 11 and len(wheel) == 0
+
+
+def test_callback_cancels_a_timer_due_the_same_tick():
+    """A timer cancelled by another's callback on the tick it is due does not fire"""
+    wheel = TimerWheel()
+    (first, first_timer) = _armed(wheel, 10)
+    (second, second_timer) = _armed(wheel, 10)
+    (third, third_timer) = _armed(wheel, 300)
+    #whichever fires first cancels the other two
+    first.on_fire = lambda: (wheel.cancel(second_timer), wheel.cancel(third_timer))
+    second.on_fire = lambda: (wheel.cancel(first_timer), wheel.cancel(third_timer))
+    wheel.advance(400)
+    assert sorted((first.fired, second.fired)) == [[], [10]] and not third.fired
+    assert len(wheel) == 0
+
+
+def test_callback_reschedules_its_own_timer():
+    """A one-shot timer armed again from its callback fires again"""
+    wheel = TimerWheel()
+    (owner, timer) = _armed(wheel, 3)
+    owner.on_fire = lambda: len(owner.fired) < 4 and wheel.schedule(timer, 250)
+    wheel.advance(2000)
+    assert owner.fired == [3, 253, 503, 753]
+    assert len(wheel) == 0
+
+
+def test_callback_moves_a_repeating_timer():
+    """A repeating timer scheduled again from its callback keeps the new due and interval"""
+    wheel = TimerWheel()
+    (owner, timer) = _armed(wheel, 5, 5)
+    owner.on_fire = lambda: owner.fired == [5] and wheel.schedule(timer, 100, 20)
+    wheel.advance(150)
+    assert owner.fired == [5, 105, 125, 145]
+    owner.on_fire = lambda: wheel.cancel(timer)
+    wheel.advance(100)
+    assert owner.fired == [5, 105, 125, 145, 165] and not timer.pending
+
+
+def test_remaining_and_len():
+    """remaining and len follow every schedule, move, cancel and firing"""
+    wheel = TimerWheel()
+    (one, two) = (Timer(), Timer())
+    assert (len(wheel), wheel.remaining(one)) == (0, 0)
+    wheel.schedule(one, 300)
+    wheel.schedule(two, 2)
+    assert (len(wheel), wheel.remaining(one), wheel.remaining(two)) == (2, 300, 2)
+    wheel.schedule(one, 70000) #moved, not added twice
+    assert (len(wheel), wheel.remaining(one)) == (2, 70000)
+    wheel.advance(2)
+    assert (len(wheel), wheel.remaining(two), two.pending) == (1, 0, False)
+    wheel.advance(1000)
+    assert wheel.remaining(one) == 70000 - 1002
+    wheel.cancel(one)
+    wheel.cancel(one)
+    wheel.cancel(two)
+    assert (len(wheel), wheel.remaining(one), one.pending) == (0, 0, False)
+    with pytest.raises(ValueError):
+        wheel.schedule(one, 0)
+
+
+@pytest.mark.parametrize('interval', [0, 10])
+def test_dead_owner_is_dropped(interval):
+    """A timer whose owner was collected is dropped when due and never calls back"""
+    wheel = TimerWheel()
+    (owner, timer) = _armed(wheel, 10, interval)
+    fired = owner.fired
+    del owner
+    gc.collect()
+    wheel.advance(100)
+    assert not fired and not timer.pending and len(wheel) == 0
+
+
+def test_matches_a_plain_countdown():
+    """Random schedules, moves, cancels and dead owners fire like plain countdowns"""
+    randomness = random.Random(25)
+    for wheel_args in ({}, SMALL, {'slot_bits': 3, 'levels': 1}):
+        wheel = TimerWheel(**wheel_args)
+        owners = [_Owner(wheel) for _ in range(40)]
+        timers = [Timer(owner, _Owner.fire) for owner in owners]
+        expected = [[] for _ in owners]
+        countdowns = [None] * len(timers) #[due, interval] of every pending timer
+        for _ in range(3000):
+            index = randomness.randrange(len(timers))
+            action = randomness.random()
+            if action < 0.3 and owners[index]:
+                ticks = randomness.choice((1, 2, randomness.randint(1, 300),
+                                           randomness.randint(1, 70000)))
+                interval = randomness.choice((0, 0, randomness.randint(1, 400)))
+                wheel.schedule(timers[index], ticks, interval)
+                countdowns[index] = [wheel.now + ticks, interval]
+            elif action < 0.35:
+                wheel.cancel(timers[index])
+                countdowns[index] = None
+            elif action < 0.36 and owners[index]:
+                owners[index] = None #the timer is dropped when it comes due
+            wheel.advance()
+            for (other, countdown) in enumerate(countdowns):
+                if countdown and countdown[0] == wheel.now:
+                    if owners[other]:
+                        expected[other].append(wheel.now)
+                    if countdown[1] and owners[other]:
+                        countdown[0] += countdown[1]
+                    else:
+                        countdowns[other] = None
+                assert wheel.remaining(timers[other]) == (
+                    countdowns[other][0] - wheel.now if countdowns[other] else 0)
+            assert len(wheel) == sum(1 for countdown in countdowns if countdown)
+        for (owner, fired) in zip(owners, expected):
+            if owner:
+                assert owner.fired == fired
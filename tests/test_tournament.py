@@ -0,0 +1,57 @@
+"""These tests play headless tournament matches on the sim rules"""
+import pytest
+import tournament
+from ponggame import sim
+
+
+def _mirrored(left_ai):
+    """This Function returns a match with the ball heading for the top corner of the left goal"""
+    state = sim.MatchState(seed=3)
+    if left_ai:
+        state.left = sim.AIState(state.height, 40, ai_delay=0, offset_range=0)
+    state.paddles = (state.left, state.right)
+    ball = state.ball
+    (ball.x, ball.y) = (400, 60)
+    (ball.x_velocity, ball.y_velocity) = (-4, -0.25)
+    ball.round_in_progress = True
+    return state
+
+
+def test_left_ai_reaches_the_wall():
+    """An AI on the left moves all the way to the wall like the right one, not to the player's bound"""
+    state = _mirrored(True)
+    for _ in range(80):
+        sim.step(state, (False, True)) #held keys are ignored for an AI
+    assert state.left.y == 0
+    player = _mirrored(False)
+    for _ in range(80):
+        sim.step(player, (True, False))
+    assert player.left.y > 0
+
+
+def test_left_ai_is_the_right_ai_mirrored():
+    """The left AI aims at the ball's heading with the same rules as sim._update_ai"""
+    state = _mirrored(True)
+    sim.step(state)
+    goal_x = sim.ai_goal_x(state.left.x, state.left.width, state.width, state.ball.radius)
+    heading = sim.intercept_y(state.ball.x, state.ball.y, state.ball.x_velocity,
+                              state.ball.y_velocity, goal_x, state.height)
+    assert state.left.approaching and state.left.target_y == heading
+    assert (state.left.going_up, state.left.going_down) == (True, False)
+
+
+@pytest.mark.parametrize('left', [
+    tournament.Entrant('ai'),
+    tournament.Entrant('slow', ai_delay=30, speed=3),
+    tournament.Entrant('idle', script='idle'),
+    tournament.Entrant('tracker', script='tracker'),
+])
+def test_play_match(left):
+    """Every kind of entrant plays a whole match against the default AI, the same way every time"""
+    right = tournament.Entrant('default')
+    result = tournament.play_match(left, right, seed=9)
+    assert result == tournament.play_match(left, right, seed=9)
+    (winner, frames) = result
+    assert winner in (0, 1, 2) and 0 < frames <= tournament.DEFAULT_MAX_FRAMES
+    if left.script == 'idle':
+        assert winner == 2
@@ -0,0 +1,259 @@
+#! /usr/bin/env python3
+"""This Module plays headless AI tournaments and parameter sweeps on every core
+
+Every entrant is an OpponentAI configuration (ai delay, ball offset range,
+paddle speed and height) or a scripted paddle.  Each pair of entrants
+plays --matches matches with the sides swapped half of the time, on the
+headless ponggame.sim rules, spread over a ProcessPoolExecutor in chunks.
+Results are folded in as chunks finish and reported as win rates and
+Elo ratings.
+
+    ./tournament.py --sweep ai_delay=0,10,30 --sweep offset_range=0.2,0.6 --scripted tracker
+"""
+import argparse
+import itertools
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from ponggame import sim
+
+DEFAULT_MATCHES = 20
+DEFAULT_MAX_FRAMES = 18000 #two and a half minutes of play, then it is a draw
+ELO_START = 1500
+ELO_K = 16
+
+SWEEP_PARAMETERS = {
+    'ai_delay': int,
+    'offset_range': float,
+    'speed': int,
+    'height': int,
+}
+
+SCRIPTS = ('idle', 'tracker')
+
+
+class Entrant:
+    """This Class describes one tournament player"""
+    def __init__(self, name, script=None, ai_delay=sim.AI_DELAY,
+                 offset_range=sim.AI_OFFSET_RANGE, speed=5, height=120):
+        self.name = name
+        self.script = script
+        self.ai_delay = ai_delay
+        self.offset_range = offset_range
+        self.speed = speed
+        self.height = height
+
+    @property
+    def is_ai(self):
+        """This Property returns if the entrant is an OpponentAI configuration"""
+        return self.script is None
+
+
+def _tracker(state):
+    """This Function keeps the left paddle centered on the ball"""
+    paddle = state.left
+    center = paddle.y + paddle.height / 2
+    if state.ball.y < center - paddle.speed:
+        return (True, False)
+    if state.ball.y > center + paddle.speed:
+        return (False, True)
+    return sim.NO_INPUT
+
+
+def _controller(entrant):
+    """This Function returns the left paddle controller of a scripted entrant, None for idle"""
+    if entrant.script == 'tracker':
+        return _tracker
+    return None
+
+
+def _paddle_state(entrant, state, x_pos):
+    """This Function returns the paddle of an entrant, an AIState steered by sim for an AI"""
+    if entrant.is_ai:
+        return sim.AIState(state.height, x_pos, height=entrant.height, speed=entrant.speed,
+                           ai_delay=entrant.ai_delay, offset_range=entrant.offset_range)
+    return sim.PaddleState(state.height, x_pos, height=entrant.height, speed=entrant.speed)
+
+
+def play_match(left, right, seed, max_frames=DEFAULT_MAX_FRAMES):
+    """This Function plays one headless match, returns (winner, frames)
+
+    right must be an OpponentAI configuration, an AI on the left is
+    stepped by the same sim rules as the right.  winner is 1 for left,
+    2 for right and 0 for a draw after max_frames.
+    """
+    state = sim.MatchState(seed=seed)
+    state.left = _paddle_state(left, state, 40)
+    state.right = _paddle_state(right, state, state.width - 70)
+    state.paddles = (state.left, state.right)
+    sim.run(state, max_frames, _controller(left))
+    return (state.winner, state.frame)
+
+
+def _play_chunk(entrants, tasks, max_frames):
+    """This Function plays a chunk of (match id, a, b, a is left, seed) in a worker"""
+    results = []
+    for (match_id, index_a, index_b, a_is_left, seed) in tasks:
+        (left, right) = (index_a, index_b) if a_is_left else (index_b, index_a)
+        (winner, frames) = play_match(entrants[left], entrants[right], seed, max_frames)
+        winner_index = None
+        if winner:
+            winner_index = left if winner == 1 else right
+        results.append((match_id, index_a, index_b, winner_index, frames))
+    return results
+
+
+def schedule(entrants, matches, seed=1):
+    """This Function returns every (match id, a, b, a is left, seed) of a round robin
+
+    The sides swap every match; a scripted paddle can only play on the
+    left, so it always does and two scripted paddles never meet.
+    """
+    tasks = []
+    for (index_a, index_b) in itertools.combinations(range(len(entrants)), 2):
+        (entrant_a, entrant_b) = (entrants[index_a], entrants[index_b])
+        if not entrant_a.is_ai and not entrant_b.is_ai:
+            continue
+        for number in range(matches):
+            a_is_left = number % 2 == 0
+            if not entrant_a.is_ai:
+                a_is_left = True
+            elif not entrant_b.is_ai:
+                a_is_left = False
+            tasks.append((len(tasks), index_a, index_b, a_is_left, seed + len(tasks)))
+    return tasks
+
+
+def elo_ratings(count, results):
+    """This Function runs Elo over results in match order, returns the ratings"""
+    ratings = [float(ELO_START)] * count
+    for (_, index_a, index_b, winner_index, _) in sorted(results):
+        expected_a = 1 / (1 + 10 ** ((ratings[index_b] - ratings[index_a]) / 400))
+        if winner_index is None:
+            score_a = 0.5
+        else:
+            score_a = 1.0 if winner_index == index_a else 0.0
+        ratings[index_a] += ELO_K * (score_a - expected_a)
+        ratings[index_b] -= ELO_K * (score_a - expected_a)
+    return ratings
+
+
+def run_tournament(entrants, matches=DEFAULT_MATCHES, workers=None, chunk_size=None,
+                   max_frames=DEFAULT_MAX_FRAMES, seed=1, progress=None):
+    """This Function plays the round robin in parallel, returns the standings
+
+    Chunks are collected as they finish; progress, if given, is called
+    as progress(done, total) after every chunk.
+    """
+    tasks = schedule(entrants, matches, seed)
+    workers = workers or os.cpu_count() or 1
+    if chunk_size is None:
+        chunk_size = max(1, min(256, len(tasks) // (workers * 8) or 1))
+    wins = [0] * len(entrants)
+    losses = [0] * len(entrants)
+    draws = [0] * len(entrants)
+    frames = 0
+    results = []
+    with ProcessPoolExecutor(workers) as executor:
+        futures = [executor.submit(_play_chunk, entrants, tasks[start:start + chunk_size],
+                                   max_frames)
+                   for start in range(0, len(tasks), chunk_size)]
+        for future in as_completed(futures):
+            for result in future.result():
+                (_, index_a, index_b, winner_index, match_frames) = result
+                frames += match_frames
+                if winner_index is None:
+                    draws[index_a] += 1
+                    draws[index_b] += 1
+                else:
+                    loser_index = index_b if winner_index == index_a else index_a
+                    wins[winner_index] += 1
+                    losses[loser_index] += 1
+                results.append(result)
+            if progress:
+                progress(len(results), len(tasks))
+    ratings = elo_ratings(len(entrants), results)
+    standings = []
+    for (index, entrant) in enumerate(entrants):
+        played = wins[index] + losses[index] + draws[index]
+        standings.append({
+            'name': entrant.name,
+            'elo': ratings[index],
+            'played': played,
+            'wins': wins[index],
+            'losses': losses[index],
+            'draws': draws[index],
+            'win_rate': (wins[index] + 0.5 * draws[index]) / played if played else 0.0,
+        })
+    standings.sort(key=lambda standing: standing['elo'], reverse=True)
+    return {'matches': len(results), 'frames': frames, 'standings': standings}
+
+
+def build_entrants(sweeps, scripts):
+    """This Function returns one entrant per point of the sweep grid plus the scripts"""
+    names = list(sweeps)
+    entrants = []
+    for values in itertools.product(*(sweeps[name] for name in names)):
+        config = dict(zip(names, values))
+        label = ' '.join(f'{name}={value}' for (name, value) in config.items()) or 'default'
+        entrants.append(Entrant(label, **config))
+    entrants.extend(Entrant(script, script=script) for script in scripts)
+    return entrants
+
+
+def _parse_sweep(text):
+    """This Function parses name=v1,v2,... into (name, [values])"""
+    (name, _, values) = text.partition('=')
+    if name not in SWEEP_PARAMETERS or not values:
+        raise argparse.ArgumentTypeError(
+            f'expected one of {", ".join(SWEEP_PARAMETERS)}=value,value,...')
+    return (name, [SWEEP_PARAMETERS[name](value) for value in values.split(',')])
+
+
+def main(argv=None):
+    """This function runs a tournament from the command line"""
+    parser = argparse.ArgumentParser(description='Headless pong AI tournament')
+    parser.add_argument('--sweep', type=_parse_sweep, action='append', default=[],
+                        metavar='NAME=V1,V2', help='sweep ai_delay, offset_range, speed or height')
+    parser.add_argument('--scripted', default='', help=f'comma list of {", ".join(SCRIPTS)}')
+    parser.add_argument('--matches', type=int, default=DEFAULT_MATCHES,
+                        help='matches per pair of entrants')
+    parser.add_argument('--workers', type=int, help='worker processes, every core by default')
+    parser.add_argument('--chunk-size', type=int, help='matches per task sent to a worker')
+    parser.add_argument('--max-frames', type=int, default=DEFAULT_MAX_FRAMES,
+                        help='frames before a match is a draw')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--json', metavar='PATH', help='write the standings to PATH')
+    args = parser.parse_args(argv)
+
+    scripts = [script for script in args.scripted.split(',') if script]
+    for script in scripts:
+        if script not in SCRIPTS:
+            parser.error(f'unknown script {script}')
+    entrants = build_entrants(dict(args.sweep), scripts)
+    if len(entrants) < 2 or not any(entrant.is_ai for entrant in entrants):
+        parser.error('a tournament needs two entrants and at least one AI')
+
+    def progress(done, total):
+        print(f'\r{done}/{total} matches', end='', file=sys.stderr)
+
+    start = time.perf_counter()
+    report = run_tournament(entrants, args.matches, args.workers, args.chunk_size,
+                            args.max_frames, args.seed, progress)
+    seconds = time.perf_counter() - start
+    print(file=sys.stderr)
+    for standing in report['standings']:
+        print(f'{standing["elo"]:7.1f}  {standing["win_rate"]:6.1%}  '
+              f'{standing["wins"]:5d}-{standing["losses"]}-{standing["draws"]}  {standing["name"]}')
+    played_hours = report['frames'] / 120 / 3600
+    print(f'{report["matches"]} matches, {played_hours:.1f} h of play in {seconds:.1f} s')
+    if args.json:
+        with open(args.json, 'w') as report_file:
+            json.dump(report, report_file, indent=1)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())